@@ -0,0 +1,104 @@
+# src/service/chatbot/analysis_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+class AnalysisCache:
+    """LRU + TTL cache untuk hasil analisis siswa, dengan key (nis, data_version)"""
+    
+    def __init__(self, max_size=1024, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (nis, version) -> (expires_at, value)
+        # Generasi invalidasi: global untuk invalidate() penuh, per NIS untuk invalidate(nis)
+        self._generation = 0
+        self._nis_generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+    
+    def get(self, nis, version):
+        """Return cached value or None (counts a hit or a miss)"""
+        key = (str(nis), version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+    
+    def peek(self, nis, version):
+        """Like get, but without touching hit/miss counters or LRU order"""
+        with self._lock:
+            entry = self._entries.get((str(nis), version))
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            return None
+    
+    def generation(self, nis):
+        """Token generasi invalidasi NIS; diambil sebelum komputasi dimulai lalu diberikan ke put"""
+        with self._lock:
+            return self._generation, self._nis_generations.get(str(nis), 0)
+    
+    def put(self, nis, version, value, generation=None):
+        """Simpan hasil; dilewati jika NIS diinvalidasi setelah token generation diambil (hasil basi)"""
+        key = (str(nis), version)
+        with self._lock:
+            if generation is not None and generation != (self._generation, self._nis_generations.get(key[0], 0)):
+                self.stale_puts += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+    
+    def invalidate(self, nis=None):
+        """Drop entries for one NIS (all versions), or everything when nis is None"""
+        with self._lock:
+            if nis is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                # Generasi global baru membatalkan semua token lama; counter per NIS bisa dibuang
+                self._generation += 1
+                self._nis_generations.clear()
+            else:
+                nis = str(nis)
+                self._nis_generations[nis] = self._nis_generations.get(nis, 0) + 1
+                keys = [key for key in self._entries if key[0] == nis]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self.invalidations += removed
+            return removed
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_puts': self.stale_puts
+            }
@@ -1,18 +1,45 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.linear_model import LinearRegression
+import time
+from startup_report import StartupReport
+
+# Catat durasi import/inisialisasi per komponen (lihat /api/health/startup)
+startup_report = StartupReport()
+
+with startup_report.timed('import flask'):
+    from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
+    from flask_cors import CORS
+with startup_report.timed('import pandas/numpy'):
+    import pandas as pd
+    import numpy as np
+import contextvars
 import os
-import re
-import random
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
+import csv
+import io
 import json
 
 # Import database integration
-from database_integration import DatabaseManager
+with startup_report.timed('import local modules'):
+    from database_integration import DatabaseManager
+    from score_store import ScoreStore, SUBJECTS, SUBJECT_NAMES, summarize_scores, changed_rows
+    from cohort_aggregates import CohortAggregates
+    from analysis_cache import AnalysisCache
+    from data_watcher import FileWatcher
+    from response_cache import ChatResponseCache
+    from prompt_context import compact_student_context, token_report, count_message_tokens
+    from conversation_history import ConversationHistoryManager
+    from score_loader import DatabaseScoreLoader
+    from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from cohort_clusters import ClusterEngine
+    from score_trends import ScoreTrends
+    from intent_router import build_default_router
+    from score_bundle import read_merged_csv, read_manifest, bundle_is_fresh, open_bundle
+    from data_snapshot import SnapshotManager
+    from single_flight import SingleFlight
+    from shared_scores import SharedScoreArrays
+    from llm_scheduler import LLMScheduler, LLMSchedulerRejected, status_of
+    from circuit_breaker import CircuitBreaker, CircuitOpenError, STATE_VALUES as CIRCUIT_STATE_VALUES
+    from study_tips import load_or_build as load_study_tips_index
 
 # Load environment variables
 try:
@@ -22,101 +49,407 @@ try:
 except ImportError:
     print("⚠️  python-dotenv not available, using system environment variables")
 
-# Initialize database manager
+# Initialize database manager (pool dibuka saat koneksi pertama dipakai, bukan saat import)
 db_manager = DatabaseManager()
 
 # OpenAI Configuration - Safe initialization with error handling
-openai_client = None
 openai_api_key = os.getenv('OPENAI_API_KEY')
+if not openai_api_key:
+    print("❌ OPENAI_API_KEY not found in environment variables!")
+    print("📝 Please add OPENAI_API_KEY=your_key_here to your .env file")
 
-if openai_api_key:
-    try:
-        # Try OpenAI v1.0+ with safe initialization
-        from openai import OpenAI
-        
-        # Initialize with minimal parameters to avoid httpx conflicts
-        openai_client = OpenAI(
-            api_key=openai_api_key,
-            timeout=30.0,  # Simple timeout parameter
-        )
-        print("✅ OpenAI client initialized successfully (v1.0+)")
-        
-        # Test the client with a simple call
+_openai_client = None
+_openai_client_loaded = False
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """OpenAI client dibuat saat pertama dipakai (import SDK cukup berat), None jika tidak tersedia"""
+    global _openai_client, _openai_client_loaded
+    if _openai_client_loaded:
+        return _openai_client
+    
+    with _openai_client_lock:
+        if not _openai_client_loaded:
+            with startup_report.timed('openai client'):
+                _openai_client = create_openai_client()
+            _openai_client_loaded = True
+    return _openai_client
+
+def create_openai_client():
+    client = None
+    if openai_api_key:
         try:
-            # This doesn't make an API call, just validates the client
-            print("✅ OpenAI client validation passed")
-        except Exception as validation_error:
-            print(f"⚠️  OpenAI client validation warning: {validation_error}")
+            # Try OpenAI v1.0+ with safe initialization
+            from openai import OpenAI
             
-    except ImportError as import_error:
-        print(f"❌ OpenAI import failed: {import_error}")
-        print("📦 Please run: pip install openai==1.3.7 httpx==0.24.1")
-        openai_client = None
-    except TypeError as type_error:
-        print(f"❌ OpenAI initialization failed (version conflict): {type_error}")
-        print("🔧 Trying fallback initialization...")
-        
-        # Fallback: Try with minimal parameters
-        try:
-            openai_client = OpenAI(api_key=openai_api_key)
-            print("✅ OpenAI fallback initialization successful")
-        except Exception as fallback_error:
-            print(f"❌ OpenAI fallback also failed: {fallback_error}")
-            print("📦 Please fix dependencies: pip uninstall openai httpx -y && pip install openai==1.3.7 httpx==0.24.1")
-            openai_client = None
-    except Exception as general_error:
-        print(f"❌ Unexpected OpenAI error: {general_error}")
-        openai_client = None
-else:
-    print("❌ OPENAI_API_KEY not found in environment variables!")
-    print("📝 Please add OPENAI_API_KEY=your_key_here to your .env file")
+            # Initialize with minimal parameters to avoid httpx conflicts
+            client = OpenAI(
+                api_key=openai_api_key,
+                timeout=30.0,  # Simple timeout parameter
+                max_retries=0,  # Retry 429/5xx ditangani llm_scheduler (Retry-After + antrian prioritas)
+            )
+            print("✅ OpenAI client initialized successfully (v1.0+)")
+            
+            # Test the client with a simple call
+            try:
+                # This doesn't make an API call, just validates the client
+                print("✅ OpenAI client validation passed")
+            except Exception as validation_error:
+                print(f"⚠️  OpenAI client validation warning: {validation_error}")
+                
+        except ImportError as import_error:
+            print(f"❌ OpenAI import failed: {import_error}")
+            print("📦 Please run: pip install openai==1.3.7 httpx==0.24.1")
+            client = None
+        except TypeError as type_error:
+            print(f"❌ OpenAI initialization failed (version conflict): {type_error}")
+            print("🔧 Trying fallback initialization...")
+            
+            # Fallback: Try with minimal parameters
+            try:
+                client = OpenAI(api_key=openai_api_key, max_retries=0)
+                print("✅ OpenAI fallback initialization successful")
+            except Exception as fallback_error:
+                print(f"❌ OpenAI fallback also failed: {fallback_error}")
+                print("📦 Please fix dependencies: pip uninstall openai httpx -y && pip install openai==1.3.7 httpx==0.24.1")
+                client = None
+        except Exception as general_error:
+            print(f"❌ Unexpected OpenAI error: {general_error}")
+            client = None
+    return client
 
 app = Flask(__name__)
 CORS(app)
 
 # Menentukan path absolut ke file dataset
 current_dir = os.path.dirname(os.path.abspath(__file__))
-data_dir = os.path.join(current_dir, 'dataChatBot')
+# CHATBOT_DATA_DIR: arahkan ke roster lain (mis. hasil benchmarks/generate_roster.py)
+data_dir = os.getenv('CHATBOT_DATA_DIR') or os.path.join(current_dir, 'dataChatBot')
 siswa_path = os.path.join(data_dir, 'data_siswa.csv')
 kuis_path = os.path.join(data_dir, 'nilai_kuis.csv')
 tugas_path = os.path.join(data_dir, 'nilai_tugas.csv')
+# Bundle .npy hasil ingest_bundle.py; dibuka via memory-map jika masih sesuai CSV
+bundle_dir = os.getenv('CHATBOT_BUNDLE_DIR') or os.path.join(data_dir, 'bundle')
+DATA_BUNDLE = os.getenv('DATA_BUNDLE', '1') == '1'
+# Pre-fork (gunicorn.conf.py): proses induk memuat skor sekali (bundle mmap read-only atau shared memory),
+# worker hasil fork berbagi halaman yang sama. Thread background dimulai per worker setelah fork
+PREFORK = os.getenv('PREFORK') == '1'
+# Blok shared memory snapshot awal (hanya mode pre-fork tanpa bundle); dilepas proses induk saat exit
+shared_scores = None
 
-# Load datasets
-try:
-    siswa_data = pd.read_csv(siswa_path)
-    kuis_data = pd.read_csv(kuis_path)
-    tugas_data = pd.read_csv(tugas_path)
-    print(f"✅ Dataset loaded: {len(siswa_data)} siswa, {len(kuis_data)} kuis, {len(tugas_data)} tugas")
-    
-    # Merge datasets on 'Id' and 'NIS'
-    dataset = siswa_data.merge(kuis_data, on=['Id', 'Nama Lengkap', 'NIS'], how='left')
-    dataset = dataset.merge(tugas_data, on=['Id', 'Nama Lengkap', 'NIS'], how='left')
-    print(f"✅ Dataset merged successfully. Total records: {len(dataset)}")
-except Exception as e:
-    print(f"❌ Error loading dataset: {e}")
-    print("🔄 Creating dummy dataset for testing...")
-    dataset = pd.DataFrame({
-        'Id': range(1, 31),
-        'Nama Lengkap': [f'Siswa {i}' for i in range(1, 31)],
-        'NIS': [f'202301{i:02d}' for i in range(1, 31)],
-        'Kelas': ['A', 'B', 'C', 'D', 'E', 'F'] * 5,
-        'Gender': ['Laki-laki', 'Perempuan'] * 15,
-        'MTK_Quiz': np.random.uniform(50, 100, 30),
-        'MTK_Tugas': np.random.uniform(50, 100, 30),
-        'BINDO_Quiz': np.random.uniform(50, 100, 30),
-        'BINDO_Tugas': np.random.uniform(50, 100, 30),
-        'BING_Quiz': np.random.uniform(50, 100, 30),
-        'BING_Tugas': np.random.uniform(50, 100, 30),
-        'IPA_Quiz': np.random.uniform(50, 100, 30),
-        'IPA_Tugas': np.random.uniform(50, 100, 30),
-        'IPS_Quiz': np.random.uniform(50, 100, 30),
-        'IPS_Tugas': np.random.uniform(50, 100, 30),
-        'PKN_Quiz': np.random.uniform(50, 100, 30),
-        'PKN_Tugas': np.random.uniform(50, 100, 30),
-        'Seni_Quiz': np.random.uniform(50, 100, 30),
-        'Seni_Tugas': np.random.uniform(50, 100, 30),
-    })
-    print("✅ Dummy dataset created successfully")
+# Klaster siswa (MiniBatchKMeans atas 14 skor), di-fit dan di-update di background
+cluster_engine = ClusterEngine(
+    n_clusters=int(os.getenv('CLUSTER_COUNT', '4')),
+    batch_size=int(os.getenv('CLUSTER_BATCH_SIZE', '1024')),
+    interval=float(os.getenv('CLUSTER_REFIT_INTERVAL', '30'))
+)
+
+# Tren nilai per siswa/mapel (regresi closed-form atas statistik cukup), di-update tiap skor baru masuk
+score_trends = ScoreTrends(
+    horizon_days=float(os.getenv('TREND_HORIZON_DAYS', '30')),
+    min_observations=int(os.getenv('TREND_MIN_OBSERVATIONS', '3')),
+    min_span_days=float(os.getenv('TREND_MIN_SPAN_DAYS', '1'))
+)
+TREND_MIN_CONFIDENCE = float(os.getenv('TREND_MIN_CONFIDENCE', '0.3'))
+# Perubahan proyeksi (poin per horizon) minimal untuk dianggap naik/turun
+TREND_MIN_CHANGE = float(os.getenv('TREND_MIN_CHANGE', '2'))
+
+def observe_score_changes(previous, snapshot, rows, previous_rows):
+    """Skor yang berubah antar snapshot menjadi observasi tren
+    
+    Skor lama dicatat pada mtime file sumber snapshot lama (hanya untuk siswa yang belum punya tren), skor
+    baru pada mtime snapshot baru: waktu skor berubah, bukan waktu reload. Siswa yang belum pernah berubah dan siswa baru tidak disimpan di
+    score_trends (satu observasi belum membentuk tren), sehingga memori tidak tumbuh dengan ukuran roster.
+    """
+    known = previous_rows >= 0
+    rows, previous_rows = rows[known], previous_rows[known]
+    if not len(rows):
+        return
+    nis = [str(value) for value in snapshot.store.nis[rows]]
+    first = np.fromiter((value not in score_trends.index for value in nis), dtype=bool, count=len(nis))
+    if first.any():
+        score_trends.observe([value for value, is_first in zip(nis, first) if is_first],
+                             previous.store.scores[previous_rows[first]], previous.data_mtime)
+    score_trends.observe(nis, snapshot.store.scores[rows], snapshot.data_mtime)
+
+# Dataset, score store dan agregat kohort dimuat lazy (background warm-up atau request pertama).
+# Global ini hanya cermin snapshot terakhir; kode request membaca current_data().
+dataset = None
+score_store = None
+cohort_aggregates = None
+
+def load_dataset(allow_dummy=True):
+    """Merged CSV dataset; allow_dummy=False meneruskan error baca (reload tidak boleh memakai data acak)"""
+    try:
+        # Merge datasets on 'Id' and 'NIS'
+        dataset = read_merged_csv(siswa_path, kuis_path, tugas_path)
+        print(f"✅ Dataset merged successfully. Total records: {len(dataset)}")
+    except Exception as e:
+        print(f"❌ Error loading dataset: {e}")
+        if not allow_dummy:
+            raise
+        print("🔄 Creating dummy dataset for testing...")
+        dataset = pd.DataFrame({
+            'Id': range(1, 31),
+            'Nama Lengkap': [f'Siswa {i}' for i in range(1, 31)],
+            'NIS': [f'202301{i:02d}' for i in range(1, 31)],
+            'Kelas': ['A', 'B', 'C', 'D', 'E', 'F'] * 5,
+            'Gender': ['Laki-laki', 'Perempuan'] * 15,
+            'MTK_Quiz': np.random.uniform(50, 100, 30),
+            'MTK_Tugas': np.random.uniform(50, 100, 30),
+            'BINDO_Quiz': np.random.uniform(50, 100, 30),
+            'BINDO_Tugas': np.random.uniform(50, 100, 30),
+            'BING_Quiz': np.random.uniform(50, 100, 30),
+            'BING_Tugas': np.random.uniform(50, 100, 30),
+            'IPA_Quiz': np.random.uniform(50, 100, 30),
+            'IPA_Tugas': np.random.uniform(50, 100, 30),
+            'IPS_Quiz': np.random.uniform(50, 100, 30),
+            'IPS_Tugas': np.random.uniform(50, 100, 30),
+            'PKN_Quiz': np.random.uniform(50, 100, 30),
+            'PKN_Tugas': np.random.uniform(50, 100, 30),
+            'Seni_Quiz': np.random.uniform(50, 100, 30),
+            'Seni_Tugas': np.random.uniform(50, 100, 30),
+        })
+        print("✅ Dummy dataset created successfully")
+    return dataset
+
+def load_score_store(allow_dummy=True):
+    """Return (dataset atau None, store): bundle memory-mapped jika ada dan segar, selain itu CSV"""
+    if DATA_BUNDLE:
+        manifest = read_manifest(bundle_dir)
+        if bundle_is_fresh(manifest, [siswa_path, kuis_path, tugas_path]):
+            # Tanpa parse CSV dan merge: waktu buka konstan, halaman file dibagi antar worker
+            with startup_report.timed('score bundle'):
+                store, manifest = open_bundle(bundle_dir, mmap_mode='r' if PREFORK else 'c')
+            print(f"✅ Score bundle {manifest['version']} memory-mapped: {len(store)} siswa")
+            return None, store
+        if manifest is not None:
+            print("⚠️  Score bundle lebih lama dari CSV, memakai CSV (jalankan ingest_bundle.py)")
+    
+    with startup_report.timed('dataset csv'):
+        loaded = load_dataset(allow_dummy)
+    
+    # Bangun score store sekali saat load: matriks skor bertipe float + index NIS
+    with startup_report.timed('score store'):
+        store = ScoreStore.from_dataframe(loaded)
+    return loaded, store
+
+def data_files_mtime(paths):
+    """mtime terbaru file data (epoch detik), None jika tidak ada yang bisa dibaca"""
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            pass
+    return max(mtimes) if mtimes else None
+
+def build_data_snapshot():
+    """Bangun isi snapshot baru (dipanggil saat startup dan reload, di luar jalur request)"""
+    global shared_scores
+    # Dibaca sebelum load: file yang ditulis ulang selama load memicu reload berikutnya dengan mtime baru
+    data_mtime = data_files_mtime([siswa_path, kuis_path, tugas_path])
+    # Dummy roster hanya untuk load pertama (service tetap bisa start); CSV rusak/setengah ditulis saat
+    # reload harus gagal agar SnapshotManager mempertahankan snapshot aktif dan mencatat failures
+    loaded, store = load_score_store(allow_dummy=not data_snapshots.ready.is_set())
+    if PREFORK and loaded is not None and shared_scores is None:
+        # Snapshot awal di proses induk: matriks skor + index NIS pindah ke shared memory read-only.
+        # Array object/dict Python tersalin per worker begitu refcount-nya disentuh; array ini tidak
+        with startup_report.timed('shared scores'):
+            shared_scores = SharedScoreArrays.create(store)
+            store = shared_scores.store()
+        print(f"✅ Shared score arrays: {shared_scores.nbytes / 1e6:.1f} MB untuk semua worker")
+    
+    # Agregat kohort (mean per mapel/kelas/gender) dihitung sekali per snapshot; siswa database punya
+    # agregat sendiri di db_score_loader yang di-update per baris saat refresh
+    with startup_report.timed('cohort aggregates'):
+        aggregates = CohortAggregates.from_store(store)
+    print(f"✅ Score store built: {len(store)} siswa lengkap")
+    return loaded, store, aggregates, 'csv' if loaded is not None else 'bundle', data_mtime
+
+def on_data_snapshot_published(snapshot, previous):
+    global dataset, score_store, cohort_aggregates
+    dataset, score_store, cohort_aggregates = snapshot.dataset, snapshot.store, snapshot.aggregates
+    if previous is not None:
+        # Key cache menyertakan versi snapshot; entri lama dibuang agar tidak memakan slot LRU
+        analysis_cache.invalidate()
+        # Reload selalu membangun store baru: perubahan skor per siswa didapat dari diff kedua store
+        rows, previous_rows = changed_rows(previous.store, snapshot.store)
+        observe_score_changes(previous, snapshot, rows, previous_rows)
+    if os.getenv('CLUSTER_ENGINE', '1') == '1' and background_threads_started:
+        # Reload: hanya baris yang berubah masuk partial_fit; snapshot pertama di-fit penuh
+        cluster_engine.attach(snapshot.store, rows if previous is not None else None)
+
+data_snapshots = SnapshotManager(
+    build_data_snapshot,
+    on_publish=on_data_snapshot_published,
+    settle_seconds=float(os.getenv('DATA_RELOAD_SETTLE_SECONDS', '0.5'))
+)
+
+def ensure_data_loaded():
+    """Muat snapshot data pertama sekali (thread-safe); request lain menunggu sampai siap"""
+    data_snapshots.ensure_loaded()
+
+# Pin snapshot untuk route async asgi_app (di luar request context Flask); thread pool mewarisinya
+# lewat contextvars.copy_context()
+pinned_data_snapshot = contextvars.ContextVar('pinned_data_snapshot', default=None)
+
+def current_data():
+    """Snapshot untuk request ini: request yang sedang berjalan tetap memakai snapshot saat ia dimulai"""
+    if has_request_context():
+        snapshot = g.get('data_snapshot')
+        if snapshot is not None:
+            return snapshot
+    snapshot = pinned_data_snapshot.get()
+    if snapshot is not None:
+        return snapshot
+    return data_snapshots.ensure_loaded()
+
+# Cache hasil analisis per (NIS, versi data), diinvalidasi oleh NOTIFY database dan perubahan file CSV
+analysis_cache = AnalysisCache(
+    max_size=int(os.getenv('ANALYSIS_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('ANALYSIS_CACHE_TTL', '300'))
+)
+
+# Request paralel untuk NIS + versi data yang sama berbagi satu komputasi analisis (dan satu query DB)
+analysis_flights = SingleFlight()
+
+def on_student_changed(nis):
+    analysis_cache.invalidate(nis)
+
+def on_data_files_changed(paths):
+    print(f"🔄 Data file berubah: {', '.join(os.path.basename(path) for path in paths)}")
+    # Reload berjalan di thread watcher; request tetap dilayani snapshot lama sampai swap
+    if os.getenv('DATA_RELOAD', '1') == '1':
+        data_snapshots.on_files_changed(paths)
+    else:
+        analysis_cache.invalidate()
+
+student_change_listener = db_manager.create_change_listener(on_student_changed)
+data_file_watcher = FileWatcher(
+    [siswa_path, kuis_path, tugas_path, os.path.join(bundle_dir, 'CURRENT')],
+    on_data_files_changed,
+    interval=float(os.getenv('DATA_WATCH_INTERVAL', '2'))
+)
+
+# Skor siswa database: bulk load di background lalu refresh inkremental (submissions.updated_at)
+def on_db_scores_updated(nis_list):
+    for nis in nis_list:
+        analysis_cache.invalidate(nis)
+
+db_score_loader = DatabaseScoreLoader(
+    db_manager,
+    on_update=on_db_scores_updated,
+    interval=float(os.getenv('DB_SCORE_REFRESH_INTERVAL', '60')),
+    batch_size=int(os.getenv('DB_SCORE_BATCH_SIZE', '5000')),
+    trends=score_trends
+)
+
+# Metrics Prometheus (/metrics): latensi per route, per tahap analisis, OpenAI, pool dan cache
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram(
+    'rogrow_http_request_duration_seconds', 'Flask request latency by route template',
+    ['method', 'route', 'status']
+)
+analysis_stage_seconds = metrics.histogram(
+    'rogrow_analysis_stage_duration_seconds',
+    'Student analysis stage latency (db_lookup, csv_fallback, db_scores, scoring, recommendations)',
+    ['stage']
+)
+export_rows_total = metrics.counter(
+    'rogrow_export_rows_total', 'Student analyses written by the streaming export', ['format', 'source']
+)
+openai_request_seconds = metrics.histogram(
+    'rogrow_openai_request_duration_seconds', 'OpenAI chat completion latency', ['mode']
+)
+openai_tokens_total = metrics.counter(
+    'rogrow_openai_tokens_total', 'OpenAI tokens reported by the API usage field', ['kind']
+)
+openai_errors_total = metrics.counter(
+    'rogrow_openai_errors_total', 'OpenAI call failures by exception type', ['type']
+)
+llm_queue_wait_seconds = metrics.histogram(
+    'rogrow_llm_queue_wait_seconds', 'Time an LLM call waited in the scheduler for its turn and rate budget',
+    ['priority']
+)
+llm_retries_total = metrics.counter(
+    'rogrow_llm_retries_total', 'LLM calls retried by the scheduler by HTTP status', ['status']
+)
+llm_circuit_transitions_total = metrics.counter(
+    'rogrow_llm_circuit_transitions_total', 'LLM circuit breaker state transitions', ['to']
+)
+chat_fallback_total = metrics.counter(
+    'rogrow_chat_fallback_total', 'Chat replies served locally while the LLM circuit was open', ['source']
+)
+
+# Retrieval tips belajar per pertanyaan chat: answer (tanpa LLM), context (potongan ke prompt), miss
+study_tips_total = metrics.counter(
+    'rogrow_study_tips_total', 'Chat questions matched against the offline study tips index', ['outcome']
+)
+
+# Pertanyaan dataset yang dijawab lokal per intent ('fallback' = tidak dikenali)
+intent_requests_total = metrics.counter(
+    'rogrow_intent_requests_total', 'Dataset questions answered by the intent router', ['intent']
+)
+
+def record_openai_call(mode, seconds, usage=None, error=None):
+    """Catat satu panggilan OpenAI (sync, stream atau async); usage = dict prompt/completion/total"""
+    openai_request_seconds.observe(seconds, mode=mode)
+    if usage:
+        openai_tokens_total.inc(usage.get('prompt_tokens') or 0, kind='prompt')
+        openai_tokens_total.inc(usage.get('completion_tokens') or 0, kind='completion')
+        openai_tokens_total.inc(usage.get('total_tokens') or 0, kind='total')
+    if error:
+        openai_errors_total.inc(type=error)
+
+def usage_from_response(response):
+    usage = getattr(response, 'usage', None)
+    if not usage:
+        return None
+    return {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'total_tokens': usage.total_tokens
+    }
+
+# stats dibungkus lambda: objek cache bisa didefinisikan setelah blok ini
+def stats_gauge(stats, keys):
+    return lambda: [({'stat': key}, stats()[key]) for key in keys]
+
+metrics.gauge('rogrow_db_pool', 'Database connection pool state', ['stat'], stats_gauge(
+    lambda: db_manager.pool_stats(),
+    ['max_size', 'open', 'in_use', 'idle', 'checkouts', 'checkout_failures', 'connect_failures', 'discarded']
+))
+metrics.gauge('rogrow_analysis_cache', 'Student analysis cache counters', ['stat'], stats_gauge(
+    lambda: analysis_cache.stats(),
+    ['size', 'hits', 'misses', 'evictions', 'expirations', 'invalidations', 'stale_puts']
+))
+metrics.gauge('rogrow_analysis_single_flight', 'Concurrent student analyses sharing one computation', ['stat'],
+              stats_gauge(lambda: analysis_flights.stats(), ['calls', 'executions', 'coalesced', 'errors', 'in_flight']))
+metrics.gauge('rogrow_chat_response_cache', 'Chat response cache counters', ['stat'], stats_gauge(
+    lambda: chat_response_cache.stats(),
+    ['size', 'hits', 'similar_hits', 'misses', 'evictions', 'saved_latency_seconds']
+))
+metrics.gauge('rogrow_llm_queue_depth', 'LLM calls waiting in the scheduler by priority', ['priority'],
+              lambda: [({'priority': name}, depth) for name, depth in llm_scheduler.queue_depth().items()])
+metrics.gauge('rogrow_llm_scheduler', 'LLM scheduler counters and remaining rate budget', ['stat'], stats_gauge(
+    lambda: llm_scheduler.stats(),
+    ['granted', 'rejected', 'timeouts', 'retries', 'rate_limited', 'paused_seconds']
+))
+metrics.gauge('rogrow_llm_circuit_state', 'LLM circuit breaker state (0 closed, 1 half_open, 2 open)', (),
+              lambda: [({}, CIRCUIT_STATE_VALUES[llm_breaker.state])])
+metrics.gauge('rogrow_data_version', 'Data snapshot version (bumps on every reload)', (),
+              lambda: [({}, data_snapshots.current.version if data_snapshots.current else 0)])
+metrics.gauge('rogrow_data_snapshot_age_seconds', 'Seconds since the active data snapshot was published', (),
+              lambda: [({}, data_snapshots.current.age())] if data_snapshots.current else [])
+metrics.gauge('rogrow_data_reload', 'Data snapshot reloads', ['stat'], stats_gauge(
+    lambda: data_snapshots.stats(), ['reloads', 'failures']
+))
+metrics.gauge('rogrow_data_reload_seconds', 'Duration of the last data snapshot reload', (),
+              lambda: [({}, data_snapshots.last_reload_seconds)] if data_snapshots.last_reload_seconds is not None else [])
+
+if os.getenv('DB_INSTALL_NOTIFY_TRIGGERS') == '1':
+    db_manager.install_change_triggers()
 
 # Preprocessing data
 def preprocess_data():
@@ -126,140 +459,327 @@ def preprocess_data():
         'IPS_Quiz', 'IPS_Tugas', 'PKN_Quiz', 'PKN_Tugas',
         'Seni_Quiz', 'Seni_Tugas'
     ]
+    # Salinan: dataset milik snapshot dibaca thread lain dan tidak boleh diubah di tempat.
+    # Dengan bundle, dataset mentah tidak dimuat saat startup
+    snapshot_dataset = current_data().dataset
+    data = snapshot_dataset.copy() if snapshot_dataset is not None else load_dataset()
     for col in numeric_columns:
-        if col in dataset.columns:
-            dataset[col] = pd.to_numeric(dataset[col], errors='coerce')
+        if col in data.columns:
+            data[col] = pd.to_numeric(data[col], errors='coerce')
     # Pastikan NIS bertipe string dan di-strip
-    if 'NIS' in dataset.columns:
-        dataset['NIS'] = dataset['NIS'].astype(str).str.strip()
-    return dataset.dropna()
+    if 'NIS' in data.columns:
+        data['NIS'] = data['NIS'].astype(str).str.strip()
+    return data.dropna()
 
-# Fungsi analisis mendalam performa siswa - Enhanced dengan database
-def get_detailed_student_analysis(nis):
-    """Get detailed student analysis from database + generated academic data"""
-    
-    # First, try to get student from database
-    student_from_db = db_manager.get_student_by_nis(nis)
-    
+# Info siswa + skor akademik dari database atau CSV (fallback)
+def resolve_student(nis, student_from_db=None):
+    """Return (student_info, scores array) for a NIS, or None if unknown"""
     if not student_from_db:
-        # If not in database, check CSV as fallback
-        data = preprocess_data()
-        student = data[data['NIS'] == str(nis)]
-        if student.empty:
+        # If not in database, check CSV as fallback (O(1) lookup di score store)
+        score_store = current_data().store
+        row = score_store.row_of(nis)
+        if row is None:
             return None
         
         # Use CSV data
         student_info = {
             'nis': nis,
-            'nama_lengkap': student['Nama Lengkap'].iloc[0],
-            'kelas': student.get('Kelas', ['Unknown']).iloc[0] if 'Kelas' in student.columns else 'Unknown',
-            'gender': student.get('Gender', ['Unknown']).iloc[0] if 'Gender' in student.columns else 'Unknown',
+            'nama_lengkap': score_store.names[row],
+            'kelas': score_store.kelas[row],
+            'gender': score_store.gender[row],
             'email': 'N/A',
             'source': 'CSV'
         }
-        
-        # Generate academic scores from CSV
-        subjects = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
-        academic_scores = {}
-        for subject in subjects:
-            academic_scores[f'{subject}_Quiz'] = float(student[f"{subject}_Quiz"].iloc[0])
-            academic_scores[f'{subject}_Tugas'] = float(student[f"{subject}_Tugas"].iloc[0])
-    
-    else:
-        # Student found in database
-        student_info = {
-            'nis': nis,
-            'nama_lengkap': student_from_db['nama_lengkap'],
-            'kelas': 'A',  # Default since not in siswa table
-            'gender': 'Unknown',  # Default since not in siswa table
-            'email': student_from_db['email'],
-            'no_telepon': student_from_db.get('no_telepon', 'N/A'),
-            'source': 'Database'
-        }
-        
-        # Generate realistic academic scores for database student
-        academic_scores = db_manager.create_dummy_scores_for_student(
-            nis, student_from_db['nama_lengkap']
-        )
-    
-    # Subject mapping
-    subjects = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
-    subject_names = {
-        'MTK': 'Matematika',
-        'BINDO': 'Bahasa Indonesia', 
-        'BING': 'Bahasa Inggris',
-        'IPA': 'IPA',
-        'IPS': 'IPS',
-        'PKN': 'PKN',
-        'Seni': 'Seni Budaya'
-    }
+        return student_info, score_store.student_scores(row)
     
-    # Build analysis structure
-    analysis = {
-        'nama': student_info['nama_lengkap'],
+    # Student found in database
+    student_info = {
         'nis': nis,
-        'kelas': student_info['kelas'],
-        'gender': student_info['gender'],
-        'email': student_info.get('email', 'N/A'),
-        'data_source': student_info['source'],
-        'scores': {},
-        'performance_trends': {},
-        'recommendations': [],
-        'strengths': [],
-        'improvements': []
+        'nama_lengkap': student_from_db['nama_lengkap'],
+        'kelas': db_score_loader.kelas_for(nis),  # classes.grade, default 'A'
+        'gender': 'Unknown',  # Default since not in siswa table
+        'email': student_from_db['email'],
+        'no_telepon': student_from_db.get('no_telepon', 'N/A'),
+        'source': 'Database'
     }
     
-    # Analisis detail per mata pelajaran
-    total_quiz = 0
-    total_tugas = 0
-    subject_averages = []
+    # Nilai tugas dari submissions; kuis/mapel kosong diisi skor sintetis deterministik per NIS
+    return student_info, db_score_loader.scores_for(nis)
+
+# Bangun struktur analisis untuk sekumpulan siswa sekaligus (NumPy vectorized)
+def build_student_analyses(student_infos, scores):
+    started = time.perf_counter()
+    summary = summarize_scores(scores)
     
-    for subject in subjects:
-        if student_info['source'] == 'CSV':
-            quiz_score = academic_scores[f'{subject}_Quiz']
-            tugas_score = academic_scores[f'{subject}_Tugas']
-        else:
-            quiz_score = academic_scores[f'{subject}_Quiz']
-            tugas_score = academic_scores[f'{subject}_Tugas']
+    # Proyeksi tren untuk seluruh batch sekaligus, dirata-rata per mapel (kuis + tugas)
+    projection = score_trends.project([info['nis'] for info in student_infos], scores)
+    projected = projection['projected'].mean(axis=2)
+    change = projected - summary['averages']
+    confidence = projection['confidence'].max(axis=2)
+    observations = projection['observations'].sum(axis=2)
+    confident = confidence >= TREND_MIN_CONFIDENCE
+    
+    analyses = []
+    recommendation_seconds = 0.0
+    
+    for i, student_info in enumerate(student_infos):
+        analysis = {
+            'nama': student_info['nama_lengkap'],
+            'nis': student_info['nis'],
+            'kelas': student_info['kelas'],
+            'gender': student_info['gender'],
+            'email': student_info.get('email', 'N/A'),
+            'data_source': student_info['source'],
+            'scores': {},
+            'performance_trends': {},
+            'recommendations': [],
+            'strengths': [],
+            'improvements': []
+        }
         
-        avg_score = (quiz_score + tugas_score) / 2
+        # Analisis detail per mata pelajaran
+        for s, subject in enumerate(SUBJECTS):
+            analysis['scores'][subject] = {
+                'quiz': float(scores[i, s, 0]),
+                'tugas': float(scores[i, s, 1]),
+                'rata_rata': float(summary['averages'][i, s]),
+                'nama_mapel': SUBJECT_NAMES[subject]
+            }
+            
+            if confident[i, s] and change[i, s] >= TREND_MIN_CHANGE:
+                direction = 'naik'
+            elif confident[i, s] and change[i, s] <= -TREND_MIN_CHANGE:
+                direction = 'turun'
+            else:
+                direction = 'stabil'
+            analysis['performance_trends'][subject] = {
+                'arah': direction,
+                'perubahan': round(float(change[i, s]), 2),
+                'proyeksi': round(float(projected[i, s]), 2),
+                'confidence': round(float(confidence[i, s]), 3),
+                'observasi': int(observations[i, s]),
+                'horizon_hari': score_trends.horizon_days
+            }
+            
+            # Klasifikasi performa
+            if summary['strengths'][i, s]:
+                analysis['strengths'].append(SUBJECT_NAMES[subject])
+            elif summary['improvements'][i, s]:
+                analysis['improvements'].append(SUBJECT_NAMES[subject])
         
-        analysis['scores'][subject] = {
-            'quiz': quiz_score,
-            'tugas': tugas_score,
-            'rata_rata': avg_score,
-            'nama_mapel': subject_names[subject]
+        # Statistik keseluruhan
+        analysis['overall_stats'] = {
+            'rata_rata_kuis': float(summary['rata_rata_kuis'][i]),
+            'rata_rata_tugas': float(summary['rata_rata_tugas'][i]),
+            'rata_rata_keseluruhan': float(summary['rata_rata_keseluruhan'][i]),
+            'proyeksi_keseluruhan': round(float(projected[i].mean()), 2),
+            'confidence_proyeksi': round(float(confidence[i].max()), 3)
         }
         
-        total_quiz += quiz_score
-        total_tugas += tugas_score
-        subject_averages.append((subject, avg_score))
+        # Identifikasi pola
+        analysis['terkuat'] = SUBJECT_NAMES[SUBJECTS[summary['terkuat'][i]]]
+        analysis['terlemah'] = SUBJECT_NAMES[SUBJECTS[summary['terlemah'][i]]]
         
-        # Klasifikasi performa
-        if avg_score >= 85:
-            analysis['strengths'].append(subject_names[subject])
-        elif avg_score < 75:
-            analysis['improvements'].append(subject_names[subject])
-    
-    # Statistik keseluruhan
-    analysis['overall_stats'] = {
-        'rata_rata_kuis': total_quiz / len(subjects),
-        'rata_rata_tugas': total_tugas / len(subjects),
-        'rata_rata_keseluruhan': (total_quiz + total_tugas) / (len(subjects) * 2)
-    }
+        # Prediksi dan rekomendasi berdasarkan data chart
+        recommendation_started = time.perf_counter()
+        analysis['predictions'] = generate_learning_predictions(analysis)
+        analysis['chart_recommendations'] = generate_chart_based_recommendations(analysis)
+        recommendation_seconds += time.perf_counter() - recommendation_started
+        
+        analyses.append(analysis)
+    
+    analysis_stage_seconds.observe(time.perf_counter() - started - recommendation_seconds, stage='scoring')
+    analysis_stage_seconds.observe(recommendation_seconds, stage='recommendations')
+    return analyses
+
+# Fungsi analisis mendalam performa siswa - Enhanced dengan database
+def get_detailed_student_analysis(nis):
+    """Get detailed student analysis from database + generated academic data"""
+    
+    # First, try to get student from database
+    with analysis_stage_seconds.time(stage='db_lookup'):
+        student_from_db = db_manager.get_student_by_nis(nis)
+    
+    with analysis_stage_seconds.time(stage='db_scores' if student_from_db else 'csv_fallback'):
+        resolved = resolve_student(nis, student_from_db)
+    if not resolved:
+        return None
+    
+    student_info, student_scores = resolved
+    return build_student_analyses([student_info], student_scores[np.newaxis])[0]
+
+# Analisis banyak siswa dengan satu query database
+def get_batch_student_analysis(nis_list):
+    """Return (analyses, not_found) for a list of NIS, matching the single-student output"""
+    nis_list = list(dict.fromkeys(str(nis) for nis in nis_list))
+    with analysis_stage_seconds.time(stage='db_lookup'):
+        students_from_db = db_manager.get_students_by_nis(nis_list)
+    
+    student_infos = []
+    student_scores = []
+    not_found = []
+    for nis in nis_list:
+        resolved = resolve_student(nis, students_from_db.get(nis))
+        if not resolved:
+            not_found.append(nis)
+            continue
+        student_infos.append(resolved[0])
+        student_scores.append(resolved[1])
+    
+    if not student_infos:
+        return [], not_found
+    return build_student_analyses(student_infos, np.stack(student_scores)), not_found
+
+# Export analisis seluruh roster per batch: memori tetap satu batch berapa pun ukuran roster
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_MAX_BATCH_SIZE = 10000
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+EXPORT_CSV_COLUMNS = [
+    'nis', 'nama', 'kelas', 'gender', 'email', 'data_source',
+    'rata_rata_kuis', 'rata_rata_tugas', 'rata_rata_keseluruhan', 'proyeksi_keseluruhan', 'confidence_proyeksi',
+    'terkuat', 'terlemah', 'strengths', 'improvements'
+] + [f'{subject}_{field}' for subject in SUBJECTS for field in ('quiz', 'tugas', 'rata_rata', 'tren')]
+
+def parse_export_request(args):
+    """(format, kelas, batch_size) dari query string {nama: [nilai]}; ValueError jika tidak valid"""
+    fmt = (args.get('format') or ['ndjson'])[0].lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format harus salah satu dari: {', '.join(EXPORT_FORMATS)}")
+    # ?kelas=5A&kelas=5B atau ?kelas=5A,5B
+    kelas = [value.strip() for values in args.get('kelas', []) for value in values.split(',') if value.strip()]
+    try:
+        batch_size = int((args.get('batch_size') or [EXPORT_BATCH_SIZE])[0])
+    except ValueError:
+        raise ValueError("batch_size harus bilangan bulat") from None
+    return fmt, kelas or None, min(EXPORT_MAX_BATCH_SIZE, max(1, batch_size))
+
+def iter_database_analysis_batches(rows_batches):
+    for rows in rows_batches:
+        nis_list = [str(row['nis']).strip() for row in rows]
+        student_infos = [{
+            'nis': nis,
+            'nama_lengkap': row['nama_lengkap'],
+            'kelas': row.get('kelas') or 'A',  # classes.grade, default 'A' seperti score loader
+            'gender': 'Unknown',
+            'email': row['email'],
+            'no_telepon': row.get('no_telepon', 'N/A'),
+            'source': 'Database'
+        } for nis, row in zip(nis_list, rows)]
+        yield build_student_analyses(student_infos, db_score_loader.scores_for_many(nis_list))
+
+def iter_snapshot_analysis_batches(snapshot, kelas, batch_size):
+    store = snapshot.store
+    rows = np.flatnonzero(np.isin(store.kelas, kelas)) if kelas else np.arange(len(store))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        student_infos = [{
+            'nis': str(store.nis[row]),
+            'nama_lengkap': store.names[row],
+            'kelas': store.kelas[row],
+            'gender': store.gender[row],
+            'email': 'N/A',
+            'source': 'CSV'
+        } for row in batch]
+        yield build_student_analyses(student_infos, store.scores[batch])
+
+def iter_student_analysis_batches(kelas=None, batch_size=EXPORT_BATCH_SIZE):
+    """Return (sumber, generator list analisis per batch)
     
-    # Identifikasi pola
-    subject_averages.sort(key=lambda x: x[1], reverse=True)
-    analysis['terkuat'] = subject_names[subject_averages[0][0]]
-    analysis['terlemah'] = subject_names[subject_averages[-1][0]]
+    Sumber utama cursor server-side database (skor dari db_score_loader); jika database tidak bisa
+    dibuka atau tidak punya siswa yang cocok, roster snapshot CSV yang aktif saat export dimulai.
+    """
+    snapshot = current_data()
+    batches = db_manager.iter_students(kelas, batch_size)
+    try:
+        first = next(batches, None)
+    except Exception as e:
+        print(f"⚠️  Export from database unavailable, using CSV snapshot: {e}")
+        return 'csv', iter_snapshot_analysis_batches(snapshot, kelas, batch_size)
+    if not first:
+        batches.close()
+        return 'csv', iter_snapshot_analysis_batches(snapshot, kelas, batch_size)
     
-    # Prediksi dan rekomendasi berdasarkan data chart
-    analysis['predictions'] = generate_learning_predictions(analysis)
-    analysis['chart_recommendations'] = generate_chart_based_recommendations(analysis)
+    def chained():
+        yield first
+        yield from batches
+    return 'database', iter_database_analysis_batches(chained())
+
+def format_export_csv_rows(analyses):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for analysis in analyses:
+        stats = analysis['overall_stats']
+        row = [
+            analysis['nis'], analysis['nama'], analysis['kelas'], analysis['gender'], analysis['email'],
+            analysis['data_source'], stats['rata_rata_kuis'], stats['rata_rata_tugas'],
+            stats['rata_rata_keseluruhan'], stats['proyeksi_keseluruhan'], stats['confidence_proyeksi'],
+            analysis['terkuat'], analysis['terlemah'], ';'.join(analysis['strengths']), ';'.join(analysis['improvements'])
+        ]
+        for subject in SUBJECTS:
+            score = analysis['scores'][subject]
+            row += [score['quiz'], score['tugas'], score['rata_rata'], analysis['performance_trends'][subject]['arah']]
+        writer.writerow(row)
+    return buffer.getvalue()
+
+def export_student_analyses(fmt='ndjson', kelas=None, batch_size=EXPORT_BATCH_SIZE):
+    """Generator potongan teks per batch: NDJSON (satu analisis per baris) atau CSV dengan header
+    
+    Hasil tidak masuk analysis cache. Jika gagal di tengah stream, NDJSON ditutup dengan satu baris
+    {"error": ...}; CSV berhenti (header sudah terkirim, status tidak bisa diubah lagi).
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_CSV_COLUMNS)
+        yield buffer.getvalue()
     
+    try:
+        source, batches = iter_student_analysis_batches(kelas, batch_size)
+        for analyses in batches:
+            if fmt == 'csv':
+                chunk = format_export_csv_rows(analyses)
+            else:
+                chunk = ''.join(json.dumps(analysis, ensure_ascii=False, default=str) + '\n' for analysis in analyses)
+            export_rows_total.inc(len(analyses), format=fmt, source=source)
+            yield chunk
+    except Exception as e:
+        print(f"❌ Student export failed: {e}")
+        if fmt == 'ndjson':
+            yield json.dumps({'error': 'Export terhenti karena kesalahan server'}, ensure_ascii=False) + '\n'
+
+# Analisis siswa lewat cache; key menyertakan versi data sehingga update roster tidak menyajikan data basi
+def get_cached_student_analysis(nis):
+    version = current_data().data_version
+    # Generasi diambil sebelum komputasi: invalidasi (NOTIFY/refresh DB) di tengah jalan membatalkan put,
+    # dan request setelah invalidasi tidak bergabung ke flight yang membaca data lama
+    generation = analysis_cache.generation(nis)
+    analysis = analysis_cache.get(nis, version)
+    if analysis is None:
+        analysis, _ = analysis_flights.do(
+            (str(nis), version, generation),
+            lambda: compute_student_analysis(nis, version, generation)
+        )
     return analysis
 
-# Fungsi prediksi berdasarkan pola belajar (simulasi data chart)
+def compute_student_analysis(nis, version, generation=None):
+    # Cek ulang: flight sebelumnya bisa selesai di antara cache miss dan masuk single-flight
+    analysis = analysis_cache.peek(nis, version)
+    if analysis is None:
+        analysis = get_detailed_student_analysis(nis)
+        if analysis is not None:
+            analysis_cache.put(nis, version, analysis, generation)
+    return analysis
+
+# Mapel dengan tren cukup meyakinkan ke arah tertentu, diurutkan dari perubahan terbesar
+def trending_subjects(student_analysis, direction):
+    trends = [
+        (trend['perubahan'], SUBJECT_NAMES[subject])
+        for subject, trend in student_analysis['performance_trends'].items()
+        if trend['arah'] == direction
+    ]
+    trends.sort(reverse=(direction == 'naik'))
+    return [name for _, name in trends]
+
+# Fungsi prediksi berdasarkan proyeksi tren nilai (fallback ke nilai saat ini jika belum ada tren)
 def generate_learning_predictions(student_analysis):
     predictions = {
         'durasi_belajar_optimal': '',
@@ -267,7 +787,11 @@ def generate_learning_predictions(student_analysis):
         'strategi_belajar': ''
     }
     
-    overall_avg = student_analysis['overall_stats']['rata_rata_keseluruhan']
+    stats = student_analysis['overall_stats']
+    has_trend = stats.get('confidence_proyeksi', 0) >= TREND_MIN_CONFIDENCE
+    # Dengan tren yang meyakinkan, target disusun dari nilai proyeksi, bukan hanya nilai saat ini
+    overall_avg = stats['proyeksi_keseluruhan'] if has_trend else stats['rata_rata_keseluruhan']
+    declining = trending_subjects(student_analysis, 'turun')
     
     # Prediksi durasi belajar optimal berdasarkan performa
     if overall_avg >= 85:
@@ -277,14 +801,15 @@ def generate_learning_predictions(student_analysis):
     else:
         predictions['durasi_belajar_optimal'] = "Disarankan 60-90 menit per hari dengan metode pomodoro (25 menit belajar, 5 menit istirahat)"
     
-    # Prioritas mata pelajaran
-    if student_analysis['improvements']:
-        predictions['mata_pelajaran_prioritas'] = f"Fokus pada {', '.join(student_analysis['improvements'][:2])} dalam 2 minggu ke depan"
+    # Prioritas mata pelajaran: mapel yang nilainya menurun didahulukan
+    priority = list(dict.fromkeys(declining + student_analysis['improvements']))
+    if priority:
+        predictions['mata_pelajaran_prioritas'] = f"Fokus pada {', '.join(priority[:2])} dalam 2 minggu ke depan"
     else:
         predictions['mata_pelajaran_prioritas'] = f"Pertahankan performa di semua mapel, tingkatkan {student_analysis['terlemah']} untuk excellence"
     
     # Strategi belajar
-    weak_count = len(student_analysis['improvements'])
+    weak_count = len(priority)
     if weak_count >= 3:
         predictions['strategi_belajar'] = "Gunakan metode SQ3R (Survey, Question, Read, Recite, Review) dan buat jadwal harian"
     elif weak_count >= 1:
@@ -292,6 +817,13 @@ def generate_learning_predictions(student_analysis):
     else:
         predictions['strategi_belajar'] = "Kembangkan kemampuan critical thinking dan problem solving"
     
+    if has_trend:
+        change = stats['proyeksi_keseluruhan'] - stats['rata_rata_keseluruhan']
+        predictions['proyeksi_nilai'] = (
+            f"Perkiraan rata-rata {score_trends.horizon_days:.0f} hari ke depan: {stats['proyeksi_keseluruhan']:.1f} "
+            f"({change:+.1f} poin, confidence {stats['confidence_proyeksi']:.0%})"
+        )
+    
     return predictions
 
 # Fungsi rekomendasi berdasarkan analisis chart dashboard - Enhanced
@@ -384,56 +916,538 @@ def generate_chart_based_recommendations(student_analysis):
             'priority': 'Excellence'
         })
     
+    # Rekomendasi berdasarkan proyeksi tren nilai per mata pelajaran
+    declining = trending_subjects(student_analysis, 'turun')
+    improving = trending_subjects(student_analysis, 'naik')
+    horizon = f"{score_trends.horizon_days:.0f} hari"
+    if declining:
+        trend = next(t for subject, t in student_analysis['performance_trends'].items()
+                     if SUBJECT_NAMES[subject] == declining[0])
+        recommendations.append({
+            'chart': 'Tren Nilai',
+            'insight': f'Nilai {", ".join(declining[:3])} cenderung menurun; {declining[0]} diperkirakan {trend["proyeksi"]:.1f} ({trend["perubahan"]:+.1f} poin) dalam {horizon}',
+            'action': f'Cegah penurunan: review materi {declining[0]} yang terakhir dipelajari 20 menit/hari dan konsultasikan kesulitan dengan guru',
+            'timeline': horizon,
+            'priority': 'Tinggi'
+        })
+    elif improving:
+        recommendations.append({
+            'chart': 'Tren Nilai',
+            'insight': f'Nilai {", ".join(improving[:3])} terus meningkat, pertahankan momentum',
+            'action': f'Lanjutkan cara belajar {improving[0]} saat ini dan terapkan pada mapel terlemah ({student_analysis["terlemah"]})',
+            'timeline': horizon,
+            'priority': 'Enhancement'
+        })
+    
     return recommendations
 
-# Fungsi OpenAI Chat - Compatible dengan versi lama dan baru
-def get_openai_response(messages, student_data=None):
-    if not openai_client:
-        return "Maaf, layanan AI sedang tidak tersedia. Coba tanyakan tips belajar umum! 🤖"
-    
+# Router intent terkompilasi untuk /api/dataset/query (jawaban dari agregat kohort + score store)
+intent_router = build_default_router()
+
+# Parameter completion yang dipakai mode biasa dan streaming
+OPENAI_CHAT_MODEL = "gpt-4o"
+OPENAI_MAX_TOKENS = 500
+OPENAI_TEMPERATURE = 0.7
+
+# Konteks siswa di system prompt: ringkasan ringkas dengan budget token ('json' = dump analisis penuh)
+CHAT_CONTEXT_MODE = os.getenv('CHAT_CONTEXT_MODE', 'compact')
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', '200'))
+
+OPENAI_ERROR_MESSAGE = "Maaf, saya sedang belajar juga! 🤖 Coba tanya yang lain ya!"
+OPENAI_UNAVAILABLE_MESSAGE = "Maaf, layanan AI sedang tidak tersedia. Coba tanyakan tips belajar umum! 🤖"
+OPENAI_INCOMPATIBLE_MESSAGE = "OpenAI client tidak kompatibel. Silakan update library openai."
+OPENAI_BUSY_MESSAGE = "RoGrow sedang membantu banyak teman sekarang. Coba tanya lagi sebentar lagi ya! ⏳"
+
+# Jawaban fallback tidak boleh masuk response cache
+OPENAI_FALLBACK_MESSAGES = {
+    OPENAI_ERROR_MESSAGE, OPENAI_UNAVAILABLE_MESSAGE, OPENAI_INCOMPATIBLE_MESSAGE, OPENAI_BUSY_MESSAGE
+}
+
+# Semua panggilan OpenAI lewat scheduler: budget request/menit + token/menit (sesuai limit akun),
+# antrian prioritas (chat interaktif > ringkasan > batch) dan retry 429 mengikuti Retry-After
+llm_scheduler = LLMScheduler(
+    requests_per_minute=int(os.getenv('OPENAI_RPM_LIMIT', '500')),
+    tokens_per_minute=int(os.getenv('OPENAI_TPM_LIMIT', '30000')),
+    max_queue=int(os.getenv('LLM_SCHEDULER_MAX_QUEUE', '256')),
+    queue_timeout=float(os.getenv('LLM_SCHEDULER_TIMEOUT', '30')),
+    max_retries=int(os.getenv('LLM_SCHEDULER_RETRIES', '3')),
+    on_wait=lambda priority, seconds: llm_queue_wait_seconds.observe(seconds, priority=priority),
+    on_retry=lambda status: llm_retries_total.inc(status=status)
+)
+
+# Circuit breaker per panggilan provider (di dalam scheduler): error 5xx/timeout atau respons lambat
+# di atas ambang membuka circuit; selama open chat dijawab lokal dalam milidetik, lalu half-open
+# mengirim probe untuk memulihkan
+llm_breaker = CircuitBreaker(
+    name='openai',
+    failure_rate=float(os.getenv('LLM_BREAKER_FAILURE_RATE', '0.5')),
+    window=int(os.getenv('LLM_BREAKER_WINDOW', '20')),
+    min_calls=int(os.getenv('LLM_BREAKER_MIN_CALLS', '5')),
+    slow_call_seconds=float(os.getenv('LLM_BREAKER_SLOW_SECONDS', '10')),
+    open_seconds=float(os.getenv('LLM_BREAKER_OPEN_SECONDS', '15')),
+    half_open_probes=int(os.getenv('LLM_BREAKER_HALF_OPEN_PROBES', '1')),
+    on_transition=lambda previous, state: llm_circuit_transitions_total.inc(to=state)
+)
+
+def is_provider_failure(error):
+    """Error yang menandakan provider bermasalah: 5xx, timeout/koneksi; 4xx (termasuk 429) tidak dihitung"""
+    status = status_of(error)
+    return status is None or status >= 500 or status == 408
+
+def guarded_llm_call(func):
+    """func() lewat circuit breaker; dipakai sebagai fungsi yang dijadwalkan llm_scheduler"""
+    return lambda: llm_breaker.call(func, is_provider_failure)
+
+def local_chat_fallback(messages, student_data=None):
+    """Jawaban tanpa LLM saat circuit open; return (jawaban, sumber)
+
+    Urutan: intent dataset, tips belajar offline, analisis siswa bertemplate, jawaban cache untuk
+    percakapan yang sama tanpa konteks siswa, lalu pesan statis.
+    """
+    question = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
     try:
-        system_message = """You are RoGrow, a friendly AI learning assistant for MindaGrow educational platform. 
+        if question:
+            snapshot = current_data()
+            intent, _, answer = route_question(question.lower(), snapshot.aggregates, snapshot.store)
+            if intent != 'fallback':
+                return answer, 'intent'
+            index = get_study_tips_index()
+            matches = index.search(question, limit=1) if index is not None else []
+            if matches and matches[0][0] >= STUDY_TIPS_CONTEXT_THRESHOLD:
+                return matches[0][1]['jawaban'], 'study_tips'
+        if student_data and 'overall_stats' in student_data:
+            return format_student_analysis_response(student_data), 'analysis'
+        cached = chat_response_cache.get(messages, None)
+        if cached:
+            return cached[0], 'cache'
+    except Exception as e:
+        print(f"❌ Local chat fallback error: {e}")
+    return OPENAI_UNAVAILABLE_MESSAGE, 'static'
+
+def estimate_llm_tokens(openai_messages, max_tokens=None):
+    """Reservasi token/menit: estimasi prompt + batas completion"""
+    return count_message_tokens(openai_messages) + (OPENAI_MAX_TOKENS if max_tokens is None else max_tokens)
+
+def total_tokens_of(response):
+    usage = usage_from_response(response)
+    return usage['total_tokens'] if usage else None
+
+# Cache jawaban chat untuk prompt berulang (sapaan, tips belajar, dll)
+similarity_threshold = os.getenv('CHAT_CACHE_SIMILARITY')
+chat_response_cache = ChatResponseCache(
+    max_size=int(os.getenv('CHAT_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('CHAT_CACHE_TTL', '3600')),
+    similarity_threshold=float(similarity_threshold) if similarity_threshold else None
+)
+
+# Tips belajar offline: TF-IDF atas korpus kurasi, index .npz di-build sekali dan disimpan
+STUDY_TIPS = os.getenv('STUDY_TIPS', '1') == '1'
+study_tips_corpus_path = os.getenv('STUDY_TIPS_CORPUS') or os.path.join(current_dir, 'dataChatBot', 'tips_belajar.csv')
+study_tips_index_path = os.getenv('STUDY_TIPS_INDEX') or os.path.join(current_dir, 'dataChatBot', 'bundle', 'study_tips.npz')
+# Skor cosine: >= answer dijawab langsung, >= context potongannya dikirim ke LLM
+STUDY_TIPS_ANSWER_THRESHOLD = float(os.getenv('STUDY_TIPS_ANSWER_THRESHOLD', '0.55'))
+STUDY_TIPS_CONTEXT_THRESHOLD = float(os.getenv('STUDY_TIPS_CONTEXT_THRESHOLD', '0.3'))
+STUDY_TIPS_CONTEXT_LIMIT = int(os.getenv('STUDY_TIPS_CONTEXT_LIMIT', '2'))
+
+_study_tips_index = None
+_study_tips_index_loaded = False
+_study_tips_index_lock = threading.Lock()
+
+def get_study_tips_index():
+    """Index tips dimuat (atau di-build) saat pertama dipakai, None jika nonaktif atau gagal"""
+    global _study_tips_index, _study_tips_index_loaded
+    if _study_tips_index_loaded:
+        return _study_tips_index
+    
+    with _study_tips_index_lock:
+        if not _study_tips_index_loaded:
+            if STUDY_TIPS:
+                try:
+                    with startup_report.timed('study tips index'):
+                        _study_tips_index = load_study_tips_index(study_tips_corpus_path, study_tips_index_path)
+                except Exception as e:
+                    print(f"❌ Study tips index unavailable: {e}")
+            _study_tips_index_loaded = True
+    return _study_tips_index
+
+def retrieve_study_tips(messages, student_data=None):
+    """Cari tips untuk pesan user terakhir; None jika tidak ada yang relevan
+    
+    Dijawab langsung (answer) hanya untuk pertanyaan pertama tanpa konteks siswa: percakapan
+    lanjutan dan analisis per NIS tetap ke LLM, dengan potongan tips di prompt (references).
+    """
+    index = get_study_tips_index()
+    question = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    if index is None or not question:
+        return None
+    
+    matches = [
+        (score, document) for score, document in index.search(question, limit=STUDY_TIPS_CONTEXT_LIMIT)
+        if score >= STUDY_TIPS_CONTEXT_THRESHOLD
+    ]
+    if not matches:
+        study_tips_total.inc(outcome='miss')
+        return None
+    
+    first_question = all(m.get('role') == 'user' for m in messages) and len(messages) == 1
+    answer = matches[0][0] >= STUDY_TIPS_ANSWER_THRESHOLD and first_question and not student_data
+    outcome = 'answer' if answer else 'context'
+    study_tips_total.inc(outcome=outcome)
+    return {
+        'answer': matches[0][1]['jawaban'] if answer else None,
+        'references': None if answer else [document for _, document in matches],
+        'metadata': {
+            'outcome': outcome,
+            'matches': [{'id': document['id'], 'score': round(score, 3)} for score, document in matches]
+        }
+    }
+
+def build_openai_messages(messages, student_data=None, references=None):
+    system_message = """You are RoGrow, a friendly AI learning assistant for MindaGrow educational platform. 
         You help students aged 6-12 with learning guidance, study tips, and motivation. 
         Always respond in Indonesian language with encouraging and child-friendly tone.
         Use relevant emojis to make responses engaging.
         Focus on positive reinforcement and practical learning strategies.
         Never give direct answers to homework - instead provide learning methods and tips."""
-        
-        if student_data:
+    
+    if student_data:
+        if CHAT_CONTEXT_MODE == 'json':
             system_message += f"\n\nStudent Data Context: {json.dumps(student_data, ensure_ascii=False)}"
+        else:
+            context = compact_student_context(student_data, CHAT_CONTEXT_TOKEN_BUDGET)
+            system_message += f"\n\nStudent Data Context:\n{context}"
+    
+    if references:
+        tips = "\n\n".join(f"[{document['topik']}]\n{document['jawaban']}" for document in references)
+        system_message += f"\n\nRoGrow Study Tips (use them if relevant to the question):\n{tips}"
+    
+    return [
+        {"role": "system", "content": system_message},
+        *messages
+    ]
+
+def openai_request_kwargs(messages, student_data=None, references=None, stream=False):
+    """Argumen chat completion; sama untuk jalur sync (app) dan async (asgi_app)"""
+    request_kwargs = dict(
+        model=OPENAI_CHAT_MODEL,
+        messages=build_openai_messages(messages, student_data, references),
+        max_tokens=OPENAI_MAX_TOKENS,
+        temperature=OPENAI_TEMPERATURE
+    )
+    if stream:
+        request_kwargs.update(stream=True, stream_options={"include_usage": True})
+    return request_kwargs
+
+def openai_failure_message(error, mode, started):
+    """Pesan untuk siswa saat panggilan OpenAI gagal; CircuitOpenError diteruskan agar pemanggil menjawab lokal"""
+    if isinstance(error, CircuitOpenError):
+        # Circuit terbuka saat request menunggu giliran di scheduler
+        raise error
+    if isinstance(error, LLMSchedulerRejected):
+        print(f"⚠️  OpenAI call not scheduled: {error}")
+        record_openai_call(mode, time.perf_counter() - started, error=f'scheduler_{error.reason}')
+        return OPENAI_BUSY_MESSAGE
+    print(f"OpenAI API Error: {error}")
+    record_openai_call(mode, time.perf_counter() - started, error=type(error).__name__)
+    return OPENAI_ERROR_MESSAGE
+
+# Fungsi OpenAI Chat - Compatible dengan versi lama dan baru
+def get_openai_response(messages, student_data=None, priority='interactive', references=None):
+    """Jawaban OpenAI (atau pesan fallback); CircuitOpenError diteruskan agar pemanggil menjawab lokal"""
+    openai_client = get_openai_client()
+    if not openai_client:
+        return OPENAI_UNAVAILABLE_MESSAGE
+    
+    # Circuit open: tolak sebelum antri budget scheduler
+    llm_breaker.check()
+    started = time.perf_counter()
+    try:
+        request_kwargs = openai_request_kwargs(messages, student_data, references)
         
         # Try new OpenAI client first
         if hasattr(openai_client, 'chat') and hasattr(openai_client.chat, 'completions'):
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    *messages
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        
+            create, usage = openai_client.chat.completions.create, total_tokens_of
         # Fallback to old OpenAI API
         elif hasattr(openai_client, 'ChatCompletion'):
-            response = openai_client.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    *messages
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        
+            create, usage = openai_client.ChatCompletion.create, None
         else:
-            return "OpenAI client tidak kompatibel. Silakan update library openai."
+            return OPENAI_INCOMPATIBLE_MESSAGE
+        
+        response = llm_scheduler.call(
+            guarded_llm_call(lambda: create(**request_kwargs)),
+            estimate_llm_tokens(request_kwargs['messages']),
+            priority=priority,
+            usage=usage
+        )
+        record_openai_call('complete', time.perf_counter() - started, usage_from_response(response))
+        return response.choices[0].message.content
+    except Exception as e:
+        return openai_failure_message(e, 'complete', started)
+
+class OpenAIStreamRecorder:
+    """Usage, timing dan error satu streaming completion; dipakai jalur sync (app) dan async (asgi_app)
+    
+    Pemanggil hanya mengiterasi chunk: content(chunk) -> teks delta, fail(error) -> teks pengganti
+    (None jika jawaban sudah mulai terkirim), done() -> payload event 'done' sekaligus metrik panggilan.
+    """
+    
+    def __init__(self, mode, messages, student_data=None):
+        self.mode = mode
+        self.messages = messages
+        self.student_data = student_data
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.usage = None
+        self.error = None
+        self.fallback = None
+    
+    def unavailable(self):
+        self.error = 'not_configured'
+        return OPENAI_UNAVAILABLE_MESSAGE
+    
+    def content(self, chunk):
+        if getattr(chunk, 'usage', None):
+            self.usage = {
+                'prompt_tokens': chunk.usage.prompt_tokens,
+                'completion_tokens': chunk.usage.completion_tokens,
+                'total_tokens': chunk.usage.total_tokens
+            }
+        if not chunk.choices:
+            return None
+        content = chunk.choices[0].delta.content
+        if content and self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return content
+    
+    def fail(self, error):
+        if isinstance(error, CircuitOpenError):
+            self.error = 'circuit_open'
+            answer, self.fallback = local_chat_fallback(self.messages, self.student_data)
+            chat_fallback_total.inc(source=self.fallback)
+            return answer
+        if isinstance(error, LLMSchedulerRejected):
+            print(f"⚠️  OpenAI stream not scheduled: {error}")
+            self.error = f'scheduler_{error.reason}'
+            return OPENAI_BUSY_MESSAGE
+        print(f"OpenAI API Error (stream): {error}")
+        self.error = type(error).__name__
+        return OPENAI_ERROR_MESSAGE if self.first_token_at is None else None
+    
+    def done(self):
+        finished = time.perf_counter()
+        if self.error not in ('not_configured', 'circuit_open'):
+            record_openai_call(self.mode, finished - self.started, self.usage, self.error)
+        done = {
+            'usage': self.usage,
+            'timing': {
+                'first_token_ms': round((self.first_token_at - self.started) * 1000, 1) if self.first_token_at else None,
+                'total_ms': round((finished - self.started) * 1000, 1)
+            },
+            'error': self.error
+        }
+        if self.fallback:
+            done['fallback'] = {'source': self.fallback, 'circuit': llm_breaker.state}
+        return done
+
+# Streaming completion: yield ('delta', teks) lalu satu ('done', info usage + timing)
+def stream_openai_response(messages, student_data=None, references=None):
+    recorder = OpenAIStreamRecorder('stream', messages, student_data)
+    openai_client = get_openai_client()
+    if not openai_client:
+        yield 'delta', recorder.unavailable()
+    else:
+        try:
+            llm_breaker.check()
+            request_kwargs = openai_request_kwargs(messages, student_data, references, stream=True)
             
+            def open_stream():
+                try:
+                    return openai_client.chat.completions.create(**request_kwargs)
+                except TypeError:
+                    # SDK lama belum mengenal stream_options
+                    request_kwargs.pop('stream_options')
+                    return openai_client.chat.completions.create(**request_kwargs)
+            
+            # 429 muncul saat membuka stream, sebelum token pertama: retry aman di titik ini
+            stream = llm_scheduler.call(guarded_llm_call(open_stream), estimate_llm_tokens(request_kwargs['messages']))
+            
+            for chunk in stream:
+                content = recorder.content(chunk)
+                if content:
+                    yield 'delta', content
+        except Exception as e:
+            message = recorder.fail(e)
+            if message:
+                yield 'delta', message
+    
+    yield 'done', recorder.done()
+
+# Ringkasan percakapan lama lewat OpenAI (model murah); None = pakai ringkasan lokal
+CHAT_SUMMARY_MODEL = os.getenv('CHAT_SUMMARY_MODEL', 'gpt-4o-mini')
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', '200'))
+
+def summarize_conversation(previous_summary, turns):
+    openai_client = get_openai_client()
+    if not openai_client:
+        return None
+    
+    transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in turns)
+    started = time.perf_counter()
+    summary_messages = [
+        {"role": "system", "content": "Ringkas percakapan antara siswa dan RoGrow dalam bahasa Indonesia, maksimal 80 kata. Simpan topik, pertanyaan penting, dan saran yang sudah diberikan."},
+        {"role": "user", "content": f"Ringkasan sebelumnya: {previous_summary or '-'}\n\nPesan baru:\n{transcript}"}
+    ]
+    try:
+        # Prioritas di bawah chat interaktif: ringkasan boleh menunggu saat budget menipis
+        response = llm_scheduler.call(
+            guarded_llm_call(lambda: openai_client.chat.completions.create(
+                model=CHAT_SUMMARY_MODEL,
+                messages=summary_messages,
+                max_tokens=CHAT_SUMMARY_TOKEN_BUDGET,
+                temperature=0.2
+            )),
+            estimate_llm_tokens(summary_messages, CHAT_SUMMARY_TOKEN_BUDGET),
+            priority='background',
+            usage=total_tokens_of
+        )
     except Exception as e:
-        print(f"OpenAI API Error: {e}")
-        return "Maaf, saya sedang belajar juga! 🤖 Coba tanya yang lain ya!"
+        record_openai_call('summary', time.perf_counter() - started, error=type(e).__name__)
+        raise
+    record_openai_call('summary', time.perf_counter() - started, usage_from_response(response))
+    return response.choices[0].message.content
+
+# Riwayat chat dibatasi: N pesan terakhir verbatim, sisanya jadi ringkasan bergulir per session_id
+conversation_history = ConversationHistoryManager(
+    keep_messages=int(os.getenv('CHAT_HISTORY_KEEP_MESSAGES', '8')),
+    token_budget=int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '1500')),
+    summary_token_budget=CHAT_SUMMARY_TOKEN_BUDGET,
+    summarizer=summarize_conversation
+)
+
+# Bagian chat di luar panggilan LLM, dipakai route Flask dan route async asgi_app
+CHAT_ERROR_BODY = {
+    'success': False,
+    'response': 'Maaf, terjadi kesalahan. Coba lagi ya! 😅'
+}
+
+def chat_shortcut(messages, student_data=None, use_cache=True, started=None):
+    """Jawaban tanpa LLM dari response cache lalu tips belajar; return (jawaban, metadata, tips)
+    
+    Jawaban None: pertanyaan perlu LLM, dengan tips['references'] (jika ada) sebagai konteks.
+    """
+    started = started if started is not None else time.perf_counter()
+    if use_cache:
+        cached = chat_response_cache.get(messages, student_data)
+        if cached:
+            return cached[0], {
+                'cache': {'hit': True, 'match': cached[1]},
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }, None
+    
+    tips = retrieve_study_tips(messages, student_data)
+    if tips and tips['answer']:
+        return tips['answer'], {
+            'cache': {'hit': False},
+            'retrieval': tips['metadata'],
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+        }, tips
+    return None, None, tips
+
+def shortcut_done_event(metadata):
+    """Metadata chat_shortcut sebagai event 'done' stream (jawaban dikirim utuh dalam satu delta)"""
+    done = {
+        'usage': None,
+        'timing': {'first_token_ms': metadata['latency_ms'], 'total_ms': metadata['latency_ms']},
+        'error': None
+    }
+    done.update((key, value) for key, value in metadata.items() if key != 'latency_ms')
+    return done
+
+def circuit_fallback_response(messages, student_data, error, started):
+    """Provider sedang bermasalah: jawab lokal dalam milidetik, tidak masuk response cache"""
+    response, source = local_chat_fallback(messages, student_data)
+    chat_fallback_total.inc(source=source)
+    return response, {
+        'cache': {'hit': False},
+        'fallback': {'source': source, 'circuit': error.state, 'retry_after_seconds': round(error.retry_after, 1)},
+        'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+def finish_chat_response(messages, student_data, response, tips, use_cache, started):
+    """Simpan jawaban LLM ke response cache; return metadata cache/token/latensi"""
+    references = tips['references'] if tips else None
+    latency = time.perf_counter() - started
+    if use_cache and response not in OPENAI_FALLBACK_MESSAGES:
+        chat_response_cache.put(messages, student_data, response, latency)
+    metadata = {
+        'cache': {'hit': False},
+        'tokens': token_report(build_openai_messages(messages, student_data, references), response),
+        'latency_ms': round(latency * 1000, 1)
+    }
+    if tips:
+        metadata['retrieval'] = tips['metadata']
+    return metadata
+
+def finish_chat_stream(messages, student_data, answer, done, tips, use_cache, started):
+    """Lengkapi event 'done' stream LLM dengan info cache/token; jawaban utuh masuk response cache"""
+    references = tips['references'] if tips else None
+    if use_cache and not done['error']:
+        chat_response_cache.put(messages, student_data, answer, time.perf_counter() - started)
+    done['cache'] = {'hit': False}
+    done['tokens'] = token_report(build_openai_messages(messages, student_data, references), answer)
+    if tips:
+        done['retrieval'] = tips['metadata']
+    return done
+
+# Chat lewat response cache; return (jawaban, metadata cache/token/latensi)
+def get_chat_response(messages, student_data=None, use_cache=True):
+    started = time.perf_counter()
+    answer, metadata, tips = chat_shortcut(messages, student_data, use_cache, started)
+    if answer is not None:
+        return answer, metadata
+    
+    try:
+        response = get_openai_response(messages, student_data, references=tips['references'] if tips else None)
+    except CircuitOpenError as e:
+        return circuit_fallback_response(messages, student_data, e, started)
+    return response, finish_chat_response(messages, student_data, response, tips, use_cache, started)
+
+def stream_chat_response(messages, student_data=None, use_cache=True):
+    """stream_openai_response lewat response cache; event 'done' diberi info cache"""
+    started = time.perf_counter()
+    answer, metadata, tips = chat_shortcut(messages, student_data, use_cache, started)
+    if answer is not None:
+        yield 'delta', answer
+        yield 'done', shortcut_done_event(metadata)
+        return
+    
+    parts = []
+    for event, payload in stream_openai_response(messages, student_data, tips['references'] if tips else None):
+        if event == 'delta':
+            parts.append(payload)
+        else:
+            finish_chat_stream(messages, student_data, ''.join(parts), payload, tips, use_cache, started)
+        yield event, payload
+
+def chat_response_body(response, metadata, history_info):
+    return {
+        'success': True,
+        'response': response,
+        **metadata,
+        'history': history_info,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def format_chat_event(event, payload, history_info):
+    """Event stream chat sebagai SSE; event 'done' diberi info riwayat dan timestamp"""
+    if event == 'delta':
+        return format_sse('delta', {'content': payload})
+    payload['history'] = history_info
+    payload['timestamp'] = datetime.now().isoformat()
+    return format_sse('done', payload)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 # ROOT ROUTE
 @app.route('/')
@@ -442,49 +1456,88 @@ def home():
         'status': 'success',
         'message': '🤖 RoGrow Chatbot Service with OpenAI (Secure)',
         'version': '2.0',
-        'openai_status': 'available' if openai_client else 'not configured',
+        'openai_status': 'available' if get_openai_client() else 'not configured',
         'endpoints': {
             '/api/test': 'Test connection',
             '/api/chat': 'Chat with OpenAI (POST)',
+            '/api/chat/stream': 'Chat with OpenAI as Server-Sent Events (POST)',
             '/api/dataset/query': 'Query dataset (POST)',
             '/api/student/<nis>/analysis': 'Detailed student analysis (GET)',
-            '/api/student/<nis>/predictions': 'Learning predictions (GET)'
+            '/api/student/<nis>/predictions': 'Learning predictions (GET)',
+            '/api/students/analysis': 'Batch student analysis by NIS list or kelas (POST)',
+            '/api/students/export': 'Stream every student analysis as NDJSON or CSV; ?format=csv&kelas=5A (GET)',
+            '/api/db/stats': 'Database connection pool statistics (GET)',
+            '/api/llm/stats': 'LLM scheduler queue depth, waits, retries, rate budget and circuit state (GET)',
+            '/api/cohort/summary': 'Precomputed cohort aggregates (GET)',
+            '/api/cohort/clusters': 'Student clusters with centroids; ?members=1 lists NIS per cluster (GET)',
+            '/api/student/<nis>/cluster': 'Cluster membership for one student (GET)',
+            '/api/cache/stats': 'Analysis, chat response cache and study tips index statistics (GET)',
+            '/api/health/live': 'Liveness probe (GET)',
+            '/api/health/ready': 'Readiness probe: dataset loaded, database reachable (GET)',
+            '/api/health/startup': 'Import and init time per component (GET)',
+            '/api/data/snapshot': 'Active data snapshot version, age and reload timing (GET)',
+            '/metrics': 'Prometheus metrics: route/stage/OpenAI latency, tokens, pool and cache gauges (GET)'
         }
     })
 
 # API ROUTES WITH /api PREFIX
+# Ubah body request chat menjadi pesan format OpenAI + konteks siswa (jika ada NIS)
+def parse_chat_request(data):
+    ensure_data_loaded()
+    messages = data.get('messages', [])
+    nis = data.get('nis', None)
+    
+    student_data = None
+    if nis:
+        student_data = get_cached_student_analysis(nis)
+    
+    # Convert messages to OpenAI format
+    openai_messages = []
+    for msg in messages:
+        openai_messages.append({
+            "role": msg.get('role', 'user'),
+            "content": msg.get('content', '')
+        })
+    
+    # Pangkas riwayat panjang; pesan lama dilipat ke ringkasan sesi
+    openai_messages, history_info = conversation_history.prepare(openai_messages, data.get('session_id'))
+    
+    return openai_messages, student_data, history_info
+
 @app.route('/api/chat', methods=['POST'])
 def chat_with_openai():
     try:
         data = request.json
-        messages = data.get('messages', [])
-        nis = data.get('nis', None)
-        
-        student_data = None
-        if nis:
-            student_data = get_detailed_student_analysis(nis)
+        openai_messages, student_data, history_info = parse_chat_request(data)
         
-        # Convert messages to OpenAI format
-        openai_messages = []
-        for msg in messages:
-            openai_messages.append({
-                "role": msg.get('role', 'user'),
-                "content": msg.get('content', '')
-            })
-        
-        response = get_openai_response(openai_messages, student_data)
+        response, metadata = get_chat_response(
+            openai_messages, student_data, use_cache=data.get('cache', True) is not False
+        )
         
-        return jsonify({
-            'success': True,
-            'response': response,
-            'timestamp': datetime.now().isoformat()
-        })
+        return jsonify(chat_response_body(response, metadata, history_info))
     except Exception as e:
         print(f"Error in chat_with_openai: {e}")
-        return jsonify({
-            'success': False,
-            'response': 'Maaf, terjadi kesalahan. Coba lagi ya! 😅'
-        }), 500
+        return jsonify(CHAT_ERROR_BODY), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_with_openai_stream():
+    try:
+        data = request.json
+        openai_messages, student_data, history_info = parse_chat_request(data)
+        use_cache = data.get('cache', True) is not False
+    except Exception as e:
+        print(f"Error in chat_with_openai_stream: {e}")
+        return jsonify(CHAT_ERROR_BODY), 500
+    
+    def generate():
+        for event, payload in stream_chat_response(openai_messages, student_data, use_cache):
+            yield format_chat_event(event, payload, history_info)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/dataset/query', methods=['POST'])
 def query_dataset():
@@ -492,10 +1545,11 @@ def query_dataset():
         data = request.json
         question = data.get('question', '').lower()
         
-        processed_data = preprocess_data()
-        response = get_answer_for_question(question, processed_data)
+        snapshot = current_data()
+        intent, slots, response = route_question(question, snapshot.aggregates, snapshot.store)
         
-        return jsonify({'answer': response})
+        # intent 'fallback' = tidak dikenali, frontend bisa meneruskan ke chat OpenAI
+        return jsonify({'answer': response, 'intent': intent, 'slots': slots})
     except Exception as e:
         print(f"Error in query_dataset: {e}")
         return jsonify({'answer': 'Maaf, terjadi kesalahan saat memproses pertanyaan Anda. 😅'}), 500
@@ -503,7 +1557,7 @@ def query_dataset():
 @app.route('/api/student/<nis>/analysis', methods=['GET'])
 def analyze_student_detailed(nis):
     try:
-        analysis = get_detailed_student_analysis(nis)
+        analysis = get_cached_student_analysis(nis)
         if not analysis:
             return jsonify({'error': 'Siswa tidak ditemukan'}), 404
         
@@ -522,7 +1576,7 @@ def analyze_student_detailed(nis):
 @app.route('/api/student/<nis>/predictions', methods=['GET'])
 def get_student_predictions(nis):
     try:
-        analysis = get_detailed_student_analysis(nis)
+        analysis = get_cached_student_analysis(nis)
         if not analysis:
             return jsonify({'error': 'Siswa tidak ditemukan'}), 404
         
@@ -541,20 +1595,206 @@ def get_student_predictions(nis):
         print(f"Error in get_student_predictions: {e}")
         return jsonify({'error': 'Terjadi kesalahan saat menganalisis prediksi'}), 500
 
+@app.route('/api/students/analysis', methods=['POST'])
+def analyze_students_batch():
+    try:
+        data = request.json or {}
+        nis_list = data.get('nis') or []
+        kelas = data.get('kelas')
+        
+        if kelas:
+            nis_list = list(nis_list) + current_data().store.nis_in_class(kelas)
+        if not nis_list:
+            return jsonify({'error': 'Sertakan daftar nis atau kelas'}), 400
+        
+        analyses, not_found = get_batch_student_analysis(nis_list)
+        
+        return jsonify({
+            'success': True,
+            'count': len(analyses),
+            'data': analyses,
+            'not_found': not_found
+        })
+    except Exception as e:
+        print(f"Error in analyze_students_batch: {e}")
+        return jsonify({'error': 'Terjadi kesalahan saat menganalisis data siswa'}), 500
+
+@app.route('/api/students/export', methods=['GET'])
+def export_students():
+    try:
+        fmt, kelas, batch_size = parse_export_request(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(
+        stream_with_context(export_student_analyses(fmt, kelas, batch_size)),
+        content_type=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=analisis_siswa.{fmt}',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/test', methods=['GET'])
 def test_api():
+    snapshot = current_data()
+    dataset, score_store = snapshot.dataset, snapshot.store
     return jsonify({
         'status': 'success',
         'message': 'RoGrow Backend with OpenAI berhasil terhubung! 🤖',
         'timestamp': datetime.now().isoformat(),
-        'openai_status': 'configured' if openai_client else 'not configured',
+        'openai_status': 'configured' if get_openai_client() else 'not configured',
         'dataset_info': {
-            'jumlah_siswa': len(dataset),
-            'columns': list(dataset.columns)
+            'jumlah_siswa': len(dataset) if dataset is not None else len(score_store),
+            'columns': list(dataset.columns) if dataset is not None else ['NIS', 'Nama Lengkap', 'Kelas', 'Gender'] + score_store.columns
         },
         'security': 'API keys are securely loaded from environment variables'
     })
 
+@app.route('/api/cohort/summary', methods=['GET'])
+def cohort_summary():
+    return jsonify({
+        'status': 'success',
+        'data': current_data().aggregates.to_dict(),
+        'database': db_score_loader.aggregates.to_dict() if db_score_loader.loaded else None
+    })
+
+@app.route('/api/cohort/clusters', methods=['GET'])
+def cohort_clusters():
+    snapshot = cluster_engine.snapshot
+    if snapshot is None:
+        return jsonify({
+            'status': 'pending',
+            'message': 'Clustering sedang diproses, coba lagi sebentar'
+        }), 503
+    
+    data = snapshot.to_dict()
+    if request.args.get('members') == '1':
+        try:
+            limit = min(10000, max(0, int(request.args.get('limit', 100))))
+            offset = max(0, int(request.args.get('offset', 0)))
+        except ValueError:
+            return jsonify({'error': 'limit dan offset harus bilangan bulat'}), 400
+        for cluster in data['clusters']:
+            cluster['members'] = cluster_engine.members(cluster['id'], limit=limit, offset=offset)
+    
+    return jsonify({
+        'status': 'success',
+        'data': data
+    })
+
+@app.route('/api/student/<nis>/cluster', methods=['GET'])
+def get_student_cluster(nis):
+    if cluster_engine.snapshot is None:
+        return jsonify({
+            'status': 'pending',
+            'message': 'Clustering sedang diproses, coba lagi sebentar'
+        }), 503
+    
+    result = cluster_engine.lookup(nis)
+    if result is None:
+        # Siswa database (di luar roster CSV): klaster dihitung dari skornya terhadap centroid terakhir
+        resolved = resolve_student(nis, db_manager.get_student_by_nis(nis))
+        if resolved:
+            result = cluster_engine.lookup(nis, scores=resolved[1])
+    if result is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Siswa dengan NIS {nis} tidak ditemukan'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'nis': nis,
+        'data': result
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'status': 'success',
+        'analysis_cache': analysis_cache.stats(),
+        'analysis_single_flight': analysis_flights.stats(),
+        'chat_response_cache': chat_response_cache.stats(),
+        'study_tips': _study_tips_index.stats() if _study_tips_index is not None else None,
+        'conversation_history': conversation_history.stats(),
+        'db_scores': db_score_loader.stats(),
+        'clusters': cluster_engine.stats(),
+        'score_trends': score_trends.stats(),
+        'data_version': current_data().version,
+        'change_listener': student_change_listener.stats()
+    })
+
+@app.route('/api/db/stats', methods=['GET'])
+def database_stats():
+    return jsonify({
+        'status': 'success',
+        'pool': db_manager.pool_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    return jsonify({
+        'status': 'success',
+        'llm_scheduler': llm_scheduler.stats(),
+        'llm_circuit': llm_breaker.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """Proses hidup dan bisa melayani request (tanpa cek dependency)"""
+    return jsonify({
+        'status': 'alive',
+        'uptime_seconds': startup_report.to_dict()['uptime_seconds']
+    })
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Siap menerima traffic: dataset termuat; database wajib jika READINESS_REQUIRE_DB=1"""
+    data_ready = data_snapshots.ready.is_set()
+    database_ok = db_manager.ping()
+    require_db = os.getenv('READINESS_REQUIRE_DB') == '1'
+    ready = data_ready and (database_ok or not require_db)
+    
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'checks': {
+            'dataset': data_ready,
+            'database': database_ok,
+            'database_required': require_db,
+            'openai_configured': bool(openai_api_key),
+            'llm_circuit': llm_breaker.state,
+            'db_scores_loaded': db_score_loader.loaded
+        },
+        'data_snapshot': data_snapshots.current.to_dict() if data_snapshots.current else None
+    }), 200 if ready else 503
+
+@app.route('/api/data/snapshot', methods=['GET'])
+def data_snapshot_stats():
+    """Versi, umur dan durasi reload snapshot data yang sedang aktif"""
+    data = data_snapshots.stats()
+    # Mode pre-fork: pid worker yang menjawab + blok shared memory yang dibagi semua worker
+    data['pid'] = os.getpid()
+    data['shared_scores'] = shared_scores.stats() if shared_scores is not None else None
+    return jsonify({
+        'status': 'success',
+        'data': data
+    })
+
+@app.route('/api/health/startup', methods=['GET'])
+def startup_timing():
+    return jsonify({
+        'status': 'success',
+        'data': startup_report.to_dict()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
 # Format response functions
 def format_student_analysis_response(analysis):
     response = f"📊 **Analisis Lengkap untuk {analysis['nama']}**\n"
@@ -585,7 +1825,10 @@ def format_student_analysis_response(analysis):
     response += f"🎯 **Rekomendasi Personal:**\n"
     response += f"⏰ **Durasi Belajar:** {pred['durasi_belajar_optimal']}\n"
     response += f"📚 **Prioritas:** {pred['mata_pelajaran_prioritas']}\n"
-    response += f"🧠 **Strategi:** {pred['strategi_belajar']}\n\n"
+    response += f"🧠 **Strategi:** {pred['strategi_belajar']}\n"
+    if pred.get('proyeksi_nilai'):
+        response += f"📈 **Proyeksi:** {pred['proyeksi_nilai']}\n"
+    response += "\n"
     
     # Note for database users
     if analysis.get('data_source') == 'Database':
@@ -627,7 +1870,7 @@ def format_predictions_response(analysis):
             status = "⚠️ Perlu Ditingkatkan"
         else:
             status = "🚨 Perlu Perhatian Khusus"
-            
+        
         response += f"{emoji} **{nama_mapel}**: {rata_rata:.1f} {status}\n"
         response += f"   • Kuis: {score_data['quiz']:.1f} | Tugas: {score_data['tugas']:.1f}\n"
     
@@ -648,78 +1891,15 @@ def format_predictions_response(analysis):
     
     return response
 
-def get_answer_for_question(question, data):
-    question = question.lower().strip()
-    
-    # Pertanyaan sapaan
-    if question in ['halo', 'hai', 'hi', 'hello', 'hey', 'oi', 'p', 'hei']:
-        greetings = [
-            f"Halo! Saya RoGrow dengan AI OpenAI! 🤖 Saya bisa membantu analisis {len(data)} siswa atau tips belajar. Apa yang ingin diketahui?",
-            f"Hai! Saya siap menganalisis data dari {len(data)} siswa dengan teknologi terbaru! Tanyakan apa saja! ✨",
-            f"Halo! Coba tanyakan analisis siswa, rata-rata skor mata pelajaran, atau prediksi belajar! 🌟"
-        ]
-        return random.choice(greetings)
-    
-    # Pertanyaan tentang jumlah siswa
-    if (
-        re.search(r'berapa (jumlah|banyak|total) siswa', question)
-        or 'jumlah siswa' in question
-        or 'total siswa' in question
-        or 'banyak siswa' in question
-    ):
-        return f"📊 Terdapat **{len(data)} siswa** dalam database kami dengan data lengkap kuis dan tugas untuk 7 mata pelajaran!"
-    
-    # Pertanyaan tentang mata pelajaran tertinggi
-    if 'tertinggi' in question or 'terbaik' in question or 'bagus' in question:
-        subjects = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
-        highest_scores = {}
-        for subject in subjects:
-            quiz_col = f"{subject}_Quiz"
-            tugas_col = f"{subject}_Tugas"
-            if quiz_col in data.columns and tugas_col in data.columns:
-                avg_score = (data[quiz_col].mean() + data[tugas_col].mean()) / 2
-                highest_scores[subject] = avg_score
-        
-        if highest_scores:
-            best_subject = max(highest_scores, key=highest_scores.get)
-            subject_name_mapping = {
-                'MTK': 'Matematika',
-                'BINDO': 'Bahasa Indonesia',
-                'BING': 'Bahasa Inggris',
-                'IPA': 'IPA',
-                'IPS': 'IPS', 
-                'PKN': 'PKN',
-                'Seni': 'Seni Budaya'
-            }
-            best_subject_name = subject_name_mapping.get(best_subject, best_subject)
-            return f"🌟 **Mata pelajaran dengan performa terbaik**: {best_subject_name} ({highest_scores[best_subject]:.1f})\n\n🎉 Siswa-siswa hebat banget di {best_subject_name}! Pertahankan semangat belajar!"
-    
-    # Pertanyaan tentang mata pelajaran terendah
-    if 'terendah' in question or 'tersulit' in question or 'lemah' in question:
-        subjects = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
-        lowest_scores = {}
-        for subject in subjects:
-            quiz_col = f"{subject}_Quiz"
-            tugas_col = f"{subject}_Tugas"
-            if quiz_col in data.columns and tugas_col in data.columns:
-                avg_score = (data[quiz_col].mean() + data[tugas_col].mean()) / 2
-                lowest_scores[subject] = avg_score
-        
-        if lowest_scores:
-            worst_subject = min(lowest_scores, key=lowest_scores.get)
-            subject_name_mapping = {
-                'MTK': 'Matematika',
-                'BINDO': 'Bahasa Indonesia',
-                'BING': 'Bahasa Inggris',
-                'IPA': 'IPA',
-                'IPS': 'IPS',
-                'PKN': 'PKN',
-                'Seni': 'Seni Budaya'
-            }
-            worst_subject_name = subject_name_mapping.get(worst_subject, worst_subject)
-            return f"📉 **Mata pelajaran yang perlu lebih banyak latihan**: {worst_subject_name} ({lowest_scores[worst_subject]:.1f})\n\n💪 Mari fokus lebih di {worst_subject_name}! Dengan latihan rutin, pasti bisa meningkat! 🌱"
-    
-    return "Maaf, saya belum mengerti pertanyaan itu. Coba tanyakan tentang:\n• Analisis siswa (dengan NIS)\n• Jumlah siswa\n• Rata-rata nilai mata pelajaran\n• Prediksi belajar\n• Tips belajar\n• Mata pelajaran tertinggi/terendah 😊"
+def get_answer_for_question(question, data, store=None):
+    intent, _, answer = route_question(question, data, store)
+    return answer
+
+def route_question(question, data, store=None):
+    """Jawab pertanyaan dataset lewat intent router; return (intent, slot, jawaban)"""
+    intent, slots, answer = intent_router.route(question, data, current_data().store if store is None else store)
+    intent_requests_total.inc(intent=intent)
+    return intent, slots, answer
 
 # Error handlers
 @app.errorhandler(404)
@@ -730,15 +1910,97 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Terjadi kesalahan server'}), 500
 
+# Endpoint health tidak menunggu dataset; endpoint lain memuatnya saat request pertama jika belum siap
+HEALTH_ENDPOINTS = {
+    'liveness', 'readiness', 'startup_timing', 'prometheus_metrics', 'data_snapshot_stats', 'llm_stats'
+}
+
+@app.before_request
+def load_data_before_request():
+    g.request_started = time.perf_counter()
+    if request.endpoint not in HEALTH_ENDPOINTS:
+        # Pin snapshot untuk seluruh request (termasuk stream): reload tidak menghasilkan pembacaan campuran
+        g.data_snapshot = data_snapshots.ensure_loaded()
+
+# Latensi per template route (mis. /api/student/<nis>/analysis) agar label tidak meledak per NIS
+@app.after_request
+def observe_request_latency(response):
+    started = getattr(g, 'request_started', None)
+    if started is None:
+        return response
+    
+    labels = {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule else 'unmatched',
+        'status': response.status_code
+    }
+    observe = lambda: http_request_seconds.observe(time.perf_counter() - started, **labels)
+    if response.is_streamed:
+        # SSE: ukur sampai stream selesai, bukan saat header dikirim
+        response.call_on_close(observe)
+    else:
+        observe()
+    return response
+
+# Warm-up di background: import selesai cepat, request pertama tidak menanggung biaya load
+def warm_up():
+    try:
+        ensure_data_loaded()
+    except Exception as e:
+        print(f"❌ Dataset warm-up failed: {e}")
+    with startup_report.timed('database pool'):
+        db_manager.connect()
+    get_openai_client()
+    get_study_tips_index()
+    startup_report.print_report()
+
+# Thread tidak ikut fork: di mode pre-fork semua thread background dimulai di worker (post_fork)
+background_threads_started = False
+
+def start_background_threads():
+    """Listener DB, watcher file, loader skor DB, klaster dan warm-up (sekali per proses)"""
+    global background_threads_started
+    if background_threads_started:
+        return
+    background_threads_started = True
+    if os.getenv('ANALYSIS_CACHE_LISTEN', '1') == '1':
+        student_change_listener.start()
+        data_file_watcher.start()
+    if os.getenv('DB_SCORE_LOADER', '1') == '1':
+        db_score_loader.start()
+    if os.getenv('CLUSTER_ENGINE', '1') == '1' and data_snapshots.current is not None:
+        # Snapshot dimuat proses induk sebelum fork: fit klaster dimulai di worker
+        cluster_engine.attach(data_snapshots.current.store)
+    if os.getenv('STARTUP_WARMUP', '1') == '1':
+        threading.Thread(target=warm_up, name='startup-warm-up', daemon=True).start()
+
+def prepare_prefork():
+    """Dipanggil proses induk gunicorn sebelum fork: muat snapshot sekali, tanpa thread dan koneksi DB"""
+    ensure_data_loaded()
+    # Index tips dimuat sekali di induk, worker berbagi halaman yang sama
+    get_study_tips_index()
+    # Koneksi yang diwarisi worker akan berbagi socket yang sama; worker membuka pool sendiri
+    db_manager.close()
+
+def release_shared_scores():
+    if shared_scores is not None:
+        shared_scores.unlink()
+
+startup_report.mark_imported()
+if not PREFORK:
+    start_background_threads()
+
 if __name__ == '__main__':
     print("\n" + "="*50)
     print("🚀 Starting RoGrow Chatbot Server (Fixed OpenAI)")
     print("="*50)
+    ensure_data_loaded()
+    openai_client = get_openai_client()
     print("🤖 Flask Backend - Enhanced Chatbot Service")
     print("🔗 URL: http://localhost:5001")
     print("🔗 API Test: http://localhost:5001/api/test")
     print(f"🔑 OpenAI Status: {'✅ Configured' if openai_client else '❌ Not configured'}")
-    print(f"📊 Dataset Status: ✅ Loaded ({len(dataset)} records)")
+    print(f"📊 Dataset Status: ✅ Loaded ({len(data_snapshots.current)} records)")
     print("🔐 Security: API keys loaded from environment variables")
     print("="*50)
     
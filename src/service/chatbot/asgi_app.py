@@ -0,0 +1,361 @@
+# src/service/chatbot/asgi_app.py
+#
+# Mode serving async. Jalankan dengan:
+#   uvicorn asgi_app:application --host 0.0.0.0 --port 5001
+#
+# /api/chat dan /api/chat/stream dilayani native async (AsyncOpenAI) sehingga panggilan
+# LLM yang lambat tidak menahan thread worker. Jumlah panggilan LLM yang berjalan dibatasi
+# (LLM_MAX_IN_FLIGHT) dengan antrian terbatas (LLM_MAX_QUEUE); jika antrian penuh server
+# langsung membalas 503 + Retry-After. Endpoint lain diteruskan ke Flask app lewat a2wsgi.
+# Logika chat (cache, tips, riwayat, konteks siswa) ada di app.py; di sini hanya panggilan LLM yang
+# di-await, ditambah hook Flask yang relevan (pin snapshot, CORS, metrik latensi).
+
+import asyncio
+import contextvars
+import functools
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from flask_cors.core import get_cors_headers, get_cors_options
+from werkzeug.datastructures import Headers
+
+import app as chatbot
+
+class LLMQueueFull(Exception):
+    """Raised when the in-flight limit and the wait queue are both full"""
+
+class LLMConcurrencyLimiter:
+    """Batas panggilan LLM yang berjalan bersamaan + antrian tunggu terbatas"""
+    
+    def __init__(self, max_in_flight=8, max_queue=32):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self._latency_total = 0.0
+    
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMQueueFull()
+        
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._latency_total += time.monotonic() - started
+            self._semaphore.release()
+    
+    def retry_after(self):
+        """Estimasi detik sampai antrian longgar, berdasarkan rata-rata latensi LLM"""
+        average = self._latency_total / self.completed if self.completed else 5.0
+        return max(1, math.ceil(average * (self.waiting + 1) / self.max_in_flight))
+    
+    def stats(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'avg_latency_ms': round(self._latency_total / self.completed * 1000, 1) if self.completed else None
+        }
+
+llm_limiter = LLMConcurrencyLimiter(
+    max_in_flight=int(os.getenv('LLM_MAX_IN_FLIGHT', '8')),
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', '32'))
+)
+
+# Flask app (WSGI) di thread pool a2wsgi; response streaming (SSE, export) diteruskan per chunk
+flask_app = WSGIMiddleware(chatbot.app, workers=int(os.getenv('WSGI_THREADS', '16')))
+
+# Thread pool untuk bagian sinkron route async (lookup analysis, ringkasan riwayat, database)
+sync_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASYNC_SYNC_THREADS', '16')),
+    thread_name_prefix='async-sync'
+)
+
+def run_sync(func, *args):
+    """func(*args) di sync_executor dengan contextvars request ini (snapshot yang di-pin)"""
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(sync_executor, functools.partial(context.run, func, *args))
+
+_async_openai_client = None
+
+def get_async_openai_client():
+    global _async_openai_client
+    if _async_openai_client is None and chatbot.openai_api_key:
+        try:
+            from openai import AsyncOpenAI
+            # Retry 429/5xx ditangani chatbot.llm_scheduler, bukan SDK
+            _async_openai_client = AsyncOpenAI(api_key=chatbot.openai_api_key, timeout=30.0, max_retries=0)
+        except Exception as e:
+            print(f"❌ AsyncOpenAI initialization failed: {e}")
+    return _async_openai_client
+
+def guarded_llm_call_async(func):
+    """Async twin of app.guarded_llm_call"""
+    return lambda: chatbot.llm_breaker.call_async(func, chatbot.is_provider_failure)
+
+async def get_openai_response_async(messages, student_data=None, references=None):
+    """Async twin of app.get_openai_response"""
+    client = get_async_openai_client()
+    if not client:
+        return chatbot.OPENAI_UNAVAILABLE_MESSAGE
+    
+    chatbot.llm_breaker.check()
+    started = time.perf_counter()
+    try:
+        request_kwargs = chatbot.openai_request_kwargs(messages, student_data, references)
+        # Scheduler + circuit breaker yang sama dengan jalur sync: budget dan state provider dibagi keduanya
+        response = await chatbot.llm_scheduler.call_async(
+            guarded_llm_call_async(lambda: client.chat.completions.create(**request_kwargs)),
+            chatbot.estimate_llm_tokens(request_kwargs['messages']),
+            usage=chatbot.total_tokens_of
+        )
+        chatbot.record_openai_call('async', time.perf_counter() - started, chatbot.usage_from_response(response))
+        return response.choices[0].message.content
+    except Exception as e:
+        return chatbot.openai_failure_message(e, 'async', started)
+
+async def stream_openai_response_async(messages, student_data=None, references=None):
+    """Async twin of app.stream_openai_response (same event sequence)"""
+    recorder = chatbot.OpenAIStreamRecorder('async_stream', messages, student_data)
+    client = get_async_openai_client()
+    if not client:
+        yield 'delta', recorder.unavailable()
+    else:
+        try:
+            chatbot.llm_breaker.check()
+            request_kwargs = chatbot.openai_request_kwargs(messages, student_data, references, stream=True)
+            stream = await chatbot.llm_scheduler.call_async(
+                guarded_llm_call_async(lambda: client.chat.completions.create(**request_kwargs)),
+                chatbot.estimate_llm_tokens(request_kwargs['messages'])
+            )
+            async for chunk in stream:
+                content = recorder.content(chunk)
+                if content:
+                    yield 'delta', content
+        except Exception as e:
+            message = recorder.fail(e)
+            if message:
+                yield 'delta', message
+    
+    yield 'done', recorder.done()
+
+async def get_chat_response_async(messages, student_data=None, use_cache=True):
+    """Async twin of app.get_chat_response"""
+    started = time.perf_counter()
+    # Response cache dan index tips di memori (< 1 ms per pencarian): aman di event loop
+    answer, metadata, tips = chatbot.chat_shortcut(messages, student_data, use_cache, started)
+    if answer is not None:
+        return answer, metadata
+    
+    try:
+        # Circuit open: jawab lokal tanpa menunggu slot limiter
+        chatbot.llm_breaker.check()
+        async with llm_limiter.slot():
+            response = await get_openai_response_async(messages, student_data, tips['references'] if tips else None)
+    except chatbot.CircuitOpenError as e:
+        return chatbot.circuit_fallback_response(messages, student_data, e, started)
+    return response, chatbot.finish_chat_response(messages, student_data, response, tips, use_cache, started)
+
+async def stream_chat_response_async(messages, student_data=None, use_cache=True):
+    """Async twin of app.stream_chat_response; LLMQueueFull muncul sebelum event pertama"""
+    started = time.perf_counter()
+    answer, metadata, tips = chatbot.chat_shortcut(messages, student_data, use_cache, started)
+    if answer is not None:
+        yield 'delta', answer
+        yield 'done', chatbot.shortcut_done_event(metadata)
+        return
+    
+    async with llm_limiter.slot():
+        parts = []
+        async for event, payload in stream_openai_response_async(messages, student_data, tips['references'] if tips else None):
+            if event == 'delta':
+                parts.append(payload)
+            else:
+                chatbot.finish_chat_stream(messages, student_data, ''.join(parts), payload, tips, use_cache, started)
+            yield event, payload
+
+# Helper ASGI
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def send_json(send, payload, status=200, headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    response_headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    for name, value in (headers or {}).items():
+        response_headers.append((name.lower().encode(), str(value).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_busy(send):
+    retry_after = llm_limiter.retry_after()
+    await send_json(send, {
+        'success': False,
+        'response': 'RoGrow sedang melayani banyak teman. Coba lagi sebentar ya! ⏳'
+    }, status=503, headers={'Retry-After': retry_after})
+
+async def parse_chat_body(receive):
+    data = json.loads(await read_body(receive) or b'{}')
+    # Lookup analisis siswa (psycopg2 sinkron) dijalankan di thread pool
+    # (termasuk ringkasan riwayat yang bisa memanggil OpenAI secara sinkron)
+    openai_messages, student_data, history_info = await run_sync(chatbot.parse_chat_request, data)
+    return openai_messages, student_data, history_info, data.get('cache', True) is not False
+
+async def handle_chat(scope, receive, send):
+    try:
+        openai_messages, student_data, history_info, use_cache = await parse_chat_body(receive)
+        response, metadata = await get_chat_response_async(openai_messages, student_data, use_cache)
+    except LLMQueueFull:
+        await send_busy(send)
+        return
+    except Exception as e:
+        print(f"Error in chat_with_openai (async): {e}")
+        await send_json(send, chatbot.CHAT_ERROR_BODY, status=500)
+        return
+    
+    await send_json(send, chatbot.chat_response_body(response, metadata, history_info))
+
+async def handle_chat_stream(scope, receive, send):
+    try:
+        openai_messages, student_data, history_info, use_cache = await parse_chat_body(receive)
+        events = stream_chat_response_async(openai_messages, student_data, use_cache)
+        # Event pertama sebelum header: antrian limiter penuh masih bisa dijawab 503
+        first = await events.__anext__()
+    except LLMQueueFull:
+        await send_busy(send)
+        return
+    except Exception as e:
+        print(f"Error in chat_with_openai_stream (async): {e}")
+        await send_json(send, chatbot.CHAT_ERROR_BODY, status=500)
+        return
+    
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    
+    async def send_event(event, payload):
+        chunk = chatbot.format_chat_event(event, payload, history_info)
+        await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+    
+    try:
+        await send_event(*first)
+        async for event, payload in events:
+            await send_event(event, payload)
+    finally:
+        # Client putus di tengah stream: lepas slot limiter sekarang, bukan saat generator di-GC
+        await events.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def handle_llm_stats(scope, receive, send):
+    await send_json(send, {
+        'status': 'success',
+        'llm_limiter': llm_limiter.stats(),
+        'llm_scheduler': chatbot.llm_scheduler.stats(),
+        'llm_circuit': chatbot.llm_breaker.stats()
+    })
+
+ASYNC_ROUTES = {
+    ('POST', '/api/chat'): handle_chat,
+    ('POST', '/api/chat/stream'): handle_chat_stream,
+    ('GET', '/api/llm/stats'): handle_llm_stats,
+}
+
+# Seperti app.HEALTH_ENDPOINTS: tidak menunggu dataset dimuat
+ASYNC_HEALTH_ROUTES = {handle_llm_stats}
+
+# Opsi CORS yang sama dengan CORS(app) di app.py (default flask-cors + konfigurasi CORS_* Flask)
+cors_options = get_cors_options(chatbot.app)
+
+def cors_headers(scope):
+    request_headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope.get('headers', [])])
+    return [
+        (name.lower().encode('latin-1'), value.encode('latin-1'))
+        for name, value in get_cors_headers(cors_options, request_headers, scope['method']).items()
+    ]
+
+async def handle_async_route(handler, scope, receive, send):
+    """Hook Flask untuk route async: pin snapshot (before_request), CORS dan latensi (after_request)"""
+    started = time.perf_counter()
+    status = {'code': 500}
+    extra_headers = cors_headers(scope)
+    
+    async def send_with_hooks(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+            message = dict(message, headers=list(message['headers']) + extra_headers)
+        await send(message)
+    
+    token = None
+    try:
+        if handler not in ASYNC_HEALTH_ROUTES:
+            # Seluruh request (termasuk stream dan fallback lokal) membaca satu snapshot
+            token = chatbot.pinned_data_snapshot.set(await run_sync(chatbot.data_snapshots.ensure_loaded))
+        await handler(scope, receive, send_with_hooks)
+    finally:
+        if token is not None:
+            chatbot.pinned_data_snapshot.reset(token)
+        # Latensi dicatat sampai body terakhir terkirim, label route sama dengan template Flask
+        chatbot.http_request_seconds.observe(
+            time.perf_counter() - started,
+            method=scope['method'], route=scope['path'], status=status['code']
+        )
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Index tips (build pertama bisa ~1 s) dimuat di thread pool, bukan di request pertama
+            await run_sync(chatbot.get_study_tips_index)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            sync_executor.shutdown(wait=False)
+            flask_app.executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    
+    handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+    if handler:
+        await handle_async_route(handler, scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
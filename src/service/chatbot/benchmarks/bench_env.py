@@ -0,0 +1,86 @@
+# src/service/chatbot/benchmarks/bench_env.py
+"""Boot app.py untuk benchmark: roster sintetis, fake OpenAI dan DB stand-in, tanpa jaringan keluar"""
+
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CHATBOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+sys.path.insert(0, CHATBOT_DIR)
+
+def roster_dir(size):
+    """Direktori roster untuk ukuran (1k/100k/1m), dibuat jika belum ada"""
+    from generate_roster import SIZES, write_roster
+    path = os.path.join(BENCH_DIR, 'data', size.lower())
+    if not os.path.exists(os.path.join(path, 'nilai_tugas.csv')):
+        print(f"🔄 Generating roster {size} ...")
+        write_roster(SIZES.get(size.lower()) or int(size), path)
+    return path
+
+def configure_env(size, openai_port):
+    os.environ['CHATBOT_DATA_DIR'] = roster_dir(size)
+    os.environ['OPENAI_API_KEY'] = 'bench-dummy-key'
+    os.environ['OPENAI_BASE_URL'] = f'http://127.0.0.1:{openai_port}/v1'
+    # Tanpa thread background yang menyentuh Postgres; data dimuat sinkron di load_app
+    os.environ['ANALYSIS_CACHE_LISTEN'] = '0'
+    os.environ['DB_SCORE_LOADER'] = '0'
+    os.environ['STARTUP_WARMUP'] = '0'
+
+def load_app(size='1k', openai_port=8911, db_latency_ms=1.0, db_students=0):
+    """Import app.py dengan env benchmark; db_students = jumlah NIS roster yang juga ada di DB stand-in"""
+    configure_env(size, openai_port)
+    import app
+    from db_standin import InMemoryDatabase
+    
+    app.ensure_data_loaded()
+    nis_in_db = list(app.score_store.nis[:db_students]) if db_students else []
+    standin = InMemoryDatabase.with_students(nis_in_db, latency_ms=db_latency_ms)
+    app.db_manager = standin
+    app.db_score_loader.db_manager = standin
+    return app
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=CHATBOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+def percentiles(samples):
+    """p50/p95/p99/mean (ms) dari daftar durasi dalam detik"""
+    import numpy as np
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples) * 1000
+    return {
+        'count': int(len(values)),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+def write_results(kind, size, payload):
+    import json
+    import platform
+    from datetime import datetime
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    revision = git_revision()
+    path = os.path.join(RESULTS_DIR, f'{kind}-{size}-{revision}.json')
+    document = {
+        'kind': kind,
+        'roster': size,
+        'git_revision': revision,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        **payload
+    }
+    with open(path, 'w') as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+    print(f"💾 Results: {path}")
+    return path
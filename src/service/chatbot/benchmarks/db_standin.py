@@ -0,0 +1,76 @@
+# src/service/chatbot/benchmarks/db_standin.py
+"""DatabaseManager pengganti in-process: antarmuka yang dipakai app.py, latensi per query bisa diatur"""
+
+import time
+
+class InMemoryDatabase:
+    def __init__(self, students=None, latency_ms=1.0):
+        # NIS -> row dengan kolom yang sama seperti query siswa JOIN users
+        self.students = dict(students or {})
+        self.latency = latency_ms / 1000
+        self.queries = 0
+    
+    @classmethod
+    def with_students(cls, nis_list, latency_ms=1.0):
+        students = {
+            str(nis): {
+                'nis': str(nis),
+                'nama_lengkap': f'Siswa DB {nis}',
+                'no_telepon': '0800000000',
+                'nik_orangtua': '0000000000000000',
+                'email': f'{nis}@siswa.mindagrow.test',
+                'created_at': None
+            }
+            for nis in nis_list
+        }
+        return cls(students, latency_ms)
+    
+    def _query(self):
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def connect(self):
+        pass
+    
+    def ping(self):
+        return True
+    
+    def get_student_by_nis(self, nis):
+        self._query()
+        student = self.students.get(str(nis))
+        return dict(student) if student else None
+    
+    def get_students_by_nis(self, nis_list):
+        self._query()
+        return {str(nis): dict(self.students[str(nis)]) for nis in nis_list if str(nis) in self.students}
+    
+    def get_all_students(self):
+        self._query()
+        return [dict(student) for _, student in sorted(self.students.items())]
+    
+    def iter_students(self, kelas=None, batch_size=1000):
+        self._query()
+        # Siswa stand-in tidak punya kelas: filter kelas tidak pernah cocok
+        rows = [] if kelas else [dict(student, kelas=None) for _, student in sorted(self.students.items())]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+    
+    def stream_student_scores(self, on_batch, since=None, batch_size=5000, trend_origin=0.0):
+        self._query()
+        rows = [
+            {'nis': nis, 'nama_lengkap': student['nama_lengkap'], 'kelas': None, 'class_name': None,
+             'tugas_score': None, 'updated_at': None, 'n': 0, 'st': None, 'stt': None, 'sy': None,
+             'sty': None, 'syy': None, 't0': None, 'first_t': None, 'last_t': None}
+            for nis, student in sorted(self.students.items())
+        ] if since is None else []
+        for start in range(0, len(rows), batch_size):
+            on_batch(rows[start:start + batch_size])
+        return len(rows)
+    
+    def pool_stats(self):
+        return {'max_size': 0, 'open': 0, 'in_use': 0, 'idle': 0, 'checkouts': self.queries,
+                'checkout_failures': 0, 'connect_failures': 0, 'discarded': 0}
+    
+    def close(self):
+        pass
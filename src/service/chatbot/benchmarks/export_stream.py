@@ -0,0 +1,75 @@
+# src/service/chatbot/benchmarks/export_stream.py
+"""Memori puncak dan durasi export analisis seluruh roster: naif vs streaming per batch, hasil JSON di benchmarks/results
+
+Mode 'naive' memuat semua siswa (get_all_students), menganalisis semuanya sekaligus lalu menyusun
+body NDJSON utuh. Mode 'stream' memakai export_student_analyses (cursor per batch, body dibuang
+per potongan seperti socket). Memori diukur dengan tracemalloc per jumlah siswa di DB stand-in.
+
+    python benchmarks/export_stream.py --roster 100k --students 1000,10000,30000 --batch-size 1000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from bench_env import load_app, write_results
+from db_standin import InMemoryDatabase
+
+def export_naive(app):
+    rows = app.db_manager.get_all_students()
+    nis_list = [str(row['nis']).strip() for row in rows]
+    student_infos = [{
+        'nis': nis,
+        'nama_lengkap': row['nama_lengkap'],
+        'kelas': 'A',
+        'gender': 'Unknown',
+        'email': row['email'],
+        'source': 'Database'
+    } for nis, row in zip(nis_list, rows)]
+    analyses = app.build_student_analyses(student_infos, app.db_score_loader.scores_for_many(nis_list))
+    body = ''.join(json.dumps(analysis, ensure_ascii=False, default=str) + '\n' for analysis in analyses)
+    return len(body)
+
+def export_stream(app, batch_size):
+    return sum(len(chunk) for chunk in app.export_student_analyses('ndjson', None, batch_size))
+
+def measure(run):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3), 'peak_mb': round(peak / 1e6, 2), 'body_mb': round(size / 1e6, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', default='100k', help='1k, 100k or 1m')
+    parser.add_argument('--students', default='1000,10000,50000', help='jumlah siswa di DB stand-in per run')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--modes', default='naive,stream')
+    args = parser.parse_args()
+    
+    app = load_app(args.roster, db_latency_ms=0)
+    runs = []
+    for students in [int(value) for value in args.students.split(',')]:
+        standin = InMemoryDatabase.with_students(list(app.score_store.nis[:students]), latency_ms=0)
+        app.db_manager = standin
+        app.db_score_loader.db_manager = standin
+        for mode in args.modes.split(','):
+            if mode == 'naive':
+                result = measure(lambda: export_naive(app))
+            else:
+                result = measure(lambda: export_stream(app, args.batch_size))
+            runs.append({'mode': mode, 'students': students, **result})
+            print(f"  {mode:<6} {students:>8} siswa  {result['seconds']:>7.2f}s  peak {result['peak_mb']:>8.1f} MB  "
+                  f"body {result['body_mb']:>8.1f} MB")
+    
+    write_results('export-stream', args.roster, {
+        'batch_size': args.batch_size,
+        'runs': runs
+    })
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# src/service/chatbot/benchmarks/fake_openai_server.py
+"""Server HTTP tiruan untuk POST /v1/chat/completions (biasa dan stream) dengan latensi yang bisa diatur
+
+--rpm / --tpm mensimulasikan rate limit akun (budget per menit yang terisi kontinu, seperti OpenAI):
+di atas limit server membalas 429 dengan header Retry-After dan retry-after-ms.
+
+    python benchmarks/fake_openai_server.py --port 8911 --latency-ms 300 --chunk-ms 20
+    python benchmarks/fake_openai_server.py --port 8911 --rpm 60 --tpm 20000
+    python benchmarks/fake_openai_server.py --port 8911 --outage-status 503   # provider down
+    OPENAI_API_KEY=dummy OPENAI_BASE_URL=http://127.0.0.1:8911/v1 python app.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Halo! Ayo belajar bersama RoGrow. Coba kerjakan latihan soal 20 menit setiap hari ya! 📚"
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Diisi oleh make_server
+    latency = 0.3
+    jitter = 0.0
+    chunk_delay = 0.02
+    error_rate = 0.0
+    rpm = 0
+    tpm = 0
+    requests_served = 0
+    rate_limited = 0
+    # {'requests', 'tokens', 'updated'}: sisa budget, dibuat per server oleh make_server
+    budget = None
+    # Insiden provider: {'status': 503} dan/atau {'latency': detik}; bisa diganti saat server berjalan
+    outage = None
+    _lock = threading.Lock()
+    
+    def log_message(self, *args):
+        pass
+    
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        with self._lock:
+            FakeOpenAIHandler.requests_served += 1
+        
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        outage = self.outage
+        if outage:
+            time.sleep(outage.get('latency') or 0)
+            if outage.get('status'):
+                self._send_json(outage['status'], {'error': {'message': 'provider outage', 'type': 'server_error'}})
+                return
+        
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4 + 1
+        words = [word + ' ' for word in REPLY.split(' ')]
+        retry_after = self._admit(prompt_tokens + (body.get('max_tokens') or len(words)))
+        if retry_after is None and self.error_rate and random.random() < self.error_rate:
+            retry_after = 1.0
+        if retry_after is not None:
+            with self._lock:
+                type(self).rate_limited += 1
+            self._send_json(429, {'error': {'message': 'rate limited', 'type': 'rate_limit_error'}}, {
+                'Retry-After': str(max(1, math.ceil(retry_after))),
+                'retry-after-ms': str(int(retry_after * 1000))
+            })
+            return
+        
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(words),
+                 'total_tokens': prompt_tokens + len(words)}
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        
+        if not body.get('stream'):
+            self._send_json(200, {
+                'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body.get('model', 'gpt-4o'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': REPLY}, 'finish_reason': 'stop'}],
+                'usage': usage
+            })
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for word in words:
+            chunk = {'id': 'chatcmpl-bench', 'object': 'chat.completion.chunk', 'created': 0,
+                     'model': body.get('model', 'gpt-4o'),
+                     'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        final = {'id': 'chatcmpl-bench', 'object': 'chat.completion.chunk', 'created': 0,
+                 'model': body.get('model', 'gpt-4o'), 'choices': [], 'usage': usage}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+        self.close_connection = True
+
+    def _admit(self, tokens):
+        """Ambil budget jika cukup; selain itu return detik sampai budget request/token terisi kembali"""
+        if not self.rpm and not self.tpm:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            budget = self.budget
+            elapsed = now - budget['updated']
+            budget['updated'] = now
+            waits = []
+            if self.rpm:
+                budget['requests'] = min(self.rpm, budget['requests'] + elapsed * self.rpm / 60)
+                if budget['requests'] < 1:
+                    waits.append((1 - budget['requests']) * 60 / self.rpm)
+            if self.tpm:
+                tokens = min(tokens, self.tpm)
+                budget['tokens'] = min(self.tpm, budget['tokens'] + elapsed * self.tpm / 60)
+                if budget['tokens'] < tokens:
+                    waits.append((tokens - budget['tokens']) * 60 / self.tpm)
+            if waits:
+                return max(waits)
+            budget['requests'] -= 1
+            budget['tokens'] -= tokens
+        return None
+
+def make_server(port=8911, latency_ms=300, jitter_ms=0, chunk_ms=20, error_rate=0.0, rpm=0, tpm=0,
+                outage=None, host='127.0.0.1'):
+    handler = type('ConfiguredFakeOpenAIHandler', (FakeOpenAIHandler,), {
+        'latency': latency_ms / 1000,
+        'jitter': jitter_ms / 1000,
+        'chunk_delay': chunk_ms / 1000,
+        'error_rate': error_rate,
+        'rpm': rpm,
+        'tpm': tpm,
+        'outage': outage,
+        'budget': {'requests': float(rpm), 'tokens': float(tpm), 'updated': time.monotonic()},
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_in_thread(**kwargs):
+    """Jalankan server di daemon thread; return server (panggil server.shutdown() untuk berhenti)"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8911)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--chunk-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraksi request yang dibalas 429 acak')
+    parser.add_argument('--rpm', type=int, default=0, help='limit request/menit (0 = tanpa limit)')
+    parser.add_argument('--tpm', type=int, default=0, help='limit token/menit (0 = tanpa limit)')
+    parser.add_argument('--outage-status', type=int, help='balas semua request dengan status ini (mis. 503)')
+    parser.add_argument('--outage-latency-s', type=float, default=0, help='tahan setiap request sekian detik')
+    args = parser.parse_args()
+    
+    outage = None
+    if args.outage_status or args.outage_latency_s:
+        outage = {'status': args.outage_status, 'latency': args.outage_latency_s}
+    server = make_server(args.port, args.latency_ms, args.jitter_ms, args.chunk_ms, args.error_rate,
+                         args.rpm, args.tpm, outage)
+    print(f"🤖 Fake OpenAI on http://127.0.0.1:{args.port}/v1 (latency {args.latency_ms}ms)")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
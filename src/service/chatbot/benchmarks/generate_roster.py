@@ -0,0 +1,72 @@
+# src/service/chatbot/benchmarks/generate_roster.py
+"""Roster sintetis (data_siswa.csv, nilai_kuis.csv, nilai_tugas.csv) dengan skema dataChatBot
+
+    python benchmarks/generate_roster.py --students 100000 --out benchmarks/data/100k
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from score_store import SUBJECTS
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+CLASSES = np.array(['A', 'B', 'C', 'D', 'E', 'F'], dtype=object)
+GENDERS = np.array(['Laki-laki', 'Perempuan'], dtype=object)
+FIRST_NIS = 20230101
+
+def generate_roster(n, seed=42):
+    """Return (siswa, kuis, tugas) DataFrames; deterministik untuk seed yang sama"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    nis = (FIRST_NIS + np.arange(n)).astype(str)
+    names = np.char.add('Siswa ', ids.astype(str))
+    
+    siswa = pd.DataFrame({
+        'Id': ids,
+        'Nama Lengkap': names,
+        'NIS': nis,
+        'Kelas': CLASSES[rng.integers(0, len(CLASSES), n)],
+        'Gender': GENDERS[rng.integers(0, len(GENDERS), n)],
+    })
+    
+    # Kemampuan dasar per siswa + variasi per mapel, mirip distribusi data asli (50-100)
+    ability = rng.normal(80, 8, (n, 1))
+    base = ability + rng.normal(0, 6, (n, len(SUBJECTS)))
+    quiz = np.clip(np.rint(base + rng.normal(0, 5, base.shape)), 50, 100).astype(np.int16)
+    tugas = np.clip(np.rint(base + rng.normal(2, 5, base.shape)), 50, 100).astype(np.int16)
+    
+    key = siswa[['Id', 'Nama Lengkap', 'NIS']]
+    kuis = pd.concat([key, pd.DataFrame(quiz, columns=[f'{s}_Quiz' for s in SUBJECTS])], axis=1)
+    tugas = pd.concat([key, pd.DataFrame(tugas, columns=[f'{s}_Tugas' for s in SUBJECTS])], axis=1)
+    return siswa, kuis, tugas
+
+def write_roster(n, out_dir, seed=42):
+    os.makedirs(out_dir, exist_ok=True)
+    siswa, kuis, tugas = generate_roster(n, seed)
+    siswa.to_csv(os.path.join(out_dir, 'data_siswa.csv'), index=False)
+    kuis.to_csv(os.path.join(out_dir, 'nilai_kuis.csv'), index=False)
+    tugas.to_csv(os.path.join(out_dir, 'nilai_tugas.csv'), index=False)
+    return out_dir
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--students', default='1k', help="1k, 100k, 1m or an integer")
+    parser.add_argument('--out', help="output directory (default benchmarks/data/<size>)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    n = SIZES.get(args.students.lower()) or int(args.students)
+    out_dir = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', args.students.lower())
+    started = time.perf_counter()
+    write_roster(n, out_dir, args.seed)
+    print(f"✅ Roster {n} siswa ditulis ke {out_dir} ({time.perf_counter() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
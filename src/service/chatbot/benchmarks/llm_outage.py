@@ -0,0 +1,130 @@
+# src/service/chatbot/benchmarks/llm_outage.py
+"""Latensi /api/chat selama insiden provider, dengan dan tanpa circuit breaker, hasil JSON di benchmarks/results
+
+Fase: healthy -> outage (fake OpenAI membalas 503 atau menahan request) -> recovered. Mode 'disabled'
+memakai breaker yang tidak pernah open (failure_rate > 1): setiap chat menunggu provider sampai gagal.
+Mode 'breaker' menjawab lokal (intent/analisis/cache/statis) selama circuit open lalu pulih lewat half-open.
+    
+    python benchmarks/llm_outage.py --outage 503 --phase-seconds 10 --concurrency 8
+    python benchmarks/llm_outage.py --outage hang --hang-seconds 3 --slow-seconds 1
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import defaultdict
+
+from bench_env import load_app, percentiles, write_results
+from fake_openai_server import start_in_thread
+
+QUESTIONS = [
+    'bagaimana cara belajar matematika yang menyenangkan?',
+    'berapa rata-rata nilai kelas?',
+    'tips supaya tidak mengantuk saat belajar',
+    'siapa siswa dengan nilai tertinggi?',
+]
+
+def run_phase(app, phase, args):
+    results = []
+    sources = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.phase_seconds
+    
+    def caller(index):
+        count = 0
+        while time.perf_counter() < deadline:
+            messages = [{'role': 'user', 'content': QUESTIONS[(index + count) % len(QUESTIONS)]}]
+            count += 1
+            started = time.perf_counter()
+            response, metadata = app.get_chat_response(messages, use_cache=False)
+            elapsed = time.perf_counter() - started
+            if 'fallback' in metadata:
+                source = metadata['fallback']['source']
+            elif response in app.OPENAI_FALLBACK_MESSAGES:
+                source = 'error_message'
+            else:
+                source = 'openai'
+            with lock:
+                results.append(elapsed)
+                sources[source] += 1
+    
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'phase': phase,
+        'duration_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 2),
+        'latency': percentiles(results),
+        'sources': dict(sources),
+        'circuit': app.llm_breaker.stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', default='1k', help='1k, 100k or 1m')
+    parser.add_argument('--port', type=int, default=8913)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--outage', default='503', help="status HTTP (mis. 503) atau 'hang'")
+    parser.add_argument('--hang-seconds', type=float, default=3.0, help="lama request ditahan saat --outage hang")
+    parser.add_argument('--slow-seconds', type=float, default=1.0, help='LLM_BREAKER_SLOW_SECONDS untuk run ini')
+    parser.add_argument('--open-seconds', type=float, default=2.0, help='LLM_BREAKER_OPEN_SECONDS untuk run ini')
+    parser.add_argument('--window', type=int, default=10, help='LLM_BREAKER_WINDOW untuk run ini')
+    parser.add_argument('--phase-seconds', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--modes', default='disabled,breaker')
+    args = parser.parse_args()
+    
+    server = start_in_thread(port=args.port, latency_ms=args.latency_ms, chunk_ms=0)
+    # Budget scheduler longgar: yang diukur breaker, bukan antrian rate limit
+    os.environ.setdefault('OPENAI_RPM_LIMIT', '100000')
+    os.environ.setdefault('OPENAI_TPM_LIMIT', '100000000')
+    app = load_app(args.roster, openai_port=args.port)
+    from circuit_breaker import CircuitBreaker
+    
+    outage = {'latency': args.hang_seconds} if args.outage == 'hang' else {'status': int(args.outage)}
+    runs = []
+    for mode in args.modes.split(','):
+        # Breaker baru per mode; 'disabled' tidak pernah open
+        app.llm_breaker = CircuitBreaker(
+            name='openai',
+            failure_rate=2.0 if mode == 'disabled' else 0.5,
+            window=args.window,
+            min_calls=5,
+            slow_call_seconds=args.slow_seconds,
+            open_seconds=args.open_seconds,
+            half_open_probes=1,
+            on_transition=lambda previous, state: app.llm_circuit_transitions_total.inc(to=state)
+        )
+        print(f"🚀 {mode}: outage {args.outage}, {args.concurrency} callers, {args.phase_seconds:.0f}s per fase")
+        phases = []
+        for phase, incident in (('healthy', None), ('outage', outage), ('recovered', None)):
+            server.RequestHandlerClass.outage = incident
+            result = run_phase(app, phase, args)
+            phases.append(result)
+            latency = result['latency']
+            print(f"  {phase:<10} {latency['count']:>6} chat  p50 {latency.get('p50_ms', 0):>9.1f}ms  "
+                  f"p99 {latency.get('p99_ms', 0):>9.1f}ms  circuit {result['circuit']['state']:<9} "
+                  f"{result['sources']}")
+        runs.append({'mode': mode, 'phases': phases})
+    server.shutdown()
+    
+    write_results('llm-outage', args.roster, {
+        'outage': args.outage,
+        'hang_seconds': args.hang_seconds if args.outage == 'hang' else None,
+        'latency_ms': args.latency_ms,
+        'slow_call_seconds': args.slow_seconds,
+        'open_seconds': args.open_seconds,
+        'window': args.window,
+        'concurrency': args.concurrency,
+        'phase_seconds': args.phase_seconds,
+        'runs': runs
+    })
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# src/service/chatbot/benchmarks/llm_rate_limit.py
+"""LLMScheduler melawan fake OpenAI yang membalas 429 di atas limit (rpm/tpm), hasil JSON di benchmarks/results
+
+Caller interaktif dan batch berjalan bersamaan. Mode 'direct' memanggil API tanpa scheduler (seperti
+sebelumnya: 429 langsung jadi jawaban fallback). Mode 'scheduler' memakai budget, prioritas dan retry.
+    
+    python benchmarks/llm_rate_limit.py --server-rpm 120 --interactive 8 --batch 8 --duration 20
+    python benchmarks/llm_rate_limit.py --server-rpm 120 --scheduler-rpm 240   # budget terlalu longgar: 429 + Retry-After
+"""
+
+import argparse
+import threading
+import time
+from collections import defaultdict
+
+from bench_env import percentiles, write_results
+from fake_openai_server import start_in_thread
+
+def run_mode(mode, client, scheduler, args):
+    from llm_scheduler import LLMSchedulerRejected
+    from prompt_context import count_message_tokens
+    results = defaultdict(list)
+    failures = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    
+    def caller(priority, index):
+        messages = [{'role': 'user', 'content': f'tips belajar matematika untuk siswa {index}'}]
+        estimate = count_message_tokens(messages) + args.max_tokens
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            create = lambda: client.chat.completions.create(model='gpt-4o', messages=messages,
+                                                            max_tokens=args.max_tokens)
+            try:
+                if scheduler is None:
+                    create()
+                else:
+                    scheduler.call(create, estimate, priority=priority,
+                                   usage=lambda response: response.usage.total_tokens)
+                outcome = None
+            except LLMSchedulerRejected as e:
+                outcome = f'scheduler_{e.reason}'
+            except Exception as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if outcome is None:
+                    results[priority].append(elapsed)
+                else:
+                    failures[priority][outcome] += 1
+            if outcome is not None and scheduler is None:
+                # Tanpa scheduler klien tetap mengulang pertanyaan berikutnya secepatnya
+                time.sleep(0.05)
+    
+    threads = [threading.Thread(target=caller, args=('interactive', i)) for i in range(args.interactive)]
+    threads += [threading.Thread(target=caller, args=('batch', i)) for i in range(args.batch)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    summary = {'mode': mode, 'duration_seconds': round(elapsed, 3), 'priorities': {}}
+    for priority in ('interactive', 'batch'):
+        latency = percentiles(results.get(priority, []))
+        summary['priorities'][priority] = {
+            'completed': latency['count'],
+            'throughput_rpm': round(latency['count'] / elapsed * 60, 1),
+            'latency': latency,
+            'failures': dict(failures.get(priority, {}))
+        }
+    if scheduler is not None:
+        summary['scheduler'] = scheduler.stats()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8912)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--server-rpm', type=int, default=120, help='limit request/menit fake OpenAI')
+    parser.add_argument('--server-tpm', type=int, default=0, help='limit token/menit fake OpenAI')
+    parser.add_argument('--scheduler-rpm', type=int, help='budget scheduler (default = --server-rpm)')
+    parser.add_argument('--scheduler-tpm', type=int, help='budget scheduler (default = --server-tpm)')
+    parser.add_argument('--interactive', type=int, default=8, help='caller prioritas interactive')
+    parser.add_argument('--batch', type=int, default=8, help='caller prioritas batch')
+    parser.add_argument('--max-tokens', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--modes', default='direct,scheduler')
+    args = parser.parse_args()
+    
+    from openai import OpenAI
+    from llm_scheduler import LLMScheduler
+    
+    runs = []
+    for mode in args.modes.split(','):
+        # Server baru per mode: jendela rate limit mulai kosong
+        server = start_in_thread(port=args.port, latency_ms=args.latency_ms, chunk_ms=0,
+                                 rpm=args.server_rpm, tpm=args.server_tpm)
+        client = OpenAI(api_key='bench-dummy-key', base_url=f'http://127.0.0.1:{args.port}/v1', max_retries=0)
+        scheduler = None
+        if mode == 'scheduler':
+            scheduler = LLMScheduler(
+                requests_per_minute=args.scheduler_rpm or args.server_rpm,
+                tokens_per_minute=args.scheduler_tpm if args.scheduler_tpm is not None else args.server_tpm,
+                queue_timeout=args.duration
+            )
+        print(f"🚀 {mode}: {args.interactive} interactive + {args.batch} batch callers, "
+              f"server limit {args.server_rpm} rpm, {args.duration:.0f}s")
+        run = run_mode(mode, client, scheduler, args)
+        run['server_429'] = server.RequestHandlerClass.rate_limited
+        server.shutdown()
+        server.server_close()
+        runs.append(run)
+        for priority, result in run['priorities'].items():
+            latency = result['latency']
+            print(f"  {priority:<12} {result['completed']:>5} ok  {result['throughput_rpm']:>7.1f} rpm  "
+                  f"p50 {latency.get('p50_ms', 0):>9.1f}ms  p99 {latency.get('p99_ms', 0):>9.1f}ms  "
+                  f"failed {sum(result['failures'].values())}")
+        print(f"  server 429s: {run['server_429']}")
+    
+    write_results('llm-scheduler', f'{args.server_rpm}rpm', {
+        'server_rpm': args.server_rpm,
+        'server_tpm': args.server_tpm,
+        'latency_ms': args.latency_ms,
+        'interactive_callers': args.interactive,
+        'batch_callers': args.batch,
+        'runs': runs
+    })
+
+if __name__ == '__main__':
+    main()
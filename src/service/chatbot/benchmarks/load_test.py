@@ -0,0 +1,147 @@
+# src/service/chatbot/benchmarks/load_test.py
+"""HTTP load test per endpoint (p50/p95/p99 + throughput), hasil JSON di benchmarks/results
+
+Default: boot app.py in-process (roster sintetis, fake OpenAI, DB stand-in) di server WSGI threaded.
+
+    python benchmarks/load_test.py --roster 100k --concurrency 16 --duration 30
+    python benchmarks/load_test.py --url http://127.0.0.1:5001 --roster 1k   # server yang sudah jalan
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from bench_env import load_app, percentiles, write_results
+from fake_openai_server import start_in_thread
+
+# (nama, bobot, method, path builder, body builder)
+def endpoint_mix(roster, rng):
+    return [
+        ('GET /api/student/<nis>/analysis', 40, 'GET', lambda: f'/api/student/{rng.choice(roster)}/analysis', None),
+        ('POST /api/students/analysis', 5, 'POST', lambda: '/api/students/analysis',
+         lambda: {'nis': rng.sample(roster, min(50, len(roster)))}),
+        ('POST /api/dataset/query', 25, 'POST', lambda: '/api/dataset/query',
+         lambda: {'question': rng.choice(['berapa jumlah siswa?', 'rata-rata nilai matematika',
+                                          'mata pelajaran terbaik apa?'])}),
+        ('GET /api/cohort/summary', 10, 'GET', lambda: '/api/cohort/summary', None),
+        ('POST /api/chat', 20, 'POST', lambda: '/api/chat',
+         lambda: {'message': rng.choice(['halo', 'tips belajar matematika', 'bagaimana nilaiku?']),
+                  'nis': rng.choice(roster)}),
+    ]
+
+def serve_in_thread(app, port):
+    import logging
+    from werkzeug.serving import make_server
+    # Access log per request akan mendominasi waktu CPU benchmark
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-wsgi', daemon=True).start()
+    return server
+
+def worker(base_url, mix, deadline, seed, results, errors, lock):
+    rng = random.Random(seed)
+    parsed = urlparse(base_url)
+    weights = [entry[1] for entry in mix]
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+    local = defaultdict(list)
+    local_errors = defaultdict(int)
+    
+    while time.perf_counter() < deadline:
+        name, _, method, path, body = rng.choices(mix, weights)[0]
+        payload = json.dumps(body()).encode('utf-8') if body else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        started = time.perf_counter()
+        try:
+            connection.request(method, path(), body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except Exception:
+            connection.close()
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+            status = 'exception'
+        elapsed = time.perf_counter() - started
+        if status == 200:
+            local[name].append(elapsed)
+        else:
+            local_errors[f'{name} {status}'] += 1
+    
+    connection.close()
+    with lock:
+        for name, samples in local.items():
+            results[name].extend(samples)
+        for name, count in local_errors.items():
+            errors[name] += count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', default='1k', help='1k, 100k or 1m')
+    parser.add_argument('--url', help='target server; default boots app.py in-process')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--openai-port', type=int, default=8911)
+    parser.add_argument('--openai-latency-ms', type=float, default=300)
+    parser.add_argument('--db-latency-ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    if args.url:
+        base_url = args.url.rstrip('/')
+        from generate_roster import SIZES, FIRST_NIS
+        n = SIZES.get(args.roster.lower()) or int(args.roster)
+        roster = [str(FIRST_NIS + i) for i in range(n)]
+    else:
+        start_in_thread(port=args.openai_port, latency_ms=args.openai_latency_ms)
+        app = load_app(args.roster, openai_port=args.openai_port, db_latency_ms=args.db_latency_ms)
+        serve_in_thread(app, args.port)
+        base_url = f'http://127.0.0.1:{args.port}'
+        roster = [str(nis) for nis in app.score_store.nis]
+    
+    mix = endpoint_mix(roster, random.Random(args.seed))
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    print(f"🚀 Load test {base_url}: {args.concurrency} workers x {args.duration}s on {len(roster)} siswa")
+    
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, mix, deadline, args.seed + i, results, errors, lock))
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    endpoints = {}
+    for name, *_ in mix:
+        summary = percentiles(results.get(name, []))
+        summary['throughput_rps'] = round(summary['count'] / elapsed, 2)
+        endpoints[name] = summary
+        if summary['count']:
+            print(f"  {name:<36} {summary['throughput_rps']:>8.1f} rps  p50 {summary['p50_ms']:>9.2f}ms  "
+                  f"p95 {summary['p95_ms']:>9.2f}ms  p99 {summary['p99_ms']:>9.2f}ms")
+    total = sum(len(samples) for samples in results.values())
+    print(f"  total {total / elapsed:.1f} rps, errors {sum(errors.values())}")
+    
+    write_results('load', args.roster, {
+        'target': base_url,
+        'concurrency': args.concurrency,
+        'duration_seconds': round(elapsed, 3),
+        'openai_latency_ms': args.openai_latency_ms,
+        'db_latency_ms': args.db_latency_ms,
+        'total_throughput_rps': round(total / elapsed, 2),
+        'endpoints': endpoints,
+        'errors': dict(errors)
+    })
+
+if __name__ == '__main__':
+    main()
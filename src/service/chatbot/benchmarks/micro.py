@@ -0,0 +1,99 @@
+# src/service/chatbot/benchmarks/micro.py
+"""Micro-benchmark fungsi inti app.py pada roster sintetis, hasil disimpan ke benchmarks/results/*.json
+
+    python benchmarks/micro.py --roster 100k --db-latency-ms 1
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from bench_env import load_app, percentiles, write_results
+from score_bundle import write_bundle, open_bundle
+
+QUESTIONS = [
+    'berapa jumlah siswa?',
+    'rata-rata nilai matematika',
+    'mata pelajaran terbaik apa?',
+    'mata pelajaran terlemah apa?',
+    'bagaimana nilai ipa siswa?',
+    'rata-rata MTK kelas B',
+    'siswa terbaik di IPA'
+]
+
+def run(name, func, iterations, max_seconds):
+    """Jalankan func() hingga iterations kali atau max_seconds habis; return ringkasan latensi"""
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            break
+    summary = percentiles(samples)
+    print(f"  {name:<40} p50 {summary['p50_ms']:>10.3f}ms  p99 {summary['p99_ms']:>10.3f}ms  n={summary['count']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', default='1k', help='1k, 100k or 1m')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--max-seconds', type=float, default=20.0, help='time budget per benchmark')
+    parser.add_argument('--db-latency-ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    app = load_app(args.roster, db_latency_ms=args.db_latency_ms)
+    roster = [str(nis) for nis in app.score_store.nis]
+    sample_analysis = app.get_detailed_student_analysis(roster[0])
+    raw_dataset = app.dataset if app.dataset is not None else app.load_dataset()
+    bundle_dir = tempfile.mkdtemp(prefix='rogrow-bundle-')
+    write_bundle(app.score_store, bundle_dir)
+    print(f"📊 Micro-benchmarks on {len(roster)} siswa")
+    
+    heavy = max(1, args.iterations // 20)
+    results = {
+        'preprocess_data': run('preprocess_data', app.preprocess_data, heavy, args.max_seconds),
+        'score_store_build': run(
+            'ScoreStore.from_dataframe', lambda: app.ScoreStore.from_dataframe(raw_dataset), heavy, args.max_seconds
+        ),
+        'open_bundle': run(
+            'open_bundle (mmap) + lookup', lambda: open_bundle(bundle_dir)[0].row_of(rng.choice(roster)),
+            args.iterations, args.max_seconds
+        ),
+        'get_detailed_student_analysis': run(
+            'get_detailed_student_analysis', lambda: app.get_detailed_student_analysis(rng.choice(roster)),
+            args.iterations, args.max_seconds
+        ),
+        'get_batch_student_analysis_100': run(
+            'get_batch_student_analysis (100 NIS)',
+            lambda: app.get_batch_student_analysis(rng.sample(roster, min(100, len(roster)))),
+            heavy, args.max_seconds
+        ),
+        'get_answer_for_question': run(
+            'get_answer_for_question',
+            lambda: app.get_answer_for_question(rng.choice(QUESTIONS), app.cohort_aggregates),
+            args.iterations, args.max_seconds
+        ),
+        'format_student_analysis_response': run(
+            'format_student_analysis_response', lambda: app.format_student_analysis_response(sample_analysis),
+            args.iterations, args.max_seconds
+        ),
+        'format_predictions_response': run(
+            'format_predictions_response', lambda: app.format_predictions_response(sample_analysis),
+            args.iterations, args.max_seconds
+        ),
+    }
+    
+    write_results('micro', args.roster, {
+        'students': len(roster),
+        'db_latency_ms': args.db_latency_ms,
+        'iterations': args.iterations,
+        'benchmarks': results
+    })
+
+if __name__ == '__main__':
+    main()
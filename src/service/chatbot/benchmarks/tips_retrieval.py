@@ -0,0 +1,120 @@
+# src/service/chatbot/benchmarks/tips_retrieval.py
+"""Latensi chat dan jumlah panggilan LLM dengan dan tanpa index tips belajar, hasil JSON di benchmarks/results
+
+Mix pertanyaan: parafrase tips belajar (typo/gaya chat) dan pertanyaan lain. Mode 'off' tanpa
+retrieval (semua ke LLM), mode 'on' lewat study_tips: skor tinggi dijawab lokal, sedang jadi konteks.
+Juga mengukur build index dari CSV vs load .npz tersimpan.
+
+    python benchmarks/tips_retrieval.py --requests 400 --latency-ms 300
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from bench_env import CHATBOT_DIR, load_app, percentiles, write_results
+from fake_openai_server import start_in_thread
+
+TIP_QUESTIONS = [
+    'gimana supaya nggak ngantuk waktu belajar?',
+    'apa itu teknik pomodoro?',
+    'aku malas belajar nih',
+    'cara hafal perkalian 7 gimana',
+    'tips belajar bahasa inggris dong',
+    'cara bikin mind map',
+    'aku takut ulangan besok',
+    'gmn cara fokus blajar',
+    'nilai ipa saya jelek',
+    'berapa jam tidur yang cukup buat anak sd',
+    'cara membaca buku biar paham',
+    'anakku kecanduan game',
+]
+OTHER_QUESTIONS = [
+    'jelaskan apa itu fotosintesis',
+    'siapa presiden pertama indonesia',
+    'buatkan pantun tentang sekolah',
+    'kenapa langit berwarna biru?',
+    'apa bedanya hewan herbivora dan karnivora',
+    'ceritakan tentang candi borobudur',
+]
+
+def run_mode(app, mode, questions, index):
+    # 'off': retrieval dimatikan dengan index kosong (seperti STUDY_TIPS=0)
+    app._study_tips_index = index if mode == 'on' else None
+    app._study_tips_index_loaded = True
+    samples = defaultdict(list)
+    outcomes = defaultdict(int)
+    for question in questions:
+        started = time.perf_counter()
+        _, metadata = app.get_chat_response([{'role': 'user', 'content': question}], use_cache=False)
+        kind = 'tip' if question in TIP_QUESTIONS else 'other'
+        samples[kind].append(time.perf_counter() - started)
+        outcomes[metadata.get('retrieval', {}).get('outcome', 'none')] += 1
+    return samples, dict(outcomes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8914)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--tip-share', type=float, default=0.6, help='fraksi pertanyaan tips belajar')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    server = start_in_thread(port=args.port, latency_ms=args.latency_ms, chunk_ms=0)
+    app = load_app('1k', openai_port=args.port)
+    import study_tips
+    
+    corpus = os.path.join(CHATBOT_DIR, 'dataChatBot', 'tips_belajar.csv')
+    with tempfile.TemporaryDirectory() as directory:
+        index_path = os.path.join(directory, 'study_tips.npz')
+        started = time.perf_counter()
+        study_tips.load_or_build(corpus, index_path)
+        build_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        index = study_tips.load_or_build(corpus, index_path)
+        load_ms = (time.perf_counter() - started) * 1000
+    
+    rng = random.Random(args.seed)
+    questions = [
+        rng.choice(TIP_QUESTIONS) if rng.random() < args.tip_share else rng.choice(OTHER_QUESTIONS)
+        for _ in range(args.requests)
+    ]
+    print(f"🚀 {args.requests} chat ({args.tip_share:.0%} tips), fake OpenAI {args.latency_ms:.0f}ms; "
+          f"index build {build_ms:.0f}ms, load {load_ms:.1f}ms")
+    
+    runs = []
+    for mode in ('off', 'on'):
+        served_before = server.RequestHandlerClass.requests_served
+        started = time.perf_counter()
+        samples, outcomes = run_mode(app, mode, questions, index)
+        elapsed = time.perf_counter() - started
+        run = {
+            'mode': mode,
+            'duration_seconds': round(elapsed, 3),
+            'llm_calls': server.RequestHandlerClass.requests_served - served_before,
+            'outcomes': outcomes,
+            'latency': percentiles(samples['tip'] + samples['other']),
+            'tip_latency': percentiles(samples['tip']),
+            'other_latency': percentiles(samples['other'])
+        }
+        runs.append(run)
+        print(f"  {mode:<4} llm calls {run['llm_calls']:>5}  p50 {run['latency']['p50_ms']:>8.2f}ms  "
+              f"tips p50 {run['tip_latency']['p50_ms']:>8.2f}ms  {outcomes}")
+    server.shutdown()
+    
+    write_results('tips-retrieval', f"{args.requests}req", {
+        'latency_ms': args.latency_ms,
+        'tip_share': args.tip_share,
+        'index_build_ms': round(build_ms, 1),
+        'index_load_ms': round(load_ms, 2),
+        'answer_threshold': app.STUDY_TIPS_ANSWER_THRESHOLD,
+        'context_threshold': app.STUDY_TIPS_CONTEXT_THRESHOLD,
+        'runs': runs
+    })
+
+if __name__ == '__main__':
+    main()
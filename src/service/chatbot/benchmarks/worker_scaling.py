@@ -0,0 +1,167 @@
+# src/service/chatbot/benchmarks/worker_scaling.py
+"""Throughput dan memori gunicorn pre-fork per jumlah worker (gunicorn.conf.py), hasil JSON di benchmarks/results
+
+Setiap jumlah worker: boot gunicorn, load test dengan mix endpoint load_test.py, lalu ukur PSS
+(Proportional Set Size, halaman bersama dibagi rata antar proses) induk + semua worker dari /proc.
+
+    python benchmarks/worker_scaling.py --roster 100k --workers 1,2,4,8 --duration 20
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from bench_env import CHATBOT_DIR, roster_dir, percentiles, write_results
+from fake_openai_server import start_in_thread
+from load_test import endpoint_mix, worker
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as handle:
+            return [int(value) for value in handle.read().split()]
+    except OSError:
+        return []
+
+def memory_kb(pid):
+    """(pss, rss) dalam kB dari /proc/<pid>/smaps_rollup (Linux)"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as handle:
+            for line in handle:
+                key, _, rest = line.partition(':')
+                if key in ('Pss', 'Rss'):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get('Pss', 0), values.get('Rss', 0)
+
+def wait_ready(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/health/ready')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+def boot_gunicorn(workers, port, env):
+    command = [shutil.which('gunicorn') or 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    env = dict(env, WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}')
+    return subprocess.Popen(command, cwd=CHATBOT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run_load(base_url, roster, concurrency, duration, seed):
+    # Tanpa /api/chat: fokus ke CPU per worker, bukan latensi LLM
+    mix = [entry for entry in endpoint_mix(roster, random.Random(seed)) if entry[0] != 'POST /api/chat']
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, mix, deadline, seed + i, results, errors, lock))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    samples = [value for values in results.values() for value in values]
+    return samples, elapsed, sum(errors.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', default='100k', help='1k, 100k or 1m')
+    parser.add_argument('--workers', default='1,2,4', help='daftar jumlah worker, dipisah koma')
+    parser.add_argument('--threads', type=int, default=4, help='thread per worker (gthread)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--openai-port', type=int, default=8911)
+    parser.add_argument('--bundle', action='store_true', help='ingest bundle .npy dulu (mmap) alih-alih shared memory')
+    parser.add_argument('--boot-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    if shutil.which('gunicorn') is None:
+        sys.exit("❌ gunicorn tidak ditemukan (pip install -r requirements.txt)")
+    
+    start_in_thread(port=args.openai_port, latency_ms=50)
+    data_dir = roster_dir(args.roster)
+    from generate_roster import SIZES, FIRST_NIS
+    n = SIZES.get(args.roster.lower()) or int(args.roster)
+    roster = [str(FIRST_NIS + i) for i in range(n)]
+    env = dict(
+        os.environ,
+        CHATBOT_DATA_DIR=data_dir,
+        OPENAI_API_KEY='bench-dummy-key',
+        OPENAI_BASE_URL=f'http://127.0.0.1:{args.openai_port}/v1',
+        GUNICORN_THREADS=str(args.threads),
+        DATA_BUNDLE='1' if args.bundle else '0',
+        CHATBOT_INGEST_ON_START='1' if args.bundle else '0',
+        # Tanpa Postgres: lookup DB gagal cepat (backoff pool) lalu fallback ke score store
+        ANALYSIS_CACHE_LISTEN='0',
+        DB_SCORE_LOADER='0',
+        DB_PORT=os.getenv('DB_PORT', '1'),
+    )
+    
+    runs = []
+    print(f"🚀 Worker scaling on {n} siswa ({'bundle mmap' if args.bundle else 'shared memory'}), "
+          f"{os.cpu_count()} CPU")
+    for workers in [int(value) for value in args.workers.split(',')]:
+        process = boot_gunicorn(workers, args.port, env)
+        try:
+            if not wait_ready(args.port, args.boot_timeout):
+                print(f"❌ gunicorn {workers} worker tidak siap dalam {args.boot_timeout:.0f}s")
+                continue
+            samples, elapsed, errors = run_load(f'http://127.0.0.1:{args.port}', roster,
+                                                args.concurrency, args.duration, args.seed)
+            pids = [process.pid] + children(process.pid)
+            memory = [memory_kb(pid) for pid in pids]
+            summary = percentiles(samples)
+            run = {
+                'workers': workers,
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'p50_ms': summary.get('p50_ms'),
+                'p99_ms': summary.get('p99_ms'),
+                'errors': errors,
+                'processes': len(pids),
+                'pss_total_mb': round(sum(pss for pss, _ in memory) / 1024, 1),
+                'rss_total_mb': round(sum(rss for _, rss in memory) / 1024, 1),
+            }
+            runs.append(run)
+            print(f"  {workers:>3} worker  {run['throughput_rps']:>8.1f} rps  p50 {run['p50_ms']:>8.2f}ms  "
+                  f"p99 {run['p99_ms']:>8.2f}ms  PSS {run['pss_total_mb']:>8.1f} MB  RSS {run['rss_total_mb']:>8.1f} MB")
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+    
+    if runs:
+        baseline = runs[0]['throughput_rps'] / runs[0]['workers']
+        for run in runs:
+            run['scaling_efficiency'] = round(run['throughput_rps'] / (baseline * run['workers']), 3) if baseline else None
+    
+    write_results('workers', args.roster, {
+        'cpu_count': os.cpu_count(),
+        'threads_per_worker': args.threads,
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'score_source': 'bundle' if args.bundle else 'shared_memory',
+        'runs': runs
+    })
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# src/service/chatbot/circuit_breaker.py
+
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Panggilan tidak dijalankan karena circuit sedang open (atau slot probe half-open terpakai)"""
+    
+    def __init__(self, name, state, retry_after):
+        super().__init__(f"Circuit {name} is {state} (probe in {retry_after:.1f}s)")
+        self.state = state
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Circuit breaker berbasis error rate + slow call rate atas N panggilan terakhir
+    
+    closed: semua panggilan jalan; open jika dari >= min_calls panggilan terakhir, rasio gagal atau
+    lambat (>= slow_call_seconds) mencapai failure_rate. open: semua panggilan langsung ditolak
+    (CircuitOpenError) selama open_seconds. half_open: maksimal half_open_probes panggilan percobaan;
+    semuanya sukses -> closed, satu gagal -> open lagi dengan jeda dua kali lipat (maks max_open_seconds).
+    """
+    
+    def __init__(self, name='llm', failure_rate=0.5, window=20, min_calls=5, slow_call_seconds=10.0,
+                 open_seconds=15.0, max_open_seconds=120.0, half_open_probes=1, on_transition=None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        # on_transition(state_lama, state_baru) untuk metrics/log
+        self.on_transition = on_transition
+        
+        self.state = CLOSED
+        # True = gagal atau lambat, per panggilan yang selesai saat closed
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._opened_at = None
+        self._current_open_seconds = open_seconds
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # Generasi state: hasil panggilan yang dimulai sebelum transisi tidak dihitung
+        self._generation = 0
+        
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.short_circuited = 0
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self.last_failure = None
+    
+    def _transition(self, state, now):
+        previous, self.state = self.state, state
+        self._generation += 1
+        self.transitions[state] += 1
+        if state == OPEN:
+            self._opened_at = now
+            self._probes_in_flight = 0
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        else:
+            self._outcomes.clear()
+            self._current_open_seconds = self.open_seconds
+        return previous
+    
+    def _notify(self, previous, state):
+        print(f"🔌 Circuit {self.name}: {previous} -> {state}")
+        if self.on_transition:
+            self.on_transition(previous, state)
+    
+    def retry_after(self, now=None):
+        """Detik sampai probe half-open berikutnya diizinkan (0 jika tidak open)"""
+        if self.state != OPEN:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._opened_at + self._current_open_seconds - now)
+    
+    def is_open(self):
+        """True jika panggilan saat ini pasti ditolak (tanpa mengubah state)"""
+        with self._lock:
+            if self.state == OPEN:
+                return self.retry_after() > 0
+            return self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes
+    
+    def check(self):
+        """Raise CircuitOpenError lebih awal (sebelum antri budget) jika panggilan pasti ditolak"""
+        if self.is_open():
+            with self._lock:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.name, self.state, self.retry_after())
+    
+    def acquire(self):
+        """Izin satu panggilan; return permit untuk release(), atau raise CircuitOpenError"""
+        transition = None
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and self.retry_after(now) <= 0:
+                transition = (self._transition(HALF_OPEN, now), HALF_OPEN)
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes):
+                self.short_circuited += 1
+                raise CircuitOpenError(self.name, self.state, self.retry_after(now))
+            if self.state == HALF_OPEN:
+                self._probes_in_flight += 1
+            self.calls += 1
+            permit = (self._generation, self.state, now)
+        if transition:
+            self._notify(*transition)
+        return permit
+    
+    def release(self, permit, ok, error=None):
+        """Catat hasil panggilan: ok True/False; None = netral (mis. ditolak antrian lokal, bukan salah provider)"""
+        generation, state, started = permit
+        transition = None
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - started
+            slow = ok is not None and elapsed >= self.slow_call_seconds
+            if ok is False:
+                self.failures += 1
+                self.last_failure = error
+            if slow:
+                self.slow_calls += 1
+            if generation != self._generation:
+                # State sudah berganti sejak panggilan dimulai: hasilnya milik periode lama
+                pass
+            elif state == HALF_OPEN:
+                self._probes_in_flight -= 1
+                if ok is False or slow:
+                    self._current_open_seconds = min(self.max_open_seconds, self._current_open_seconds * 2)
+                    transition = (self._transition(OPEN, now), OPEN)
+                elif ok:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        transition = (self._transition(CLOSED, now), CLOSED)
+            elif ok is not None:
+                self._outcomes.append(ok is False or slow)
+                if len(self._outcomes) >= self.min_calls and self._bad_rate() >= self.failure_rate:
+                    transition = (self._transition(OPEN, now), OPEN)
+        if transition:
+            self._notify(*transition)
+    
+    def _bad_rate(self):
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+    
+    def call(self, func, is_failure=lambda error: True):
+        """Jalankan func() lewat breaker; is_failure(error) False = error tidak dihitung (netral)"""
+        permit = self.acquire()
+        try:
+            result = func()
+        except BaseException as e:
+            self.release(permit, False if isinstance(e, Exception) and is_failure(e) else None, type(e).__name__)
+            raise
+        self.release(permit, True)
+        return result
+    
+    async def call_async(self, func, is_failure=lambda error: True):
+        permit = self.acquire()
+        try:
+            result = await func()
+        except BaseException as e:
+            # CancelledError (klien putus) juga netral
+            self.release(permit, False if isinstance(e, Exception) and is_failure(e) else None, type(e).__name__)
+            raise
+        self.release(permit, True)
+        return result
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'state_value': STATE_VALUES[self.state],
+                'bad_call_rate': round(self._bad_rate(), 3),
+                'window_calls': len(self._outcomes),
+                'retry_after_seconds': round(self.retry_after(), 3),
+                'open_seconds': self._current_open_seconds,
+                'calls': self.calls,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'short_circuited': self.short_circuited,
+                'transitions': dict(self.transitions),
+                'last_failure': self.last_failure
+            }
@@ -0,0 +1,120 @@
+# src/service/chatbot/cohort_aggregates.py
+
+import threading
+
+import numpy as np
+
+from score_store import SUBJECTS, SCORE_KINDS, SUBJECT_NAMES
+
+# Distribusi skor dalam 10 bin: [0,10), [10,20), ..., [90,100]
+DISTRIBUTION_BINS = 10
+
+class GroupAggregate:
+    """Jumlah, total skor dan histogram untuk satu kelompok siswa"""
+    
+    def __init__(self):
+        self.count = 0
+        self.sums = np.zeros((len(SUBJECTS), len(SCORE_KINDS)), dtype=np.float64)
+        self.histogram = np.zeros((len(SUBJECTS), len(SCORE_KINDS), DISTRIBUTION_BINS), dtype=np.int64)
+    
+    def add_many(self, scores, sign=1):
+        """Add (or remove with sign=-1) a (n, subjects, kinds) block of scores"""
+        self.count += sign * len(scores)
+        self.sums += sign * scores.sum(axis=0)
+        bins = np.clip((scores // 10).astype(np.int64), 0, DISTRIBUTION_BINS - 1)
+        for s in range(len(SUBJECTS)):
+            for k in range(len(SCORE_KINDS)):
+                self.histogram[s, k] += sign * np.bincount(bins[:, s, k], minlength=DISTRIBUTION_BINS)
+    
+    def means(self):
+        if self.count <= 0:
+            return np.full(self.sums.shape, np.nan)
+        return self.sums / self.count
+    
+    def subject_means(self):
+        """Rata-rata (kuis + tugas) / 2 per mapel"""
+        means = self.means()
+        return {subject: float((means[s, 0] + means[s, 1]) / 2) for s, subject in enumerate(SUBJECTS)}
+    
+    def to_dict(self):
+        means = self.means()
+        return {
+            'count': int(self.count),
+            'subjects': {
+                subject: {
+                    'nama_mapel': SUBJECT_NAMES[subject],
+                    'rata_rata_kuis': float(means[s, 0]),
+                    'rata_rata_tugas': float(means[s, 1]),
+                    'rata_rata': float((means[s, 0] + means[s, 1]) / 2),
+                    'distribusi_kuis': self.histogram[s, 0].tolist(),
+                    'distribusi_tugas': self.histogram[s, 1].tolist()
+                }
+                for s, subject in enumerate(SUBJECTS)
+            }
+        }
+
+class CohortAggregates:
+    """Agregat kohort (semua siswa, per kelas, per gender) yang di-update inkremental"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.overall = GroupAggregate()
+        self.by_class = {}
+        self.by_gender = {}
+        self._subject_means = {}
+    
+    @classmethod
+    def from_store(cls, store):
+        """Build all aggregates from a ScoreStore in one vectorized pass"""
+        aggregates = cls()
+        scores = store.scores
+        aggregates.overall.add_many(scores)
+        for groups, labels in ((aggregates.by_class, store.kelas), (aggregates.by_gender, store.gender)):
+            for label in dict.fromkeys(labels):
+                groups.setdefault(label, GroupAggregate()).add_many(scores[labels == label])
+        aggregates._refresh()
+        return aggregates
+    
+    def __len__(self):
+        return int(self.overall.count)
+    
+    def apply_update(self, old, new):
+        """Apply a student row change; old/new are (kelas, gender, scores) or None"""
+        with self._lock:
+            for record, sign in ((old, -1), (new, 1)):
+                if record is None:
+                    continue
+                kelas, gender, scores = record
+                block = np.asarray(scores, dtype=np.float64)[np.newaxis]
+                self.overall.add_many(block, sign)
+                self.by_class.setdefault(kelas, GroupAggregate()).add_many(block, sign)
+                self.by_gender.setdefault(gender, GroupAggregate()).add_many(block, sign)
+            self._refresh()
+    
+    def _refresh(self):
+        self._subject_means = self.overall.subject_means()
+        self.version += 1
+    
+    def subject_means(self, kelas=None, gender=None):
+        """Rata-rata per mapel untuk semua siswa, satu kelas, atau satu gender"""
+        if kelas is None and gender is None:
+            return self._subject_means
+        group = self.by_class.get(kelas) if kelas is not None else self.by_gender.get(gender)
+        if group is None or group.count <= 0:
+            return {}
+        return group.subject_means()
+    
+    def best_subject(self):
+        return max(self._subject_means, key=self._subject_means.get)
+    
+    def worst_subject(self):
+        return min(self._subject_means, key=self._subject_means.get)
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'overall': self.overall.to_dict(),
+            'by_class': {str(label): group.to_dict() for label, group in self.by_class.items() if group.count > 0},
+            'by_gender': {str(label): group.to_dict() for label, group in self.by_gender.items() if group.count > 0}
+        }
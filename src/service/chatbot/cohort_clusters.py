@@ -0,0 +1,304 @@
+# src/service/chatbot/cohort_clusters.py
+
+import threading
+import time
+
+import numpy as np
+
+from score_store import SUBJECTS, SCORE_KINDS, SUBJECT_NAMES
+
+# Nama klaster diurutkan dari rata-rata centroid tertinggi ke terendah
+CLUSTER_TIERS = ['Berprestasi tinggi', 'Di atas rata-rata', 'Rata-rata', 'Perlu pendampingan', 'Perlu intervensi']
+
+def _tier_names(order):
+    """Nama tingkat untuk urutan klaster (rata-rata centroid menurun), disebar merata atas CLUSTER_TIERS"""
+    names = {}
+    used = set()
+    for rank, cluster in enumerate(order):
+        name = CLUSTER_TIERS[round(rank * (len(CLUSTER_TIERS) - 1) / max(1, len(order) - 1))]
+        if name in used:
+            name = f"{name} ({rank + 1})"
+        used.add(name)
+        names[int(cluster)] = name
+    return names
+
+class ClusterSnapshot:
+    """Hasil clustering immutable: label per baris score store + centroid (skala nilai asli)"""
+    
+    def __init__(self, version, store, data_rows, labels, distances, centroids, mean, scale, fitted_at, fit_seconds):
+        self.version = version
+        # Store yang dipakai saat fit: label hanya berlaku untuk baris store ini
+        self.store = store
+        self.data_rows = data_rows
+        self.labels = labels
+        self.distances = distances
+        # centroids: (k, len(SUBJECTS) * len(SCORE_KINDS)) dalam skala standar
+        self.centroids = centroids
+        self.mean = mean
+        self.scale = scale
+        self.fitted_at = fitted_at
+        self.fit_seconds = fit_seconds
+        self.sizes = np.bincount(labels, minlength=len(centroids)) if len(labels) else np.zeros(len(centroids), dtype=np.int64)
+        raw = self.raw_centroids()
+        self.names = _tier_names(np.argsort(-raw.mean(axis=1), kind='stable'))
+    
+    def raw_centroids(self):
+        return self.centroids * self.scale + self.mean
+    
+    def assign(self, scores):
+        """Klaster terdekat + jarak untuk array skor (n, subjects, kinds)"""
+        vectors = (scores.reshape(len(scores), -1) - self.mean) / self.scale
+        distances = ((vectors[:, np.newaxis, :] - self.centroids[np.newaxis]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        return labels, np.sqrt(distances[np.arange(len(labels)), labels])
+    
+    def describe(self, cluster):
+        centroid = self.raw_centroids()[cluster].reshape(len(SUBJECTS), len(SCORE_KINDS))
+        averages = centroid.mean(axis=1)
+        return {
+            'id': int(cluster),
+            'nama': self.names[int(cluster)],
+            'jumlah_siswa': int(self.sizes[cluster]),
+            'rata_rata': round(float(centroid.mean()), 2),
+            'terkuat': SUBJECT_NAMES[SUBJECTS[int(averages.argmax())]],
+            'terlemah': SUBJECT_NAMES[SUBJECTS[int(averages.argmin())]],
+            'centroid': {
+                subject: {'quiz': round(float(centroid[s, 0]), 2), 'tugas': round(float(centroid[s, 1]), 2)}
+                for s, subject in enumerate(SUBJECTS)
+            }
+        }
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'fitted_at': self.fitted_at,
+            'fit_seconds': round(self.fit_seconds, 4),
+            'n_clusters': len(self.centroids),
+            'students': int(self.sizes.sum()),
+            'clusters': [self.describe(cluster) for cluster in np.argsort(-self.raw_centroids().mean(axis=1), kind='stable')]
+        }
+
+class ClusterEngine:
+    """MiniBatchKMeans atas vektor 14 skor siswa; refit inkremental (partial_fit) di background thread
+    
+    Request hanya membaca snapshot terakhir: lookup klaster per siswa O(1) lewat index baris score store.
+    Reload data memberi store baru beserta baris yang skornya berubah: hanya baris itu yang masuk
+    partial_fit, lalu seluruh roster dilabel ulang terhadap centroid yang sudah digeser.
+    """
+    
+    def __init__(self, n_clusters=4, batch_size=1024, interval=30.0, random_state=42):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.interval = interval
+        self.random_state = random_state
+        self.store = None
+        self.snapshot = None
+        self.model = None
+        self.refits = 0
+        self._version = 0
+        self._pending = set()
+        self._full_refit = True
+        self._pending_lock = threading.Lock()
+        self._fit_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def attach(self, store, changed_rows=None):
+        """Mulai clustering untuk score store (fit/update berjalan di background thread)
+        
+        changed_rows: baris store baru yang skornya berubah dibanding store sebelumnya (reload data);
+        None memicu fit penuh. Snapshot lama tetap melayani lookup untuk store lamanya sampai
+        update selesai.
+        """
+        with self._pending_lock:
+            self.store = store
+            if changed_rows is None:
+                self._full_refit = True
+                self._pending.clear()
+            elif self._pending:
+                # Baris tertunda milik store sebelumnya: tidak bisa digabung, fit ulang penuh
+                self._full_refit = True
+                self._pending.clear()
+            else:
+                self._pending = {int(row) for row in changed_rows}
+        if self._thread and self._thread.is_alive():
+            self._wake.set()
+        else:
+            self.start()
+    
+    def _vectors(self, scores):
+        return scores.reshape(len(scores), len(SUBJECTS) * len(SCORE_KINDS))
+    
+    def fit(self):
+        """Fit penuh: standarisasi per kolom lalu MiniBatchKMeans"""
+        with self._fit_lock:
+            return self._fit()
+    
+    def _fit(self):
+        from sklearn.cluster import MiniBatchKMeans
+        started = time.perf_counter()
+        with self._pending_lock:
+            store = self.store
+            self._pending.clear()
+            self._full_refit = False
+        vectors = self._vectors(store.scores.copy())
+        if len(vectors) < self.n_clusters:
+            return None
+        
+        mean = vectors.mean(axis=0)
+        scale = vectors.std(axis=0)
+        scale[scale == 0] = 1.0
+        model = MiniBatchKMeans(
+            n_clusters=self.n_clusters,
+            batch_size=self.batch_size,
+            random_state=self.random_state,
+            n_init=3
+        )
+        try:
+            model.fit((vectors - mean) / scale)
+        except Exception:
+            self._requeue(store, None)
+            raise
+        self.model = model
+        return self._publish(store, vectors, mean, scale, time.perf_counter() - started)
+    
+    def partial_update(self):
+        """partial_fit dengan baris yang berubah, lalu label ulang seluruh roster store terbaru (vectorized)"""
+        with self._fit_lock:
+            with self._pending_lock:
+                rows = sorted(self._pending)
+                self._pending.clear()
+                store = self.store
+                full_refit = self._full_refit
+            if full_refit or self.model is None or self.snapshot is None:
+                return self._fit()
+            snapshot = self.snapshot
+            if not rows and snapshot.store is store:
+                return None
+            
+            # Standarisasi snapshot lama dipertahankan agar centroid model tetap sebanding
+            started = time.perf_counter()
+            try:
+                vectors = self._vectors(store.scores.copy())
+                changed = (vectors[rows] - snapshot.mean) / snapshot.scale
+                for start in range(0, len(changed), self.batch_size):
+                    self.model.partial_fit(changed[start:start + self.batch_size])
+                return self._publish(store, vectors, snapshot.mean, snapshot.scale, time.perf_counter() - started)
+            except Exception:
+                self._requeue(store, rows)
+                raise
+    
+    def _requeue(self, store, rows):
+        """Kembalikan pekerjaan yang gagal ke antrian agar retry interval di _run mengulanginya
+        
+        rows None berarti fit penuh yang gagal. Jika store sudah diganti attach selama update,
+        baris lama tidak lagi sebanding dengan baris tertunda store baru: fit ulang penuh.
+        """
+        with self._pending_lock:
+            if rows is None or self.store is not store:
+                self._full_refit = True
+                self._pending.clear()
+            elif not self._full_refit:
+                self._pending.update(rows)
+    
+    def _publish(self, store, vectors, mean, scale, fit_seconds):
+        centroids = self.model.cluster_centers_.copy()
+        standardized = (vectors - mean) / scale
+        # Jarak ke centroid per blok agar memori tetap kecil untuk roster besar
+        labels = np.empty(len(vectors), dtype=np.int64)
+        distances = np.empty(len(vectors), dtype=np.float64)
+        for start in range(0, len(vectors), 65536):
+            block = standardized[start:start + 65536]
+            squared = ((block[:, np.newaxis, :] - centroids[np.newaxis]) ** 2).sum(axis=2)
+            labels[start:start + len(block)] = squared.argmin(axis=1)
+            distances[start:start + len(block)] = np.sqrt(squared.min(axis=1))
+        
+        self._version += 1
+        self.refits += 1
+        # Swap referensi snapshot bersifat atomik; pembaca tidak pernah melihat snapshot setengah jadi
+        self.snapshot = ClusterSnapshot(
+            version=self._version,
+            store=store,
+            data_rows=len(vectors),
+            labels=labels,
+            distances=distances,
+            centroids=centroids,
+            mean=mean,
+            scale=scale,
+            fitted_at=time.time(),
+            fit_seconds=fit_seconds
+        )
+        return self.snapshot
+    
+    def lookup(self, nis, scores=None):
+        """Klaster untuk NIS: O(1) dari snapshot; siswa di luar snapshot dihitung dari skornya"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        
+        store = snapshot.store
+        row = store.row_of(nis)
+        if row is not None and row < snapshot.data_rows:
+            cluster, distance = int(snapshot.labels[row]), float(snapshot.distances[row])
+        else:
+            if scores is None:
+                if row is None:
+                    return None
+                scores = store.student_scores(row)
+            labels, distances = snapshot.assign(np.asarray(scores, dtype=np.float64)[np.newaxis])
+            cluster, distance = int(labels[0]), float(distances[0])
+        
+        return {
+            'cluster': cluster,
+            'nama': snapshot.names[cluster],
+            'distance': round(distance, 4),
+            'snapshot_version': snapshot.version
+        }
+    
+    def members(self, cluster, limit=100, offset=0):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        rows = np.flatnonzero(snapshot.labels == cluster)[offset:offset + limit]
+        nis = snapshot.store.nis
+        return [str(nis[row]) for row in rows]
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cluster-engine', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        try:
+            self.fit()
+        except Exception as e:
+            print(f"❌ Cluster fit failed: {e}")
+        while not self._stop.is_set():
+            # Dibangunkan oleh attach ulang; interval hanya mengulang update yang sebelumnya gagal
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.partial_update()
+            except Exception as e:
+                print(f"❌ Cluster update failed: {e}")
+    
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+    
+    def stats(self):
+        snapshot = self.snapshot
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'n_clusters': self.n_clusters,
+            'snapshot_version': snapshot.version if snapshot else None,
+            'refits': self.refits,
+            'pending_rows': pending,
+            'last_fit_seconds': round(snapshot.fit_seconds, 4) if snapshot else None
+        }
@@ -0,0 +1,152 @@
+# src/service/chatbot/conversation_history.py
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from prompt_context import count_message_tokens, count_tokens
+
+def _prefix_hash(messages):
+    raw = json.dumps([(m.get('role'), m.get('content')) for m in messages], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def local_summary(previous_summary, turns, budget_tokens):
+    """Ringkasan ekstraktif tanpa LLM: potongan awal tiap pesan, yang terbaru diprioritaskan"""
+    labels = {'user': 'Siswa', 'assistant': 'RoGrow'}
+    parts = [previous_summary] if previous_summary else []
+    for message in turns:
+        content = ' '.join(str(message.get('content', '')).split())
+        if content:
+            parts.append(f"{labels.get(message.get('role'), message.get('role'))}: {content[:120]}")
+    summary = ' | '.join(parts)
+    while count_tokens(summary) > budget_tokens and ' | ' in summary:
+        summary = summary.split(' | ', 1)[1]
+    return summary[-budget_tokens * 4:]
+
+class ConversationHistoryManager:
+    """Simpan N pesan terakhir apa adanya; pesan lama dilipat ke ringkasan bergulir per sesi"""
+    
+    def __init__(self, keep_messages=8, token_budget=1500, summary_token_budget=200,
+                 summarizer=None, max_sessions=1000, session_ttl=3600.0):
+        self.keep_messages = keep_messages
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        # summarizer(previous_summary, turns) -> str atau None (fallback ke local_summary)
+        self.summarizer = summarizer
+        self.max_sessions = max_sessions
+        # Pesan lama dilipat per blok agar ringkasan tidak dibuat ulang di setiap request
+        self.fold_step = max(2, keep_messages // 2)
+        self.session_ttl = session_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.summaries_created = 0
+        self.summary_cache_hits = 0
+    
+    def _cut_index(self, messages):
+        """Index pertama pesan yang dikirim verbatim (dalam batas jumlah pesan dan token)"""
+        cut = max(0, len(messages) - self.keep_messages)
+        while cut < len(messages) - 1 and count_message_tokens(messages[cut:]) > self.token_budget:
+            cut += 1
+        return cut
+    
+    def _summarize(self, previous_summary, turns):
+        if self.summarizer:
+            try:
+                summary = self.summarizer(previous_summary, turns)
+                if summary:
+                    return summary
+            except Exception as e:
+                print(f"❌ Conversation summarizer failed, using local summary: {e}")
+        return local_summary(previous_summary, turns, self.summary_token_budget)
+    
+    def _get_session(self, session_id):
+        with self._lock:
+            now = time.monotonic()
+            session = self._sessions.get(session_id)
+            if session is not None and session['expires_at'] <= now:
+                del self._sessions[session_id]
+                session = None
+            return dict(session) if session else None
+    
+    def _store_session(self, session_id, summary, summarized_count, prefix_hash):
+        with self._lock:
+            self._sessions[session_id] = {
+                'summary': summary,
+                'summarized_count': summarized_count,
+                'prefix_hash': prefix_hash,
+                'expires_at': time.monotonic() + self.session_ttl
+            }
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    def prepare(self, messages, session_id=None):
+        """Return (messages untuk OpenAI, metadata pemangkasan riwayat)"""
+        cut = self._cut_index(messages)
+        kept = messages[cut:]
+        info = {
+            'received_messages': len(messages),
+            'sent_messages': len(kept),
+            'summarized_messages': 0,
+            'dropped_messages': 0,
+            'summary_tokens': 0,
+            'summary_cached': False
+        }
+        
+        if cut == 0:
+            info['history_tokens'] = count_message_tokens(kept)
+            return kept, info
+        
+        if not session_id:
+            # Tanpa sesi tidak ada tempat menyimpan ringkasan: pesan lama cukup dibuang
+            info['dropped_messages'] = cut
+            info['history_tokens'] = count_message_tokens(kept)
+            return kept, info
+        
+        session = self._get_session(session_id)
+        folded = messages[:cut]
+        if session and session['summarized_count'] <= cut and \
+                session['prefix_hash'] == _prefix_hash(folded[:session['summarized_count']]):
+            summary = session['summary']
+            summarized_count = session['summarized_count']
+            if cut - summarized_count < self.fold_step and \
+                    count_message_tokens(messages[summarized_count:]) <= self.token_budget:
+                # Belum satu blok penuh: kirim sisa pesan verbatim, pakai ringkasan yang ada
+                cut = summarized_count
+                folded = messages[:cut]
+                kept = messages[cut:]
+            new_turns = folded[summarized_count:]
+        else:
+            # Sesi baru atau riwayat klien berubah: ringkas ulang dari awal
+            summary = ''
+            new_turns = folded
+        
+        if new_turns:
+            summary = self._summarize(summary, new_turns)
+            self.summaries_created += 1
+            self._store_session(session_id, summary, cut, _prefix_hash(folded))
+        else:
+            self.summary_cache_hits += 1
+            info['summary_cached'] = True
+            self._store_session(session_id, summary, cut, session['prefix_hash'])
+        
+        prepared = [{'role': 'system', 'content': f"Ringkasan percakapan sebelumnya: {summary}"}, *kept]
+        info.update({
+            'sent_messages': len(prepared),
+            'summarized_messages': cut,
+            'summary_tokens': count_tokens(summary),
+            'history_tokens': count_message_tokens(prepared)
+        })
+        return prepared, info
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'keep_messages': self.keep_messages,
+                'token_budget': self.token_budget,
+                'summaries_created': self.summaries_created,
+                'summary_cache_hits': self.summary_cache_hits
+            }
@@ -0,0 +1,137 @@
+# src/service/chatbot/data_snapshot.py
+
+import threading
+import time
+
+class DataSnapshot:
+    """Dataset, score store dan agregat kohort yang dipublikasikan bersama sebagai satu versi
+    
+    Referensi ke snapshot tidak pernah diubah setelah publish; reload membuat snapshot baru.
+    """
+    
+    def __init__(self, version, dataset, store, aggregates, source, build_seconds, data_mtime=None):
+        self.version = version
+        # dataset: DataFrame mentah (None jika dimuat dari bundle)
+        self.dataset = dataset
+        self.store = store
+        self.aggregates = aggregates
+        self.source = source
+        self.build_seconds = build_seconds
+        self.created_at = time.time()
+        # Waktu file sumber terakhir diubah (epoch detik): kapan skor ini berlaku, bukan kapan dimuat
+        self.data_mtime = data_mtime if data_mtime is not None else self.created_at
+    
+    def __len__(self):
+        return len(self.store)
+    
+    @property
+    def data_version(self):
+        """Key cache: versi snapshot + versi agregat (tetap selama snapshot aktif)"""
+        return (self.version, self.aggregates.version)
+    
+    def age(self):
+        return time.time() - self.created_at
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'students': len(self.store),
+            'aggregates_version': self.aggregates.version,
+            'created_at': self.created_at,
+            'data_mtime': self.data_mtime,
+            'age_seconds': round(self.age(), 3),
+            'build_seconds': round(self.build_seconds, 4)
+        }
+
+class SnapshotManager:
+    """Bangun snapshot di luar jalur request lalu publish dengan swap referensi atomik
+    
+    build() -> (dataset, store, aggregates, source, data_mtime). Build yang gagal tidak mengganti snapshot aktif;
+    request yang sedang berjalan tetap memakai snapshot yang dipegangnya.
+    """
+    
+    def __init__(self, build, on_publish=None, settle_seconds=0.5):
+        self.build = build
+        # on_publish(snapshot, previous) dipanggil setelah swap, di thread yang melakukan reload
+        self.on_publish = on_publish
+        self.settle_seconds = settle_seconds
+        self.current = None
+        self.ready = threading.Event()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_seconds = None
+        self._version = 0
+        self._build_lock = threading.Lock()
+    
+    def ensure_loaded(self):
+        """Muat snapshot pertama sekali; pemanggil lain menunggu build yang sama"""
+        if self.ready.is_set():
+            return self.current
+        with self._build_lock:
+            if self.current is None:
+                self._publish(self._build())
+        return self.current
+    
+    def _build(self):
+        started = time.perf_counter()
+        dataset, store, aggregates, source, data_mtime = self.build()
+        return DataSnapshot(
+            version=self._version + 1,
+            dataset=dataset,
+            store=store,
+            aggregates=aggregates,
+            source=source,
+            build_seconds=time.perf_counter() - started,
+            data_mtime=data_mtime
+        )
+    
+    def _publish(self, snapshot):
+        previous = self.current
+        self._version = snapshot.version
+        # Swap satu referensi: pembaca melihat snapshot lama atau baru, tidak pernah campuran
+        self.current = snapshot
+        self.ready.set()
+        if self.on_publish:
+            try:
+                self.on_publish(snapshot, previous)
+            except Exception as e:
+                print(f"❌ Error publishing data snapshot: {e}")
+        return snapshot
+    
+    def reload(self):
+        """Bangun dan publish snapshot baru; return snapshot baru atau None jika build gagal"""
+        with self._build_lock:
+            started = time.perf_counter()
+            try:
+                snapshot = self._build()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"❌ Data reload failed, keeping snapshot v{self._version}: {e}")
+                return None
+            self.reloads += 1
+            self.last_error = None
+            self._publish(snapshot)
+            self.last_reload_seconds = time.perf_counter() - started
+        print(f"✅ Data snapshot v{snapshot.version} published ({len(snapshot)} siswa, {self.last_reload_seconds:.2f}s)")
+        return snapshot
+    
+    def on_files_changed(self, paths):
+        """Callback FileWatcher: tunggu sebentar agar penulisan beberapa file selesai, lalu reload"""
+        if not self.ready.is_set():
+            return
+        if self.settle_seconds:
+            time.sleep(self.settle_seconds)
+        self.reload()
+    
+    def stats(self):
+        snapshot = self.current
+        return {
+            'snapshot': snapshot.to_dict() if snapshot else None,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_reload_seconds': round(self.last_reload_seconds, 4) if self.last_reload_seconds is not None else None
+        }
@@ -0,0 +1,52 @@
+# src/service/chatbot/data_watcher.py
+
+import os
+import threading
+
+class FileWatcher:
+    """Poll file mtimes/sizes in a daemon thread and report changed paths"""
+    
+    def __init__(self, paths, on_change, interval=2.0):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._signatures = {path: self._signature(path) for path in self.paths}
+    
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def check(self):
+        """Compare signatures once; returns (and reports) the list of changed paths"""
+        changed = []
+        for path in self.paths:
+            signature = self._signature(path)
+            if signature != self._signatures.get(path):
+                self._signatures[path] = signature
+                changed.append(path)
+        if changed:
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                print(f"❌ Error handling data file change: {e}")
+        return changed
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='data-file-watcher', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+    
+    def stop(self):
+        self._stop.set()
@@ -1,40 +1,401 @@
 # src/service/chatbot/database_integration.py
 
 import os
+import random
+import select
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
-import pandas as pd
+from psycopg2.extensions import QueryCanceledError
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from score_store import SUBJECTS, SCORE_KINDS, synthetic_scores
+
 load_dotenv()
 
+# Channel NOTIFY untuk perubahan data siswa (payload = NIS)
+STUDENT_CHANGE_CHANNEL = 'siswa_changes'
+
+CHANGE_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION notify_siswa_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('siswa_changes', OLD.nis);
+    ELSE
+        PERFORM pg_notify('siswa_changes', NEW.nis);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_users_siswa_change() RETURNS trigger AS $$
+DECLARE
+    changed_nis text;
+BEGIN
+    FOR changed_nis IN
+        SELECT nis FROM siswa
+        WHERE user_id = (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END)
+    LOOP
+        PERFORM pg_notify('siswa_changes', changed_nis);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS siswa_change_notify ON siswa;
+CREATE TRIGGER siswa_change_notify
+    AFTER INSERT OR UPDATE OR DELETE ON siswa
+    FOR EACH ROW EXECUTE FUNCTION notify_siswa_change();
+
+DROP TRIGGER IF EXISTS users_siswa_change_notify ON users;
+CREATE TRIGGER users_siswa_change_notify
+    AFTER DELETE OR UPDATE OF email ON users
+    FOR EACH ROW EXECUTE FUNCTION notify_users_siswa_change();
+"""
+
+class PoolError(Exception):
+    """Raised when no pooled connection can be checked out"""
+
+class ConnectionPool:
+    """Bounded, thread-safe pool with health checks and reconnect backoff"""
+    
+    def __init__(self, connect, max_size=10, checkout_timeout=5.0,
+                 health_check_interval=30.0, backoff_base=0.5, backoff_max=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, last_used)
+        self._opened = 0
+        self._in_use = 0
+        self._backoff = 0.0
+        self._next_connect_at = 0.0
+        
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._connects = 0
+        self._connect_failures = 0
+        self._discarded = 0
+    
+    def getconn(self):
+        """Check out a healthy connection, opening or reconnecting as needed"""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        conn, last_used = None, 0.0
+        
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._opened < self.max_size:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._checkout_failures += 1
+                    raise PoolError(f"No free connection after {self.checkout_timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+        
+        if conn is not None and not self._is_healthy(conn, last_used):
+            self._close_quietly(conn)
+            with self._cond:
+                self._discarded += 1
+            conn = None
+        
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._checkout_failures += 1
+                    self._cond.notify()
+                raise
+        
+        waited = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+    
+    def putconn(self, conn, discard=False):
+        """Return a connection; broken or discarded connections free their slot"""
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed:
+                self._opened -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        
+        if discard:
+            self._close_quietly(conn)
+    
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except QueryCanceledError:
+            # statement_timeout: the connection itself is still usable after rollback
+            self.putconn(conn)
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            # Termasuk GeneratorExit: generator streaming yang ditutup klien tetap mengembalikan koneksi
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+    
+    def _open(self):
+        with self._cond:
+            wait = self._next_connect_at - time.monotonic()
+            if wait > 0:
+                raise PoolError(f"Reconnect backoff active ({wait:.1f}s remaining)")
+        
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._connect_failures += 1
+                self._backoff = min(self.backoff_max, self._backoff * 2 or self.backoff_base)
+                jitter = random.uniform(0, self._backoff / 2)
+                self._next_connect_at = time.monotonic() + self._backoff + jitter
+            raise
+        
+        with self._cond:
+            self._connects += 1
+            self._backoff = 0.0
+            self._next_connect_at = 0.0
+        return conn
+    
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'checkout_failures': self._checkout_failures,
+                'wait_time_total_ms': round(self._wait_total * 1000, 3),
+                'wait_time_max_ms': round(self._wait_max * 1000, 3),
+                'connects': self._connects,
+                'connect_failures': self._connect_failures,
+                'discarded': self._discarded,
+                'backoff_seconds': round(max(0.0, self._next_connect_at - time.monotonic()), 3)
+            }
+    
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+class DatabaseChangeListener:
+    """LISTEN on a channel in a background thread and forward NOTIFY payloads"""
+    
+    def __init__(self, connect, on_change, channel=STUDENT_CHANGE_CHANNEL,
+                 poll_interval=5.0, backoff_max=60.0):
+        self._connect = connect
+        self.on_change = on_change
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.backoff_max = backoff_max
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = False
+        self.notifications = 0
+        self.reconnects = 0
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'listen-{self.channel}', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                self.connected = True
+                self.reconnects += 1
+                backoff = 1.0
+                # Notifikasi bisa terlewat selama terputus: invalidasi semuanya
+                self._dispatch(None)
+                
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([conn], [], [], self.poll_interval)
+                    if not readable:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.notifications += 1
+                        self._dispatch(notify.payload or None)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"❌ LISTEN {self.channel} failed: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    ConnectionPool._close_quietly(conn)
+            
+            self._stop.wait(backoff)
+            backoff = min(self.backoff_max, backoff * 2)
+    
+    def _dispatch(self, payload):
+        try:
+            self.on_change(payload)
+        except Exception as e:
+            print(f"❌ Error handling {self.channel} notification: {e}")
+    
+    def stats(self):
+        return {
+            'channel': self.channel,
+            'connected': self.connected,
+            'notifications': self.notifications,
+            'connections': self.reconnects
+        }
+
 class DatabaseManager:
     def __init__(self):
-        self.connection = None
-        self.connect()
+        self.pool = ConnectionPool(
+            self._new_connection,
+            max_size=int(os.getenv('DB_POOL_MAX', '10')),
+            checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+            health_check_interval=float(os.getenv('DB_HEALTH_CHECK_INTERVAL', '30')),
+        )
+    
+    def _new_connection(self):
+        statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))
+        return psycopg2.connect(
+            host=os.getenv('DB_HOST', 'localhost'),
+            database=os.getenv('DB_NAME', 'mindagrow'),
+            user=os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_PASSWORD', 'manut123'),
+            port=os.getenv('DB_PORT', '5432'),
+            connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '3')),
+            options=f'-c statement_timeout={statement_timeout}'
+        )
     
     def connect(self):
-        """Connect to PostgreSQL database"""
+        """Warm up the pool with one connection to PostgreSQL"""
         try:
-            self.connection = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                database=os.getenv('DB_NAME', 'mindagrow'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', 'manut123'),
-                port=os.getenv('DB_PORT', '5432')
-            )
-            print("✅ Database connection established")
+            with self.pool.connection():
+                pass
+            print("✅ Database connection pool ready")
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
-            self.connection = None
     
-    def get_student_by_nis(self, nis):
-        """Get student data by NIS from database"""
-        if not self.connection:
-            return None
+    def _run(self, work, can_retry=None):
+        """Run work(connection) on a pooled connection, retrying once on a dropped connection
+        
+        A query cancelled by statement_timeout is raised as is: re-running it would only time out
+        again. can_retry() is checked before the retry, for work with side effects per attempt.
+        """
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    return work(conn)
+            except QueryCanceledError:
+                raise
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if attempt or (can_retry is not None and not can_retry()):
+                    raise
+    
+    def ping(self):
+        """True if a pooled connection answers SELECT 1"""
+        def work(conn):
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                return cursor.fetchone() is not None
         
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            return self._run(work)
+        except Exception:
+            return False
+    
+    def pool_stats(self):
+        return self.pool.stats()
+    
+    def install_change_triggers(self):
+        """Create NOTIFY triggers on siswa/users so caches can invalidate per NIS"""
+        def work(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(CHANGE_TRIGGERS_SQL)
+            conn.commit()
+        
+        try:
+            self._run(work)
+            print("✅ Change notification triggers installed")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to install change triggers: {e}")
+            return False
+    
+    def create_change_listener(self, on_change):
+        """Listener on a dedicated (non-pooled) connection for siswa/users changes"""
+        return DatabaseChangeListener(self._new_connection, on_change)
+    
+    def get_student_by_nis(self, nis):
+        """Get student data by NIS from database"""
+        def work(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 query = """
                 SELECT s.nis, s.nama_lengkap, s.no_telepon, s.nik_orangtua,
                        u.email, u.created_at
@@ -48,37 +409,162 @@ class DatabaseManager:
                 if result:
                     return dict(result)
                 return None
+        
+        try:
+            return self._run(work)
         except Exception as e:
             print(f"❌ Error fetching student: {e}")
             return None
     
-    def get_all_students(self):
-        """Get all students from database"""
-        if not self.connection:
-            return []
+    def get_students_by_nis(self, nis_list):
+        """Get many students by NIS in a single query, keyed by NIS"""
+        if not nis_list:
+            return {}
         
-        try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+        def work(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 query = """
                 SELECT s.nis, s.nama_lengkap, s.no_telepon, s.nik_orangtua,
                        u.email, u.created_at
                 FROM siswa s
                 JOIN users u ON s.user_id = u.id
-                ORDER BY s.nis
+                WHERE s.nis = ANY(%s)
                 """
-                cursor.execute(query)
-                results = cursor.fetchall()
-                
-                return [dict(row) for row in results]
+                cursor.execute(query, (list(nis_list),))
+                return {row['nis']: dict(row) for row in cursor.fetchall()}
+        
+        try:
+            return self._run(work)
+        except Exception as e:
+            print(f"❌ Error fetching students: {e}")
+            return {}
+    
+    def get_all_students(self):
+        """Get all students from database"""
+        try:
+            return [row for batch in self.iter_students() for row in batch]
         except Exception as e:
             print(f"❌ Error fetching students: {e}")
             return []
     
-    def create_dummy_scores_for_student(self, nis, nama_lengkap):
-        """Create dummy academic scores for a student"""
-        import random
+    def iter_students(self, kelas=None, batch_size=1000):
+        """Yield batches of student dict rows in NIS order through a named server-side cursor
+        
+        Rows carry the get_student_by_nis columns plus kelas (classes.grade of the first active
+        class membership). Only one batch is held in memory; kelas (list) keeps students whose
+        grade is in it. The pooled connection stays checked out until the generator is
+        exhausted or closed, and is not retried mid-stream.
+        """
+        kelas_filter = ""
+        params = ()
+        if kelas:
+            kelas_filter = "WHERE k.grade::text = ANY(%s)"
+            params = ([str(value) for value in kelas],)
+        
+        query = f"""
+        WITH kelas AS (
+            SELECT DISTINCT ON (cm.user_id) cm.user_id, c.grade
+            FROM class_members cm
+            JOIN classes c ON c.id = cm.class_id
+            WHERE cm.status = 'active'
+            ORDER BY cm.user_id, cm.joined_at
+        )
+        SELECT s.nis, s.nama_lengkap, s.no_telepon, s.nik_orangtua,
+               u.email, u.created_at, k.grade AS kelas
+        FROM siswa s
+        JOIN users u ON s.user_id = u.id
+        LEFT JOIN kelas k ON k.user_id = s.user_id
+        {kelas_filter}
+        ORDER BY s.nis
+        """
         
-        subjects = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s",
+                               (int(os.getenv('DB_BULK_STATEMENT_TIMEOUT_MS', '0')),))
+            with conn.cursor(name='students_export', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield [dict(row) for row in rows]
+    
+    def stream_student_scores(self, on_batch, since=None, batch_size=5000, trend_origin=0.0):
+        """Stream per-student, per-class graded submission averages through a server-side cursor
+        
+        on_batch(rows) receives dict rows (nis, nama_lengkap, kelas, class_name, tugas_score,
+        updated_at, plus trend sums n, st, stt, sy, sty, syy over t = days since the student's
+        first graded submission, and t0, first_t, last_t in days since trend_origin) in NIS order. With since, only students whose submissions changed after
+        that timestamp are returned (all of their classes, so averages stay complete).
+        """
+        student_filter = ""
+        params = (trend_origin,)
+        if since is not None:
+            student_filter = "WHERE s.user_id IN (SELECT student_id FROM submissions WHERE updated_at > %s)"
+            params = (trend_origin, since)
+        
+        query = f"""
+        WITH graded AS (
+            SELECT student_id, assignment_id, updated_at, score::float AS y,
+                   (EXTRACT(EPOCH FROM COALESCE(graded_at, submitted_at, updated_at)) - %s) / 86400.0 AS day
+            FROM submissions
+            WHERE score IS NOT NULL
+        ),
+        centered AS (
+            -- Sums over days since trend_origin lose precision for short spans; center per student
+            SELECT graded.*, MIN(day) OVER (PARTITION BY student_id) AS t0,
+                   day - MIN(day) OVER (PARTITION BY student_id) AS t
+            FROM graded
+        ),
+        kelas AS (
+            SELECT DISTINCT ON (cm.user_id) cm.user_id, c.grade
+            FROM class_members cm
+            JOIN classes c ON c.id = cm.class_id
+            WHERE cm.status = 'active'
+            ORDER BY cm.user_id, cm.joined_at
+        )
+        SELECT s.nis, s.nama_lengkap, k.grade AS kelas, c.name AS class_name,
+               AVG(sub.y) AS tugas_score, MAX(sub.updated_at) AS updated_at,
+               COUNT(sub.y) AS n, SUM(sub.t) AS st, SUM(sub.t * sub.t) AS stt, SUM(sub.y) AS sy,
+               SUM(sub.t * sub.y) AS sty, SUM(sub.y * sub.y) AS syy,
+               MIN(sub.t0) AS t0, MIN(sub.day) AS first_t, MAX(sub.day) AS last_t
+        FROM siswa s
+        LEFT JOIN kelas k ON k.user_id = s.user_id
+        LEFT JOIN centered sub ON sub.student_id = s.user_id
+        LEFT JOIN assignments a ON a.id = sub.assignment_id
+        LEFT JOIN classes c ON c.id = a.class_id
+        {student_filter}
+        GROUP BY s.nis, s.nama_lengkap, k.grade, c.name
+        ORDER BY s.nis
+        """
+        
+        delivered = 0
+        
+        def work(conn):
+            nonlocal delivered
+            with conn.cursor() as cursor:
+                # Bulk scan boleh melebihi statement_timeout untuk request biasa
+                cursor.execute("SET LOCAL statement_timeout = %s",
+                               (int(os.getenv('DB_BULK_STATEMENT_TIMEOUT_MS', '0')),))
+            with conn.cursor(name='student_scores_stream', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    on_batch(rows)
+                    delivered += len(rows)
+            return delivered
+        
+        # Batches already handed to on_batch cannot be taken back: only a drop before the first
+        # batch is retried, otherwise the caller would see those students twice
+        return self._run(work, can_retry=lambda: delivered == 0)
+    
+    def create_dummy_scores_for_student(self, nis, nama_lengkap):
+        """Create dummy academic scores for a student (deterministic per NIS)"""
         student_scores = {
             'nis': nis,
             'nama_lengkap': nama_lengkap,
@@ -86,23 +572,14 @@ class DatabaseManager:
             'gender': 'Unknown'
         }
         
-        # Generate random but realistic scores
-        for subject in subjects:
-            # Generate scores with some correlation (good students tend to be good across subjects)
-            base_performance = random.uniform(70, 95)
-            quiz_variation = random.uniform(-10, 10)
-            tugas_variation = random.uniform(-10, 10)
-            
-            quiz_score = max(50, min(100, base_performance + quiz_variation))
-            tugas_score = max(50, min(100, base_performance + tugas_variation))
-            
-            student_scores[f'{subject}_Quiz'] = round(quiz_score, 1)
-            student_scores[f'{subject}_Tugas'] = round(tugas_score, 1)
+        scores = synthetic_scores([nis])[0]
+        for s, subject in enumerate(SUBJECTS):
+            for k, kind in enumerate(SCORE_KINDS):
+                student_scores[f'{subject}_{kind}'] = float(scores[s, k])
         
         return student_scores
     
     def close(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            print("📌 Database connection closed")
\ No newline at end of file
+        """Close all pooled database connections"""
+        self.pool.closeall()
+        print("📌 Database connection pool closed")
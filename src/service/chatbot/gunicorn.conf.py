@@ -0,0 +1,45 @@
+# src/service/chatbot/gunicorn.conf.py
+#
+# Mode serving pre-fork multi-worker. Jalankan dengan:
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# Proses induk meng-import app.py sekali (preload_app) dan memuat skor sebelum fork:
+# bundle .npy di-map read-only, atau tanpa bundle matriks skor + index NIS disalin ke
+# multiprocessing.shared_memory. Worker mewarisi mapping yang sama, sehingga memori skor
+# tidak bertambah per worker. Thread background (listener DB, watcher, loader skor, klaster,
+# warm-up) tidak ikut fork dan dimulai ulang di setiap worker lewat post_fork.
+
+import multiprocessing
+import os
+
+# Harus di-set sebelum app.py di-import oleh preload_app
+os.environ['PREFORK'] = '1'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+# gthread: stream SSE dan panggilan OpenAI yang lambat tidak menahan seluruh worker
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = True
+
+def _chatbot():
+    import app as chatbot
+    return chatbot
+
+def on_starting(server):
+    # Bundle segar dibuka via mmap, jadi ingest sekali di sini jika basi (CHATBOT_INGEST_ON_START=1)
+    if os.getenv('CHATBOT_INGEST_ON_START') == '1':
+        chatbot = _chatbot()
+        from score_bundle import bundle_is_fresh, read_manifest
+        from ingest_bundle import ingest
+        sources = [chatbot.siswa_path, chatbot.kuis_path, chatbot.tugas_path]
+        if not bundle_is_fresh(read_manifest(chatbot.bundle_dir), sources):
+            ingest(chatbot.data_dir, chatbot.bundle_dir)
+    _chatbot().prepare_prefork()
+
+def post_fork(server, worker):
+    _chatbot().start_background_threads()
+
+def on_exit(server):
+    _chatbot().release_shared_scores()
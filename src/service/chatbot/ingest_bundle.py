@@ -0,0 +1,34 @@
+# src/service/chatbot/ingest_bundle.py
+"""Kompilasi CSV dataChatBot menjadi bundle .npy yang sudah di-merge (dibuka app.py via memory-map)
+
+    python ingest_bundle.py
+    python ingest_bundle.py --data-dir benchmarks/data/1m
+"""
+
+import argparse
+import os
+import time
+
+from score_store import ScoreStore
+from score_bundle import read_merged_csv, write_bundle
+
+DATA_FILES = ['data_siswa.csv', 'nilai_kuis.csv', 'nilai_tugas.csv']
+
+def ingest(data_dir, bundle_dir=None):
+    sources = [os.path.join(data_dir, name) for name in DATA_FILES]
+    store = ScoreStore.from_dataframe(read_merged_csv(*sources))
+    return write_bundle(store, bundle_dir or os.path.join(data_dir, 'bundle'), sources)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data-dir', default=os.getenv('CHATBOT_DATA_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'dataChatBot'))
+    parser.add_argument('--out', help="bundle directory (default <data-dir>/bundle)")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    version_dir = ingest(args.data_dir, args.out)
+    print(f"✅ Ingest selesai: {version_dir} ({time.perf_counter() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
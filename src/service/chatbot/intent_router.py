@@ -0,0 +1,410 @@
+# src/service/chatbot/intent_router.py
+
+import random
+import re
+
+import numpy as np
+
+from score_store import SUBJECTS, SUBJECT_NAMES
+
+# Istilah -> (fitur, nilai); semua istilah digabung menjadi satu regex alternation
+SUBJECT_ALIASES = {
+    'MTK': ['mtk', 'matematika', 'math', 'matek'],
+    'BINDO': ['bahasa indonesia', 'b indonesia', 'b indo', 'bindo'],
+    'BING': ['bahasa inggris', 'b inggris', 'bing', 'inggris', 'english'],
+    'IPA': ['ipa', 'sains', 'science'],
+    'IPS': ['ips', 'ilmu sosial'],
+    'PKN': ['pkn', 'ppkn', 'pancasila', 'kewarganegaraan'],
+    'Seni': ['seni budaya', 'seni', 'sbdp'],
+}
+GENDER_ALIASES = {
+    'Laki-laki': ['laki-laki', 'laki laki', 'lakilaki', 'laki', 'cowok', 'putra', 'pria'],
+    'Perempuan': ['perempuan', 'cewek', 'putri', 'wanita'],
+}
+KEYWORDS = {
+    'greeting': ['halo', 'hai', 'hi', 'hello', 'hey', 'oi', 'p', 'hei'],
+    'count': ['jumlah', 'berapa', 'total', 'banyak', 'banyaknya'],
+    'student': ['siswa', 'murid', 'pelajar', 'anak'],
+    'average': ['rata-rata', 'rata rata', 'ratarata', 'rerata', 'average'],
+    'score': ['nilai', 'skor', 'performa', 'prestasi'],
+    'best': ['tertinggi', 'terbaik', 'bagus', 'terpintar', 'juara', 'paling tinggi', 'paling bagus'],
+    'worst': ['terendah', 'terburuk', 'tersulit', 'lemah', 'terlemah', 'paling rendah', 'paling sulit'],
+    'distribution': ['distribusi', 'sebaran', 'histogram'],
+    'compare': ['bandingkan', 'perbandingan', 'dibanding', 'dibandingkan', 'vs', 'versus'],
+    'class_word': ['kelas'],
+    'gender_word': ['gender', 'jenis kelamin'],
+    'quiz': ['kuis', 'quiz', 'ulangan'],
+    'tugas': ['tugas'],
+}
+
+FALLBACK_ANSWER = "Maaf, saya belum mengerti pertanyaan itu. Coba tanyakan tentang:\n• Analisis siswa (dengan NIS)\n• Jumlah siswa\n• Rata-rata nilai mata pelajaran\n• Prediksi belajar\n• Tips belajar\n• Mata pelajaran tertinggi/terendah 😊"
+
+def _build_terms():
+    terms = {}
+    for subject, aliases in SUBJECT_ALIASES.items():
+        for alias in aliases:
+            terms[alias] = ('subject', subject)
+    for gender, aliases in GENDER_ALIASES.items():
+        for alias in aliases:
+            terms[alias] = ('gender', gender)
+    for feature, words in KEYWORDS.items():
+        for word in words:
+            terms.setdefault(word, (feature, None))
+    return terms
+
+TERMS = _build_terms()
+
+def _term_key(text):
+    # "b. indo", "b  indo" dan "b indo" dianggap istilah yang sama
+    return ' '.join(re.split(r'[\s.]+', text.strip()))
+
+def _term_pattern(term):
+    return r'[\s.]+'.join(re.escape(part) for part in _term_key(term).split(' '))
+
+# Satu regex untuk seluruh pertanyaan: slot NIS dan kelas lebih dulu, lalu istilah terpanjang lebih dulu
+QUESTION_PATTERN = re.compile(
+    r'(?P<kelas>\bkelas\s+(?P<kelas_value>\d{1,2}[a-z]?|[a-z])(?![\w-]))'
+    r'|(?P<nis>(?<!\d)\d{5,}(?!\d))'
+    r'|(?<![\w-])(?P<term>' + '|'.join(_term_pattern(term) for term in sorted(TERMS, key=len, reverse=True)) + r')(?![\w-])'
+)
+
+TERM_LOOKUP = {_term_key(term): value for term, value in TERMS.items()}
+
+def _label_key(label):
+    # Label kelas di database bisa berupa angka, huruf kecil atau mengandung spasi
+    return str(label).upper().replace(' ', '')
+
+def extract(question):
+    """Satu pass regex atas pertanyaan -> (fitur, slot); slot: nis, kelas, subject, gender (list, urut kemunculan)"""
+    features = set()
+    slots = {'nis': [], 'kelas': [], 'subject': [], 'gender': []}
+    for match in QUESTION_PATTERN.finditer(question):
+        if match.group('kelas'):
+            slots['kelas'].append(_label_key(match.group('kelas_value')))
+            features.add('class_word')
+        elif match.group('nis'):
+            slots['nis'].append(match.group('nis'))
+        else:
+            feature, value = TERM_LOOKUP[_term_key(match.group('term'))]
+            if feature in slots:
+                if value not in slots[feature]:
+                    slots[feature].append(value)
+            else:
+                features.add(feature)
+    return features, slots
+
+class Intent:
+    """Intent terdaftar: semua fitur all_of wajib ada, minimal satu any_of (jika diisi), slot wajib terisi"""
+    
+    def __init__(self, name, handler, all_of=(), any_of=(), slots=(), none_of=(), when=None):
+        self.name = name
+        self.handler = handler
+        self.all_of = frozenset(all_of)
+        self.any_of = frozenset(any_of)
+        self.slots = tuple(slots)
+        self.none_of = frozenset(none_of)
+        self.when = when
+    
+    def matches(self, features, slots):
+        return (
+            self.all_of <= features
+            and (not self.any_of or bool(self.any_of & features))
+            and not (self.none_of & features)
+            and all(slots[slot] for slot in self.slots)
+            and (self.when is None or self.when(features, slots))
+        )
+
+class QuestionContext:
+    """Data untuk handler intent: agregat kohort, score store, fitur dan slot pertanyaan"""
+    
+    def __init__(self, router, aggregates, store, features, slots):
+        self.router = router
+        self.aggregates = aggregates
+        self.store = store
+        self.features = features
+        self.slots = slots
+    
+    def group(self):
+        """(GroupAggregate, label) sesuai slot kelas/gender; (None, label) jika kelompok tidak ada"""
+        if self.slots['kelas']:
+            label = self.slots['kelas'][0]
+            group = self.router.find_group(self.aggregates.by_class, label)
+            return group, f"kelas {label}"
+        if self.slots['gender']:
+            label = self.slots['gender'][0]
+            return self.aggregates.by_gender.get(label), f"siswa {label.lower()}"
+        return self.aggregates.overall, "semua siswa"
+    
+    def kind(self):
+        """Indeks jenis skor yang ditanyakan (0 kuis, 1 tugas) atau None untuk rata-rata keduanya"""
+        if 'quiz' in self.features and 'tugas' not in self.features:
+            return 0
+        if 'tugas' in self.features and 'quiz' not in self.features:
+            return 1
+        return None
+
+class IntentRouter:
+    """Registry intent dengan regex terkompilasi; jawaban diambil dari agregat yang sudah dihitung"""
+    
+    def __init__(self):
+        self.intents = []
+        # Ranking siswa per (kelompok, mapel, arah), di-cache per versi agregat. Satu tuple immutable
+        # (agregat, versi, dict) yang diganti utuh: thread lain selalu melihat pasangan yang konsisten
+        self._rankings = (None, None, {})
+    
+    def register(self, name, handler, **conditions):
+        """Daftarkan intent; urutan registrasi = prioritas"""
+        self.intents.append(Intent(name, handler, **conditions))
+        return handler
+    
+    def route(self, question, aggregates, store=None):
+        """Return (nama intent, slot, jawaban); intent 'fallback' jika tidak ada yang cocok"""
+        question = question.lower().strip()
+        features, slots = extract(question)
+        context = QuestionContext(self, aggregates, store, features, slots)
+        for intent in self.intents:
+            if intent.matches(features, slots):
+                answer = intent.handler(context)
+                if answer:
+                    return intent.name, slots, answer
+        return 'fallback', slots, FALLBACK_ANSWER
+    
+    @staticmethod
+    def find_group(groups, label):
+        group = groups.get(label)
+        if group is None:
+            for key, candidate in groups.items():
+                if _label_key(key) == label:
+                    return candidate
+        return group
+    
+    def ranking(self, aggregates, store, mask_key, subject, kind, worst, limit=3):
+        """Baris siswa teratas/terbawah untuk kelompok + mapel (vectorized, di-cache per versi data)"""
+        # Reload data membuat objek agregat baru (versinya mulai dari awal lagi)
+        source, version, rankings = self._rankings
+        current = aggregates.version
+        if source is not aggregates or version != current:
+            # Hasil thread yang masih menghitung untuk versi lama masuk ke dict lama, bukan dict ini
+            rankings = {}
+            self._rankings = (aggregates, current, rankings)
+        key = (mask_key, subject, kind, worst, limit)
+        cached = rankings.get(key)
+        if cached is not None:
+            return cached
+        
+        scores = store.scores
+        if subject is not None:
+            scores = scores[:, SUBJECTS.index(subject):SUBJECTS.index(subject) + 1]
+        values = scores.mean(axis=(1, 2)) if kind is None else scores[:, :, kind].mean(axis=1)
+        rows = np.arange(len(values))
+        if mask_key is not None:
+            field, label = mask_key
+            labels = store.kelas if field == 'kelas' else store.gender
+            wanted = [value for value in dict.fromkeys(labels) if _label_key(value) == _label_key(label)]
+            rows = rows[np.isin(labels, wanted)]
+        if not len(rows):
+            rankings[key] = []
+            return []
+        
+        ordered = values[rows] if not worst else -values[rows]
+        count = min(limit, len(rows))
+        top = np.argpartition(-ordered, count - 1)[:count]
+        top = top[np.argsort(-ordered[top], kind='stable')]
+        result = [(int(rows[i]), float(values[rows[i]])) for i in top]
+        rankings[key] = result
+        return result
+
+def _subject_value(means, s, kind):
+    return float(means[s].mean() if kind is None else means[s, kind])
+
+def _kind_label(kind):
+    return {None: 'rata-rata', 0: 'rata-rata kuis', 1: 'rata-rata tugas'}[kind]
+
+def answer_greeting(context):
+    total = len(context.aggregates)
+    greetings = [
+        f"Halo! Saya RoGrow dengan AI OpenAI! 🤖 Saya bisa membantu analisis {total} siswa atau tips belajar. Apa yang ingin diketahui?",
+        f"Hai! Saya siap menganalisis data dari {total} siswa dengan teknologi terbaru! Tanyakan apa saja! ✨",
+        "Halo! Coba tanyakan analisis siswa, rata-rata skor mata pelajaran, atau prediksi belajar! 🌟"
+    ]
+    return random.choice(greetings)
+
+def answer_student_lookup(context):
+    store = context.store
+    if store is None:
+        return None
+    nis = context.slots['nis'][0]
+    row = store.row_of(nis)
+    if row is None:
+        return f"🔍 Siswa dengan NIS **{nis}** belum ada di data. Coba cek lagi NIS-nya ya! 😊"
+    
+    scores = store.student_scores(row)
+    averages = scores.mean(axis=1)
+    if context.slots['subject']:
+        lines = []
+        for subject in context.slots['subject']:
+            s = SUBJECTS.index(subject)
+            lines.append(f"• {SUBJECT_NAMES[subject]}: kuis {scores[s, 0]:.1f}, tugas {scores[s, 1]:.1f} (rata-rata {averages[s]:.1f})")
+        return f"📋 **{store.names[row]}** (NIS {nis}, kelas {store.kelas[row]})\n" + "\n".join(lines)
+    return (
+        f"📋 **{store.names[row]}** (NIS {nis}, kelas {store.kelas[row]})\n"
+        f"• Rata-rata keseluruhan: {averages.mean():.1f}\n"
+        f"• Terkuat: {SUBJECT_NAMES[SUBJECTS[int(averages.argmax())]]} ({averages.max():.1f})\n"
+        f"• Perlu latihan: {SUBJECT_NAMES[SUBJECTS[int(averages.argmin())]]} ({averages.min():.1f})\n\n"
+        "💡 Untuk analisis lengkap, buka analisis siswa dengan NIS ini!"
+    )
+
+def answer_top_students(context):
+    store = context.store
+    if store is None or not len(store):
+        return None
+    worst = 'worst' in context.features and 'best' not in context.features
+    subject = context.slots['subject'][0] if context.slots['subject'] else None
+    mask_key = None
+    if context.slots['kelas']:
+        mask_key = ('kelas', context.slots['kelas'][0])
+    elif context.slots['gender']:
+        mask_key = ('gender', context.slots['gender'][0])
+    
+    ranking = context.router.ranking(context.aggregates, store, mask_key, subject, context.kind(), worst)
+    _, label = context.group()
+    if not ranking:
+        return f"🔍 Belum ada data untuk {label}."
+    
+    topic = SUBJECT_NAMES[subject] if subject else 'semua mata pelajaran'
+    title = 'perlu pendampingan' if worst else 'terbaik'
+    lines = [f"{rank}. {store.names[row]} (kelas {store.kelas[row]}): {value:.1f}" for rank, (row, value) in enumerate(ranking, 1)]
+    emoji = '💪' if worst else '🏆'
+    return f"{emoji} **Siswa {title} di {topic}** ({label}, {_kind_label(context.kind())}):\n" + "\n".join(lines)
+
+def answer_class_ranking(context):
+    groups = {label: group for label, group in context.aggregates.by_class.items() if group.count > 0}
+    if not groups:
+        return None
+    subject = context.slots['subject'][0] if context.slots['subject'] else None
+    kind = context.kind()
+    
+    values = {}
+    for label, group in groups.items():
+        means = group.means()
+        values[label] = _subject_value(means, SUBJECTS.index(subject), kind) if subject else float(
+            means.mean() if kind is None else means[:, kind].mean()
+        )
+    worst = 'worst' in context.features and 'best' not in context.features
+    ordered = sorted(values, key=values.get, reverse=not worst)
+    topic = SUBJECT_NAMES[subject] if subject else 'semua mata pelajaran'
+    lines = [f"{rank}. Kelas {label}: {values[label]:.1f}" for rank, label in enumerate(ordered, 1)]
+    return f"🏫 **Peringkat kelas untuk {topic}** ({_kind_label(kind)}):\n" + "\n".join(lines)
+
+def answer_gender_comparison(context):
+    groups = {label: group for label, group in context.aggregates.by_gender.items() if group.count > 0}
+    if not groups:
+        return None
+    subject = context.slots['subject'][0] if context.slots['subject'] else None
+    kind = context.kind()
+    lines = []
+    for label, group in groups.items():
+        means = group.means()
+        value = _subject_value(means, SUBJECTS.index(subject), kind) if subject else float(
+            means.mean() if kind is None else means[:, kind].mean()
+        )
+        lines.append(f"• {label} ({group.count} siswa): {value:.1f}")
+    topic = SUBJECT_NAMES[subject] if subject else 'semua mata pelajaran'
+    return f"👫 **Perbandingan gender untuk {topic}** ({_kind_label(kind)}):\n" + "\n".join(lines)
+
+def answer_distribution(context):
+    group, label = context.group()
+    if group is None or group.count <= 0:
+        return f"🔍 Belum ada data untuk {label}."
+    subject = context.slots['subject'][0]
+    s = SUBJECTS.index(subject)
+    kind = context.kind()
+    histogram = group.histogram[s].sum(axis=0) if kind is None else group.histogram[s, kind]
+    lines = []
+    for i, count in enumerate(histogram):
+        if count:
+            upper = 100 if i == len(histogram) - 1 else (i + 1) * 10 - 1
+            lines.append(f"• {i * 10}-{upper}: {int(count)}")
+    kinds = {None: 'kuis + tugas', 0: 'kuis', 1: 'tugas'}[kind]
+    return f"📊 **Distribusi nilai {SUBJECT_NAMES[subject]}** ({label}, {kinds}):\n" + "\n".join(lines)
+
+def answer_subject_average(context):
+    group, label = context.group()
+    if group is None or group.count <= 0:
+        return f"🔍 Belum ada data untuk {label}."
+    means = group.means()
+    kind = context.kind()
+    lines = []
+    for subject in context.slots['subject']:
+        s = SUBJECTS.index(subject)
+        if kind is None:
+            lines.append(f"• {SUBJECT_NAMES[subject]}: {means[s].mean():.1f} (kuis {means[s, 0]:.1f}, tugas {means[s, 1]:.1f})")
+        else:
+            lines.append(f"• {SUBJECT_NAMES[subject]}: {means[s, kind]:.1f}")
+    return f"📈 **{_kind_label(kind).capitalize()} {label}** ({group.count} siswa):\n" + "\n".join(lines)
+
+def answer_overall_average(context):
+    group, label = context.group()
+    if group is None or group.count <= 0:
+        return f"🔍 Belum ada data untuk {label}."
+    means = group.means()
+    kind = context.kind()
+    lines = [f"• {SUBJECT_NAMES[subject]}: {_subject_value(means, s, kind):.1f}" for s, subject in enumerate(SUBJECTS)]
+    overall = means.mean() if kind is None else means[:, kind].mean()
+    return f"📈 **{_kind_label(kind).capitalize()} {label}** ({group.count} siswa): {overall:.1f}\n" + "\n".join(lines)
+
+def answer_student_count(context):
+    group, label = context.group()
+    if context.slots['kelas'] or context.slots['gender']:
+        count = group.count if group is not None else 0
+        return f"📊 Terdapat **{count} siswa** untuk {label}."
+    return f"📊 Terdapat **{len(context.aggregates)} siswa** dalam database kami dengan data lengkap kuis dan tugas untuk 7 mata pelajaran!"
+
+def _extreme_subject(context, worst):
+    group, label = context.group()
+    if group is None or group.count <= 0:
+        return None, None, label
+    kind = context.kind()
+    means = group.means()
+    values = {subject: _subject_value(means, s, kind) for s, subject in enumerate(SUBJECTS)}
+    subject = (min if worst else max)(values, key=values.get)
+    return subject, values[subject], label
+
+def answer_best_subject(context):
+    subject, value, label = _extreme_subject(context, worst=False)
+    if subject is None:
+        return f"🔍 Belum ada data untuk {label}."
+    name = SUBJECT_NAMES[subject]
+    scope = '' if label == 'semua siswa' else f" ({label})"
+    return f"🌟 **Mata pelajaran dengan performa terbaik**{scope}: {name} ({value:.1f})\n\n🎉 Siswa-siswa hebat banget di {name}! Pertahankan semangat belajar!"
+
+def answer_worst_subject(context):
+    subject, value, label = _extreme_subject(context, worst=True)
+    if subject is None:
+        return f"🔍 Belum ada data untuk {label}."
+    name = SUBJECT_NAMES[subject]
+    scope = '' if label == 'semua siswa' else f" ({label})"
+    return f"📉 **Mata pelajaran yang perlu lebih banyak latihan**{scope}: {name} ({value:.1f})\n\n💪 Mari fokus lebih di {name}! Dengan latihan rutin, pasti bisa meningkat! 🌱"
+
+def _only_greeting(features, slots):
+    return features == {'greeting'} and not any(slots.values())
+
+def build_default_router():
+    router = IntentRouter()
+    router.register('greeting', answer_greeting, all_of=['greeting'], when=_only_greeting)
+    router.register('student_lookup', answer_student_lookup, slots=['nis'])
+    router.register('class_ranking', answer_class_ranking, all_of=['class_word'], any_of=['best', 'worst'],
+                    none_of=['student'], when=lambda features, slots: not slots['kelas'])
+    # "siswa terbaik di IPA" dan "nilai MTK tertinggi" sama-sama ranking siswa
+    router.register('top_students', answer_top_students, any_of=['best', 'worst'], none_of=['count'],
+                    when=lambda features, slots: 'student' in features or bool(slots['subject']))
+    router.register('gender_comparison', answer_gender_comparison, any_of=['gender_word', 'compare'],
+                    when=lambda features, slots: 'gender_word' in features or len(slots['gender']) >= 2)
+    router.register('distribution', answer_distribution, all_of=['distribution'], slots=['subject'])
+    router.register('subject_average', answer_subject_average, any_of=['average', 'score'], slots=['subject'],
+                    none_of=['best', 'worst'])
+    router.register('student_count', answer_student_count, all_of=['count', 'student'], none_of=['average'])
+    router.register('overall_average', answer_overall_average, all_of=['average'], none_of=['best', 'worst'])
+    router.register('best_subject', answer_best_subject, any_of=['best'])
+    router.register('worst_subject', answer_worst_subject, any_of=['worst'])
+    return router
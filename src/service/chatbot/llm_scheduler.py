@@ -0,0 +1,352 @@
+# src/service/chatbot/llm_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Angka kecil dilayani lebih dulu: chat interaktif mendahului ringkasan dan insight batch
+PRIORITIES = {'interactive': 0, 'background': 1, 'batch': 2}
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMSchedulerRejected(Exception):
+    """Permintaan ditolak scheduler: antrian penuh atau menunggu budget melewati queue_timeout"""
+    
+    def __init__(self, reason, retry_after):
+        super().__init__(f"LLM scheduler {reason} (retry after {retry_after}s)")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Budget per menit yang terisi kontinu; kapasitas (burst) default = budget satu menit"""
+    
+    def __init__(self, per_minute, burst=None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount, now):
+        """Detik sampai amount tersedia; permintaan > kapasitas cukup menunggu bucket penuh"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+    
+    def adjust(self, delta, now):
+        """Ambil (delta negatif) atau kembalikan budget; level boleh negatif setelah pemakaian aktual lebih besar"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + delta)
+
+class _Ticket:
+    __slots__ = ('rank', 'seq', 'priority', 'tokens', 'notify', 'enqueued_at', 'granted_at', 'cancelled')
+    
+    def __init__(self, rank, seq, priority, tokens, notify):
+        self.rank = rank
+        self.seq = seq
+        self.priority = priority
+        self.tokens = tokens
+        # Dipanggil dispatcher (di thread dispatcher) saat ticket mendapat giliran
+        self.notify = notify
+        self.enqueued_at = time.monotonic()
+        self.granted_at = None
+        self.cancelled = False
+    
+    def __lt__(self, other):
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+def status_of(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+def retry_after_of(error):
+    """Detik dari header retry-after-ms / Retry-After (angka atau HTTP-date) pada error SDK; None jika tidak ada"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class LLMScheduler:
+    """Antrian prioritas di depan panggilan LLM dengan budget token-bucket request/menit dan token/menit
+    
+    Satu thread dispatcher memberi giliran ke ticket teratas (prioritas, lalu urutan datang) begitu
+    kedua bucket cukup; penunggu bisa thread biasa (call) atau coroutine (call_async). Token
+    direservasi dari estimasi prompt + max_tokens lalu dikoreksi dengan usage aktual. Respons 429
+    menjeda seluruh antrian selama Retry-After, lalu request yang sama masuk lagi di posisi lamanya.
+    """
+    
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000, max_queue=256, queue_timeout=30.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=20.0, on_wait=None, on_retry=None):
+        # Budget <= 0 berarti tidak dibatasi
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # on_wait(priority, detik) per giliran; on_retry(status) per retry (untuk metrics)
+        self.on_wait = on_wait
+        self.on_retry = on_retry
+        
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = {name: 0 for name in PRIORITIES}
+        self._paused_until = 0.0
+        self._thread = None
+        
+        self.granted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+    
+    # --- antrian ---
+    
+    def _ensure_dispatcher(self):
+        # Lazy (dan dibuat ulang setelah fork): thread tidak ikut proses anak
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='llm-scheduler', daemon=True)
+            self._thread.start()
+    
+    def _enqueue(self, tokens, priority, notify, seq=None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority}")
+        with self._cond:
+            if sum(self._waiting.values()) >= self.max_queue:
+                self.rejected += 1
+                raise LLMSchedulerRejected('queue_full', self.retry_after())
+            ticket = _Ticket(PRIORITIES[priority], next(self._seq) if seq is None else seq, priority, tokens, notify)
+            heapq.heappush(self._heap, ticket)
+            self._waiting[priority] += 1
+            self._ensure_dispatcher()
+            self._cond.notify()
+        return ticket
+    
+    def _cancel(self, ticket):
+        """Batalkan ticket yang belum mendapat giliran; False jika giliran sudah diberikan"""
+        with self._cond:
+            if ticket.granted_at is not None:
+                return False
+            if not ticket.cancelled:
+                ticket.cancelled = True
+                self._waiting[ticket.priority] -= 1
+                self._cond.notify()
+            return True
+    
+    def _timed_out(self, ticket):
+        if self._cancel(ticket):
+            with self._cond:
+                self.timeouts += 1
+            raise LLMSchedulerRejected('timeout', self.retry_after())
+    
+    def _delay(self, tokens, now):
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+    
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                ticket = self._heap[0]
+                now = time.monotonic()
+                delay = self._delay(ticket.tokens, now)
+                if delay > 0:
+                    # Dibangunkan lebih awal oleh ticket baru (bisa prioritas lebih tinggi) atau settle
+                    self._cond.wait(delay)
+                    continue
+                
+                heapq.heappop(self._heap)
+                if self.requests is not None:
+                    self.requests.adjust(-1, now)
+                if self.tokens is not None:
+                    self.tokens.adjust(-min(ticket.tokens, self.tokens.capacity), now)
+                ticket.granted_at = now
+                self._waiting[ticket.priority] -= 1
+                self.granted += 1
+                waited = now - ticket.enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                try:
+                    ticket.notify()
+                except Exception as e:
+                    print(f"❌ LLM scheduler notify failed: {e}")
+                if self.on_wait:
+                    self.on_wait(ticket.priority, waited)
+    
+    def acquire(self, tokens, priority='interactive', seq=None):
+        """Blok sampai giliran + budget tersedia; return ticket untuk settle()"""
+        granted = threading.Event()
+        ticket = self._enqueue(tokens, priority, granted.set, seq)
+        if not granted.wait(self.queue_timeout):
+            self._timed_out(ticket)
+        return ticket
+    
+    async def acquire_async(self, tokens, priority='interactive', seq=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+        
+        ticket = self._enqueue(tokens, priority, notify, seq)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._timed_out(ticket)
+        except asyncio.CancelledError:
+            # Klien putus saat menunggu: jangan habiskan budget untuk request yang sudah ditinggal
+            self._cancel(ticket)
+            raise
+        return ticket
+    
+    def settle(self, ticket, actual_tokens):
+        """Koreksi reservasi token dengan usage aktual (None = estimasi dianggap benar)"""
+        if actual_tokens is None or self.tokens is None:
+            return
+        with self._cond:
+            reserved = min(ticket.tokens, self.tokens.capacity)
+            self.tokens.adjust(reserved - actual_tokens, time.monotonic())
+            self._cond.notify()
+    
+    # --- retry ---
+    
+    def _on_error(self, error, attempt):
+        """Return jeda sebelum retry (detik) atau None jika error tidak di-retry"""
+        status = status_of(error)
+        if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+            return None
+        retry_after = retry_after_of(error)
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        if retry_after is not None:
+            # Jitter di atas Retry-After: semua yang kena 429 bersamaan tidak kembali di detik yang sama
+            delay = min(retry_after, self.backoff_max) + random.uniform(0, self.backoff_base)
+        else:
+            delay = random.uniform(backoff / 2, backoff)
+        
+        with self._cond:
+            self.retries += 1
+            if status == 429:
+                # Limit berlaku untuk seluruh akun: tahan semua ticket, bukan hanya request ini.
+                # Budget lokal ternyata lebih longgar dari limit server: kosongkan agar setelah jeda
+                # antrian dilayani sesuai laju refill, bukan burst yang langsung kena 429 lagi
+                self.rate_limited += 1
+                now = time.monotonic()
+                self._paused_until = max(self._paused_until, now + delay)
+                for bucket in (self.requests, self.tokens):
+                    if bucket is not None:
+                        bucket.adjust(-max(0.0, bucket.level), now)
+                delay = 0.0
+            self._cond.notify()
+        if self.on_retry:
+            self.on_retry(str(status))
+        return delay
+    
+    def call(self, func, tokens, priority='interactive', usage=None):
+        """Jalankan func() di bawah budget; retry 429/5xx dengan backoff + jitter mengikuti Retry-After
+        
+        usage(hasil) -> total token aktual (opsional). Error lain, retry habis, atau
+        LLMSchedulerRejected diteruskan ke pemanggil.
+        """
+        seq = None
+        for attempt in itertools.count():
+            ticket = self.acquire(tokens, priority, seq)
+            seq = ticket.seq
+            try:
+                result = func()
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                if delay:
+                    time.sleep(delay)
+                continue
+            self.settle(ticket, usage(result) if usage else None)
+            return result
+    
+    async def call_async(self, func, tokens, priority='interactive', usage=None):
+        """Versi async dari call(); func() mengembalikan awaitable"""
+        seq = None
+        for attempt in itertools.count():
+            ticket = await self.acquire_async(tokens, priority, seq)
+            seq = ticket.seq
+            try:
+                result = await func()
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+            self.settle(ticket, usage(result) if usage else None)
+            return result
+    
+    # --- status ---
+    
+    def retry_after(self):
+        """Estimasi detik sampai antrian saat ini habis dilayani (untuk header Retry-After)"""
+        with self._cond:
+            waiting = sum(self._waiting.values())
+            seconds = max(0.0, self._paused_until - time.monotonic())
+            if self.requests is not None:
+                seconds += waiting / self.requests.rate
+        return max(1, int(seconds + 0.999))
+    
+    def queue_depth(self):
+        with self._cond:
+            return dict(self._waiting)
+    
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            return {
+                'queue_depth': dict(self._waiting),
+                'max_queue': self.max_queue,
+                'granted': self.granted,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'paused_seconds': round(max(0.0, self._paused_until - now), 3),
+                'avg_wait_ms': round(self._wait_total / self.granted * 1000, 1) if self.granted else None,
+                'max_wait_ms': round(self._wait_max * 1000, 1),
+                'requests_per_minute': self.requests.per_minute if self.requests else None,
+                'requests_available': round(self.requests.level, 2) if self.requests else None,
+                'tokens_per_minute': self.tokens.per_minute if self.tokens else None,
+                'tokens_available': round(self.tokens.level, 1) if self.tokens else None
+            }
@@ -0,0 +1,83 @@
+# src/service/chatbot/prompt_context.py
+
+import math
+
+from score_store import SUBJECTS
+
+_encoder = None
+_encoder_loaded = False
+
+def _get_encoder():
+    """tiktoken encoder for gpt-4o if available (optional dependency), else None"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.encoding_for_model('gpt-4o')
+        except Exception:
+            _encoder = None
+    return _encoder
+
+def count_tokens(text):
+    """Jumlah token teks; estimasi ~4 karakter/token jika tiktoken tidak tersedia"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / 4)
+
+def count_message_tokens(messages):
+    """Token untuk daftar pesan chat (termasuk overhead per pesan format OpenAI)"""
+    total = 3  # priming balasan assistant
+    for message in messages:
+        total += 3 + count_tokens(message.get('role', '')) + count_tokens(message.get('content', ''))
+    return total
+
+def token_report(openai_messages, completion=None):
+    """Rincian token: system prompt, riwayat percakapan dan completion"""
+    system = [m for m in openai_messages if m.get('role') == 'system']
+    history = [m for m in openai_messages if m.get('role') != 'system']
+    report = {
+        'system_tokens': count_message_tokens(system) - 3,
+        'history_tokens': count_message_tokens(history) - 3,
+        'prompt_tokens': count_message_tokens(openai_messages),
+        'completion_tokens': count_tokens(completion) if completion is not None else None
+    }
+    return report
+
+def _fmt(value):
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.1f}"
+
+def compact_student_context(analysis, budget_tokens=200):
+    """Ringkasan analisis siswa dengan skema tetap, dipangkas agar muat dalam budget token"""
+    stats = analysis['overall_stats']
+    predictions = analysis.get('predictions') or {}
+    
+    # Urut berdasarkan prioritas; baris terakhir dibuang lebih dulu jika melebihi budget
+    lines = [
+        f"Siswa: {analysis['nama']} | NIS {analysis['nis']} | Kelas {analysis['kelas']}",
+        f"Rata-rata: kuis {_fmt(stats['rata_rata_kuis'])}, tugas {_fmt(stats['rata_rata_tugas'])}, total {_fmt(stats['rata_rata_keseluruhan'])}",
+        f"Terkuat: {analysis['terkuat']} | Terlemah: {analysis['terlemah']}",
+        "Nilai kuis/tugas: " + ", ".join(
+            f"{subject} {_fmt(analysis['scores'][subject]['quiz'])}/{_fmt(analysis['scores'][subject]['tugas'])}"
+            for subject in SUBJECTS if subject in analysis['scores']
+        ),
+        f"Kuat: {', '.join(analysis['strengths']) or '-'} | Perlu ditingkatkan: {', '.join(analysis['improvements']) or '-'}",
+    ]
+    if predictions.get('mata_pelajaran_prioritas'):
+        lines.append(f"Prioritas: {predictions['mata_pelajaran_prioritas']}")
+    if predictions.get('strategi_belajar'):
+        lines.append(f"Strategi: {predictions['strategi_belajar']}")
+    if predictions.get('proyeksi_nilai'):
+        lines.append(f"Proyeksi: {predictions['proyeksi_nilai']}")
+    
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > budget_tokens:
+        lines.pop()
+    
+    text = "\n".join(lines)
+    if count_tokens(text) > budget_tokens:
+        # Baris pertama saja masih terlalu panjang: potong kasar per karakter
+        text = text[:max(0, budget_tokens * 4)]
+    return text
@@ -0,0 +1,166 @@
+# src/service/chatbot/response_cache.py
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_text(text):
+    """Lowercase, buang tanda baca, rapikan spasi"""
+    text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+def context_fingerprint(student_data):
+    if not student_data:
+        return ''
+    payload = json.dumps(student_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class ChatResponseCache:
+    """Cache jawaban chat dengan key riwayat pesan ternormalisasi + hash konteks siswa"""
+    
+    def __init__(self, max_size=512, ttl=3600.0, similarity_threshold=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Jika diisi (mis. 0.9), pertanyaan satu-giliran yang mirip juga dianggap hit
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # key -> entry dict
+        self._lock = threading.Lock()
+        self._vectorizer = None
+        # Index kemiripan (version, keys, matrix) valid selama _version tidak berubah
+        self._index = None
+        self._version = 0
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_latency = 0.0
+    
+    @staticmethod
+    def _history(messages):
+        return [(m.get('role', 'user'), normalize_text(m.get('content', ''))) for m in messages]
+    
+    def make_key(self, messages, student_data=None):
+        history = self._history(messages)
+        raw = json.dumps([history, context_fingerprint(student_data)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _question(cls, messages):
+        """Teks pertanyaan untuk percakapan satu-giliran dari user; selain itu None"""
+        history = cls._history(messages)
+        if len(history) == 1 and history[0][0] == 'user' and history[0][1]:
+            return history[0][1]
+        return None
+    
+    def _vectorize(self, question):
+        """Vektor n-gram karakter ternormalisasi L2; vocabulary tetap (hashing), tanpa fit per entri"""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(2, 4), n_features=2 ** 18,
+                                                 alternate_sign=False, norm='l2')
+        return self._vectorizer.transform([question])
+    
+    def get(self, messages, student_data=None):
+        """Return (response, match) where match is 'exact' or 'similar', or None on miss"""
+        key = self.make_key(messages, student_data)
+        # Vektor pertanyaan dihitung di luar lock: lock hanya melindungi dict entri dan counter
+        question = self._question(messages) if self.similarity_threshold else None
+        query = self._vectorize(question) if question else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                return self._hit(entry, 'exact')
+            if query is None:
+                self.misses += 1
+                return None
+            index = self._index if self._index is not None and self._index[0] == self._version else None
+            if index is None:
+                version = self._version
+                rows = [(key, entry['vector']) for key, entry in self._entries.items() if entry['vector'] is not None]
+        
+        if index is None:
+            index = self._build_index(version, rows)
+        candidates = self._rank(index, query)
+        
+        context = context_fingerprint(student_data)
+        with self._lock:
+            if self._index is None or self._index[0] < index[0]:
+                self._index = index
+            for candidate in candidates:
+                entry = self._entries.get(candidate)
+                if entry and entry['context'] == context and entry['expires_at'] > now:
+                    return self._hit(entry, 'similar')
+            self.misses += 1
+            return None
+    
+    def _hit(self, entry, match):
+        self._entries.move_to_end(entry['key'])
+        self.hits += 1
+        if match == 'similar':
+            self.similar_hits += 1
+        self.saved_latency += entry['latency']
+        return entry['response'], match
+    
+    def put(self, messages, student_data, response, latency):
+        key = self.make_key(messages, student_data)
+        # Hanya percakapan satu-giliran yang ikut index kemiripan; vektornya dihitung sekali di sini
+        question = self._question(messages) if self.similarity_threshold else None
+        vector = self._vectorize(question) if question else None
+        with self._lock:
+            self._entries[key] = {
+                'key': key,
+                'response': response,
+                'latency': latency,
+                'expires_at': time.monotonic() + self.ttl,
+                'context': context_fingerprint(student_data),
+                'vector': vector
+            }
+            self._entries.move_to_end(key)
+            self._version += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def _remove(self, key):
+        del self._entries[key]
+        self._version += 1
+    
+    @staticmethod
+    def _build_index(version, rows):
+        """Tumpuk vektor entri (tanpa fit ulang) di luar lock; return (version, keys, matrix) atau None"""
+        if not rows:
+            return (version, [], None)
+        from scipy.sparse import vstack
+        return (version, [key for key, _ in rows], vstack([vector for _, vector in rows], format='csr'))
+    
+    def _rank(self, index, query):
+        """Key entri dengan cosine similarity >= threshold, urut dari yang paling mirip"""
+        _, keys, matrix = index
+        if matrix is None:
+            return []
+        scores = (matrix @ query.T).toarray().ravel()
+        order = scores.argsort()[::-1]
+        return [keys[position] for position in order if scores[position] >= self.similarity_threshold]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'similarity_threshold': self.similarity_threshold,
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'saved_latency_seconds': round(self.saved_latency, 3)
+            }
@@ -0,0 +1,160 @@
+# src/service/chatbot/score_bundle.py
+
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from score_store import ScoreStore, SortedNisIndex, SUBJECTS, SCORE_KINDS
+
+BUNDLE_FORMAT = 1
+# Kolom teks fixed-width ('<U..') agar bisa di-memory-map; array object tidak bisa
+TEXT_COLUMNS = ['nis', 'names', 'kelas', 'gender']
+ARRAY_FILES = TEXT_COLUMNS + ['scores', 'nis_sorted', 'nis_rows']
+CURRENT_FILE = 'CURRENT'
+# Versi lama dipertahankan sebentar: worker yang masih me-map file lama tetap valid
+KEEP_VERSIONS = 2
+
+def read_merged_csv(siswa_path, kuis_path, tugas_path):
+    """Baca tiga CSV dataChatBot dan gabungkan pada ['Id', 'Nama Lengkap', 'NIS']"""
+    siswa_data = pd.read_csv(siswa_path)
+    kuis_data = pd.read_csv(kuis_path)
+    tugas_data = pd.read_csv(tugas_path)
+    print(f"✅ Dataset loaded: {len(siswa_data)} siswa, {len(kuis_data)} kuis, {len(tugas_data)} tugas")
+    
+    dataset = siswa_data.merge(kuis_data, on=['Id', 'Nama Lengkap', 'NIS'], how='left')
+    dataset = dataset.merge(tugas_data, on=['Id', 'Nama Lengkap', 'NIS'], how='left')
+    return dataset
+
+def source_signatures(paths):
+    """{nama file: [mtime_ns, size]} untuk mendeteksi bundle yang sudah basi"""
+    signatures = {}
+    for path in paths:
+        stat = os.stat(path)
+        signatures[os.path.basename(path)] = [stat.st_mtime_ns, stat.st_size]
+    return signatures
+
+def _text_array(values):
+    values = np.asarray([str(value) for value in values], dtype=object)
+    width = max(1, max((len(value) for value in values), default=1))
+    return values.astype(f'<U{width}')
+
+def store_arrays(store):
+    """Array bundle (teks fixed-width + matriks skor + index NIS terurut) dari ScoreStore"""
+    nis = _text_array(store.nis)
+    order = np.argsort(nis, kind='stable')
+    return {
+        'nis': nis,
+        'names': _text_array(store.names),
+        'kelas': _text_array(store.kelas),
+        'gender': _text_array(store.gender),
+        'scores': np.ascontiguousarray(store.scores, dtype=np.float64),
+        'nis_sorted': nis[order],
+        'nis_rows': order.astype(np.int64),
+    }
+
+def store_from_arrays(arrays):
+    """ScoreStore di atas array bundle tanpa menyalin (memory-map atau shared memory)"""
+    return ScoreStore(
+        nis=arrays['nis'],
+        names=arrays['names'],
+        kelas=arrays['kelas'],
+        gender=arrays['gender'],
+        scores=arrays['scores'],
+        index=SortedNisIndex(arrays['nis_sorted'], arrays['nis_rows'])
+    )
+
+def write_bundle(store, bundle_dir, sources=()):
+    """Tulis ScoreStore sebagai bundle .npy; return direktori versi yang baru
+    
+    Setiap build masuk ke subdirektori versi baru, lalu file CURRENT diganti secara atomik
+    (os.replace), sehingga pembaca tidak pernah melihat bundle setengah jadi.
+    """
+    started = time.perf_counter()
+    os.makedirs(bundle_dir, exist_ok=True)
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    version_dir = os.path.join(bundle_dir, version)
+    os.makedirs(version_dir)
+    
+    arrays = store_arrays(store)
+    nis = arrays['nis']
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f'{name}.npy'), array, allow_pickle=False)
+    
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'students': int(len(nis)),
+        'subjects': SUBJECTS,
+        'score_kinds': SCORE_KINDS,
+        'sources': source_signatures(sources),
+        'created_at': time.time()
+    }
+    with open(os.path.join(version_dir, 'manifest.json'), 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    
+    pointer = os.path.join(bundle_dir, f'{CURRENT_FILE}.{version}.tmp')
+    with open(pointer, 'w', encoding='utf-8') as handle:
+        handle.write(version)
+    os.replace(pointer, os.path.join(bundle_dir, CURRENT_FILE))
+    _remove_old_versions(bundle_dir, version)
+    print(f"✅ Bundle {version}: {len(nis)} siswa in {time.perf_counter() - started:.2f}s")
+    return version_dir
+
+def _remove_old_versions(bundle_dir, current):
+    versions = sorted(
+        entry for entry in os.listdir(bundle_dir)
+        if entry != current and os.path.isfile(os.path.join(bundle_dir, entry, 'manifest.json'))
+    )
+    for entry in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(bundle_dir, entry), ignore_errors=True)
+
+def current_version_dir(bundle_dir):
+    try:
+        with open(os.path.join(bundle_dir, CURRENT_FILE), encoding='utf-8') as handle:
+            version = handle.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(bundle_dir, version)
+    return path if version and os.path.isdir(path) else None
+
+def read_manifest(bundle_dir):
+    version_dir = current_version_dir(bundle_dir)
+    if version_dir is None:
+        return None
+    with open(os.path.join(version_dir, 'manifest.json'), encoding='utf-8') as handle:
+        return json.load(handle)
+
+def bundle_is_fresh(manifest, sources):
+    """Bundle masih sesuai CSV sumber (mtime + size sama)"""
+    if manifest is None or manifest.get('format') != BUNDLE_FORMAT:
+        return False
+    if manifest.get('subjects') != SUBJECTS or manifest.get('score_kinds') != SCORE_KINDS:
+        return False
+    try:
+        return source_signatures(sources) == manifest.get('sources')
+    except OSError:
+        # CSV sumber tidak ada (mis. deploy hanya membawa bundle): percayai bundle
+        return True
+
+def open_bundle(bundle_dir, mmap_mode='c'):
+    """Buka bundle sebagai ScoreStore memory-mapped; return (store, manifest) atau None jika belum ada
+    
+    mmap_mode 'c' (copy-on-write): halaman dibagi antar proses sampai ada upsert yang menulis baris.
+    mmap_mode 'r' (read-only) dipakai worker pre-fork: halaman page cache dibagi semua worker.
+    """
+    version_dir = current_version_dir(bundle_dir)
+    if version_dir is None:
+        return None
+    with open(os.path.join(version_dir, 'manifest.json'), encoding='utf-8') as handle:
+        manifest = json.load(handle)
+    
+    arrays = {
+        name: np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in ARRAY_FILES
+    }
+    return store_from_arrays(arrays), manifest
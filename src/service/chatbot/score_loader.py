@@ -0,0 +1,277 @@
+# src/service/chatbot/score_loader.py
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from score_store import ScoreStore, SUBJECTS, SCORE_KINDS, synthetic_scores
+from cohort_aggregates import CohortAggregates
+from score_trends import TREND_ORIGIN, STAT_COUNT
+
+# Nama kelas (classes.name) -> kode mapel; pola dicek berurutan
+SUBJECT_PATTERNS = [
+    ('MTK', re.compile(r'matematika|\bmtk\b|\bmath', re.IGNORECASE)),
+    ('BINDO', re.compile(r'bahasa\s+indonesia|\bb\.?\s*indo', re.IGNORECASE)),
+    ('BING', re.compile(r'bahasa\s+inggris|\bb\.?\s*ing|english', re.IGNORECASE)),
+    ('IPA', re.compile(r'\bipa\b|sains|science|fisika|biologi|kimia', re.IGNORECASE)),
+    ('IPS', re.compile(r'\bips\b|sejarah|geografi|ekonomi|sosial', re.IGNORECASE)),
+    ('PKN', re.compile(r'\bpkn\b|\bppkn\b|pancasila|kewarganegaraan', re.IGNORECASE)),
+    ('Seni', re.compile(r'seni|budaya|\bsbdp\b|\bart', re.IGNORECASE)),
+]
+
+def subject_for_class(class_name):
+    """Kode mapel untuk nama kelas, None jika tidak dikenali"""
+    if not class_name:
+        return None
+    for subject, pattern in SUBJECT_PATTERNS:
+        if pattern.search(class_name):
+            return subject
+    return None
+
+TREND_COLUMNS = ['n', 'st', 'stt', 'sy', 'sty', 'syy']
+TREND_TIME_COLUMNS = ['t0', 'first_t', 'last_t']
+
+def build_score_frame(rows):
+    """Rows dari stream_student_scores -> (roster frame, array skor tugas dengan NaN, statistik tren)
+    
+    Statistik tren: (n, len(SUBJECTS), STAT_COUNT) jumlahan per mapel (t relatif terhadap t0 per siswa)
+    + t0, first_t, last_t (n, len(SUBJECTS)) dalam hari sejak TREND_ORIGIN.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=['nis', 'nama_lengkap', 'kelas', 'class_name', 'tugas_score',
+                                                     'updated_at'] + TREND_COLUMNS + TREND_TIME_COLUMNS)
+    frame['nis'] = frame['nis'].astype(str).str.strip()
+    # dtype tetap datetime meski satu batch tidak punya submission sama sekali (semua NULL)
+    frame['updated_at'] = pd.to_datetime(frame['updated_at'], utc=True)
+    
+    roster = frame.groupby('nis', sort=False).agg(
+        nama_lengkap=('nama_lengkap', 'first'),
+        kelas=('kelas', 'first'),
+        updated_at=('updated_at', 'max')
+    )
+    roster['kelas'] = roster['kelas'].fillna('A')
+    
+    # Map per nama kelas unik, bukan per baris
+    names = frame['class_name'].dropna().unique()
+    frame['subject'] = frame['class_name'].map({name: subject_for_class(name) for name in names})
+    graded = frame.dropna(subset=['subject', 'tugas_score'])
+    tugas = (
+        graded.groupby(['nis', 'subject'])['tugas_score'].mean()
+        .unstack()
+        .reindex(index=roster.index, columns=SUBJECTS)
+    )
+    
+    # Beberapa kelas bisa jatuh ke mapel yang sama: statistik cukup tinggal dijumlahkan
+    grouped = graded.groupby(['nis', 'subject'])
+    sums = grouped[TREND_COLUMNS].sum().astype(np.float64)
+    trend_stats = np.zeros((len(roster), len(SUBJECTS), STAT_COUNT), dtype=np.float64)
+    for stat, column in enumerate(TREND_COLUMNS):
+        trend_stats[:, :, stat] = (
+            sums[column].unstack().reindex(index=roster.index, columns=SUBJECTS).fillna(0.0).to_numpy()
+        )
+    # t0 sama untuk semua kelas satu siswa, sehingga jumlahan antar kelas tetap konsisten
+    times = grouped[TREND_TIME_COLUMNS].agg({'t0': 'min', 'first_t': 'min', 'last_t': 'max'}).astype(np.float64)
+    t0, first_t, last_t = (
+        times[column].unstack().reindex(index=roster.index, columns=SUBJECTS).to_numpy(dtype=np.float64)
+        for column in TREND_TIME_COLUMNS
+    )
+    return roster, tugas.to_numpy(dtype=np.float64), (trend_stats, t0, first_t, last_t)
+
+def concat_score_frames(parts):
+    """Gabungkan hasil build_score_frame per batch (siswa tidak pernah terbelah antar batch)"""
+    if len(parts) == 1:
+        return parts[0]
+    return (
+        pd.concat([roster for roster, _, _ in parts]),
+        np.concatenate([tugas for _, tugas, _ in parts]),
+        tuple(np.concatenate(arrays) for arrays in zip(*(series for _, _, series in parts)))
+    )
+
+class DatabaseScoreLoader:
+    """Skor siswa database dalam ScoreStore: bulk load sekali, lalu refresh inkremental per updated_at
+    
+    Nilai tugas berasal dari rata-rata submissions yang sudah dinilai per mapel (classes.name).
+    Skema belum punya nilai kuis per mapel, sehingga kuis dan mapel tanpa nilai tugas diisi
+    skor sintetis yang deterministik per NIS. Agregat kohort siswa database dibangun sekali saat
+    load lalu di-update per baris (apply_update) setiap refresh meng-upsert store.
+    """
+    
+    def __init__(self, db_manager, on_update=None, interval=60.0, batch_size=5000, trends=None):
+        self.db_manager = db_manager
+        # trends (ScoreTrends) menerima statistik regresi nilai tugas dari riwayat submissions
+        self.trends = trends
+        # on_update(nis_list) dipanggil setelah refresh mengubah skor siswa
+        self.on_update = on_update
+        self.interval = interval
+        self.batch_size = batch_size
+        self.store = ScoreStore.from_dataframe(pd.DataFrame(columns=['NIS']))
+        self.aggregates = CohortAggregates.from_store(self.store)
+        self.watermark = None
+        self.loaded = False
+        self.last_load_seconds = None
+        self.real_tugas_ratio = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _fetch(self, since=None):
+        """Frame skor dibangun per batch cursor: yang ditahan hanya array ringkas per siswa, bukan row dict"""
+        parts = []
+        carry = []
+        
+        def on_batch(rows):
+            nonlocal carry
+            rows = carry + list(rows)
+            # Baris urut NIS: baris siswa terakhir bisa berlanjut di batch berikutnya
+            split = len(rows)
+            while split and rows[split - 1]['nis'] == rows[-1]['nis']:
+                split -= 1
+            carry = rows[split:]
+            if split:
+                parts.append(build_score_frame(rows[:split]))
+        
+        self.db_manager.stream_student_scores(on_batch, since=since, batch_size=self.batch_size,
+                                              trend_origin=TREND_ORIGIN)
+        if carry:
+            parts.append(build_score_frame(carry))
+        if not parts:
+            return None
+        return concat_score_frames(parts)
+    
+    @staticmethod
+    def _merge_scores(nis, tugas):
+        """Skor sintetis sebagai dasar, nilai tugas nyata menimpa jika ada"""
+        scores = synthetic_scores(nis)
+        real = ~np.isnan(tugas)
+        scores[:, :, SCORE_KINDS.index('Tugas')][real] = tugas[real]
+        return scores, real
+    
+    def _publish_trends(self, nis, trend_series):
+        if self.trends is not None:
+            trend_stats, t0, first_t, last_t = trend_series
+            self.trends.set_series(nis, trend_stats, t0, first_t, last_t, kind='Tugas')
+    
+    def _advance_watermark(self, roster):
+        latest = roster['updated_at'].dropna()
+        if len(latest):
+            latest = latest.max()
+            if self.watermark is None or latest > self.watermark:
+                self.watermark = latest
+    
+    def load(self):
+        """Full load semua siswa dalam satu pass streaming; return jumlah siswa"""
+        started = time.perf_counter()
+        with self._lock:
+            fetched = self._fetch()
+            if fetched is None:
+                self.loaded = True
+                return 0
+            
+            roster, tugas, trend_series = fetched
+            nis = roster.index.to_numpy(dtype=object)
+            scores, real = self._merge_scores(nis, tugas)
+            self._publish_trends(nis, trend_series)
+            n = len(nis)
+            store = ScoreStore(
+                nis=nis,
+                names=roster['nama_lengkap'].to_numpy(dtype=object),
+                kelas=roster['kelas'].to_numpy(dtype=object),
+                gender=np.full(n, 'Unknown', dtype=object),
+                scores=scores,
+            )
+            aggregates = CohortAggregates.from_store(store)
+            store.subscribe(aggregates.apply_update)
+            self.store, self.aggregates = store, aggregates
+            self.real_tugas_ratio = float(real.mean()) if real.size else 0.0
+            self._advance_watermark(roster)
+            self.loaded = True
+            self.last_load_seconds = time.perf_counter() - started
+        print(f"✅ Database scores loaded: {n} siswa in {self.last_load_seconds:.2f}s")
+        return n
+    
+    def refresh(self):
+        """Muat ulang hanya siswa yang submissions-nya berubah sejak watermark"""
+        if not self.loaded:
+            return self.load()
+        
+        with self._lock:
+            # Tanpa watermark (belum ada submission saat load): ambil semua yang pernah dinilai
+            since = self.watermark if self.watermark is not None else datetime(1970, 1, 1, tzinfo=timezone.utc)
+            fetched = self._fetch(since=since)
+            if fetched is None:
+                return 0
+            
+            roster, tugas, trend_series = fetched
+            nis = roster.index.to_numpy(dtype=object)
+            scores, _ = self._merge_scores(nis, tugas)
+            self._publish_trends(nis, trend_series)
+            for i, value in enumerate(nis):
+                self.store.upsert(value, roster['nama_lengkap'].iat[i], roster['kelas'].iat[i],
+                                  'Unknown', scores[i])
+            self._advance_watermark(roster)
+        
+        updated = [str(value) for value in nis]
+        if self.on_update:
+            try:
+                self.on_update(updated)
+            except Exception as e:
+                print(f"❌ Error handling score refresh: {e}")
+        return len(updated)
+    
+    def scores_for(self, nis):
+        """Skor (len(SUBJECTS), len(SCORE_KINDS)) untuk NIS; sintetis jika belum ada di store"""
+        store = self.store
+        row = store.row_of(nis)
+        if row is None:
+            return synthetic_scores([nis])[0]
+        return store.student_scores(row)
+    
+    def scores_for_many(self, nis_list):
+        """Skor (n, len(SUBJECTS), len(SCORE_KINDS)) untuk banyak NIS: satu gather + satu batch sintetis"""
+        store = self.store
+        rows = np.fromiter((store.index.get(str(nis), -1) for nis in nis_list), dtype=np.int64, count=len(nis_list))
+        known = rows >= 0
+        scores = np.empty((len(nis_list), len(SUBJECTS), len(SCORE_KINDS)), dtype=np.float64)
+        scores[known] = store.scores[rows[known]]
+        if not known.all():
+            scores[~known] = synthetic_scores([nis for nis, found in zip(nis_list, known) if not found])
+        return scores
+    
+    def kelas_for(self, nis, default='A'):
+        store = self.store
+        row = store.row_of(nis)
+        return default if row is None else store.kelas[row]
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='db-score-loader', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"❌ Database score load failed: {e}")
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Database score refresh failed: {e}")
+    
+    def stop(self):
+        self._stop.set()
+    
+    def stats(self):
+        return {
+            'loaded': self.loaded,
+            'students': len(self.store),
+            'aggregates_version': self.aggregates.version,
+            'watermark': self.watermark.isoformat() if self.watermark is not None else None,
+            'last_load_seconds': round(self.last_load_seconds, 3) if self.last_load_seconds is not None else None,
+            'real_tugas_ratio': round(self.real_tugas_ratio, 4)
+        }
@@ -0,0 +1,291 @@
+# src/service/chatbot/score_store.py
+
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+SUBJECTS = ['MTK', 'BINDO', 'BING', 'IPA', 'IPS', 'PKN', 'Seni']
+SCORE_KINDS = ['Quiz', 'Tugas']
+SCORE_COLUMNS = [f'{subject}_{kind}' for subject in SUBJECTS for kind in SCORE_KINDS]
+SUBJECT_NAMES = {
+    'MTK': 'Matematika',
+    'BINDO': 'Bahasa Indonesia',
+    'BING': 'Bahasa Inggris',
+    'IPA': 'IPA',
+    'IPS': 'IPS',
+    'PKN': 'PKN',
+    'Seni': 'Seni Budaya'
+}
+
+# Ambang klasifikasi performa per mata pelajaran
+STRENGTH_THRESHOLD = 85
+IMPROVEMENT_THRESHOLD = 75
+
+class SortedNisIndex:
+    """Index NIS -> baris lewat binary search atas NIS terurut (bisa memory-mapped), plus overlay dict
+    
+    Tidak membangun dict untuk seluruh roster, sehingga membuka store dari bundle tetap O(1).
+    """
+    
+    def __init__(self, sorted_nis, rows):
+        self.sorted_nis = sorted_nis
+        self.rows = rows
+        # Siswa baru dari upsert
+        self.overlay = {}
+    
+    def get(self, nis, default=None):
+        row = self.overlay.get(nis)
+        if row is not None:
+            return row
+        pos = int(np.searchsorted(self.sorted_nis, nis))
+        if pos < len(self.sorted_nis) and self.sorted_nis[pos] == nis:
+            return int(self.rows[pos])
+        return default
+    
+    def __setitem__(self, nis, row):
+        self.overlay[nis] = row
+    
+    def __contains__(self, nis):
+        return self.get(nis) is not None
+    
+    def __len__(self):
+        return len(self.sorted_nis) + len(self.overlay)
+
+class ScoreStore:
+    """Matriks skor siswa (siswa x mapel x jenis) dengan index NIS -> baris"""
+    
+    def __init__(self, nis, names, kelas, gender, scores, index=None):
+        self._nis = nis
+        self._names = names
+        self._kelas = kelas
+        self._gender = gender
+        # float64 dengan shape (kapasitas, len(SUBJECTS), len(SCORE_KINDS))
+        self._scores = scores
+        self._size = len(nis)
+        # index: dict atau SortedNisIndex (store dari bundle memory-mapped)
+        self.index = index if index is not None else {value: row for row, value in enumerate(nis)}
+        self._lock = threading.Lock()
+        self._listeners = []
+    
+    # View sepanjang jumlah siswa aktual (buffer bisa lebih besar untuk upsert)
+    @property
+    def nis(self):
+        return self._nis[:self._size]
+    
+    @property
+    def names(self):
+        return self._names[:self._size]
+    
+    @property
+    def kelas(self):
+        return self._kelas[:self._size]
+    
+    @property
+    def gender(self):
+        return self._gender[:self._size]
+    
+    @property
+    def scores(self):
+        return self._scores[:self._size]
+    
+    @classmethod
+    def from_dataframe(cls, data):
+        """Build store from a merged siswa/kuis/tugas frame (dropna semantics like preprocess_data)"""
+        frame = data.copy()
+        for col in SCORE_COLUMNS:
+            if col in frame.columns:
+                frame[col] = pd.to_numeric(frame[col], errors='coerce')
+        if 'NIS' in frame.columns:
+            frame['NIS'] = frame['NIS'].astype(str).str.strip()
+        frame = frame.dropna()
+        
+        n = len(frame)
+        scores = np.empty((n, len(SUBJECTS), len(SCORE_KINDS)), dtype=np.float64)
+        for s, subject in enumerate(SUBJECTS):
+            for k, kind in enumerate(SCORE_KINDS):
+                col = f'{subject}_{kind}'
+                scores[:, s, k] = frame[col].to_numpy(dtype=np.float64) if col in frame.columns else np.nan
+        
+        def text_column(name):
+            if name in frame.columns:
+                return frame[name].to_numpy(dtype=object)
+            return np.full(n, 'Unknown', dtype=object)
+        
+        return cls(
+            nis=frame['NIS'].to_numpy(dtype=object),
+            names=text_column('Nama Lengkap'),
+            kelas=text_column('Kelas'),
+            gender=text_column('Gender'),
+            scores=scores,
+        )
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def columns(self):
+        return list(SCORE_COLUMNS)
+    
+    def __getitem__(self, column):
+        """Kolom skor (mis. 'MTK_Quiz') sebagai view, tanpa copy"""
+        subject, kind = column.rsplit('_', 1)
+        return self.scores[:, SUBJECTS.index(subject), SCORE_KINDS.index(kind)]
+    
+    def row_of(self, nis):
+        """O(1) lookup baris untuk NIS, None jika tidak ada"""
+        return self.index.get(str(nis))
+    
+    def student_scores(self, row):
+        """View (len(SUBJECTS), len(SCORE_KINDS)) skor satu siswa"""
+        return self._scores[row]
+    
+    def subscribe(self, listener):
+        """Register listener(old, new) called after each upsert with (kelas, gender, scores) records"""
+        self._listeners.append(listener)
+    
+    def upsert(self, nis, nama_lengkap, kelas, gender, scores):
+        """Insert or update one student row in place (amortized O(1))"""
+        nis = str(nis)
+        scores = np.asarray(scores, dtype=np.float64)
+        with self._lock:
+            row = self.index.get(nis)
+            if row is None:
+                old = None
+                if self._size == len(self._nis):
+                    self._grow()
+                row = self._size
+                self._set_text('_nis', row, nis)
+            else:
+                old = (self._kelas[row], self._gender[row], self._scores[row].copy())
+            
+            self._set_text('_names', row, nama_lengkap)
+            self._set_text('_kelas', row, kelas)
+            self._set_text('_gender', row, gender)
+            self._writable('_scores')[row] = scores
+            if row == self._size:
+                self._size += 1
+                self.index[nis] = row
+        
+        for listener in self._listeners:
+            listener(old, (kelas, gender, scores))
+    
+    def _writable(self, attr):
+        array = getattr(self, attr)
+        # Array read-only (bundle mmap 'r' / shared memory worker): salin privat saat ditulis pertama kali
+        if not array.flags.writeable:
+            array = array.copy()
+            setattr(self, attr, array)
+        return array
+    
+    def _set_text(self, attr, row, value):
+        array = self._writable(attr)
+        # Kolom teks dari bundle bertipe fixed-width ('<U..'): lebarkan dulu agar nilai panjang tidak terpotong
+        if array.dtype.kind == 'U' and len(str(value)) > array.dtype.itemsize // 4:
+            array = array.astype(object)
+            setattr(self, attr, array)
+        array[row] = value
+    
+    def _grow(self):
+        capacity = max(16, len(self._nis) * 2)
+        
+        def grow(array):
+            grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+        
+        self._nis = grow(self._nis)
+        self._names = grow(self._names)
+        self._kelas = grow(self._kelas)
+        self._gender = grow(self._gender)
+        self._scores = grow(self._scores)
+    
+    def nis_in_class(self, kelas):
+        """Daftar NIS untuk satu kelas, urut sesuai roster"""
+        return [str(value) for value in self.nis[self.kelas == kelas]]
+
+def changed_rows(previous, store):
+    """Baris store yang skornya berbeda dari store previous, plus baris lamanya (-1 untuk siswa baru)
+    
+    Dipakai saat reload snapshot: snapshot baru selalu store baru, jadi perubahan skor per siswa
+    didapat dari membandingkan kedua matriks (NaN dianggap sama dengan NaN).
+    """
+    nis = store.nis
+    if len(previous) == len(store) and np.array_equal(previous.nis, nis):
+        # Roster dengan urutan yang sama (kasus umum): tanpa lookup index per NIS
+        previous_rows = np.arange(len(store), dtype=np.int64)
+    else:
+        previous_rows = np.fromiter((previous.index.get(str(value), -1) for value in nis),
+                                    dtype=np.int64, count=len(nis))
+    known = previous_rows >= 0
+    old = previous.scores[previous_rows[known]]
+    new = store.scores[known]
+    same = ((old == new) | (np.isnan(old) & np.isnan(new))).reshape(len(old), -1).all(axis=1)
+    changed = ~known
+    changed[known] = ~same
+    rows = np.flatnonzero(changed)
+    return rows, previous_rows[rows]
+
+def scores_from_dict(academic_scores):
+    """Ubah dict {'MTK_Quiz': ..., ...} menjadi array (len(SUBJECTS), len(SCORE_KINDS))"""
+    scores = np.empty((len(SUBJECTS), len(SCORE_KINDS)), dtype=np.float64)
+    for s, subject in enumerate(SUBJECTS):
+        for k, kind in enumerate(SCORE_KINDS):
+            scores[s, k] = academic_scores[f'{subject}_{kind}']
+    return scores
+
+def _splitmix64(values):
+    """Counter-based hash (SplitMix64) over a uint64 array"""
+    with np.errstate(over='ignore'):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+def synthetic_scores(nis_list):
+    """Skor dummy realistis untuk seluruh roster sekaligus, deterministik per NIS
+    
+    Tiap NIS punya seed sendiri (crc32), jadi hasilnya tidak bergantung pada urutan atau
+    ukuran roster. Distribusi sama dengan dummy lama: base 70-95 per mapel, variasi
+    kuis/tugas +-10, dibatasi 50-100, dibulatkan 1 desimal.
+    """
+    seeds = np.fromiter((zlib.crc32(str(nis).strip().encode('utf-8')) for nis in nis_list),
+                        dtype=np.uint64, count=len(nis_list))
+    counters = np.arange(len(SUBJECTS) * 3, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        bits = _splitmix64(seeds[:, np.newaxis] * np.uint64(len(counters)) + counters)
+    uniform = (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    uniform = uniform.reshape(len(seeds), len(SUBJECTS), 3)
+    
+    base = 70 + 25 * uniform[:, :, 0]
+    scores = np.empty((len(seeds), len(SUBJECTS), len(SCORE_KINDS)), dtype=np.float64)
+    scores[:, :, 0] = base - 10 + 20 * uniform[:, :, 1]
+    scores[:, :, 1] = base - 10 + 20 * uniform[:, :, 2]
+    return np.round(np.clip(scores, 50, 100), 1)
+
+def summarize_scores(scores):
+    """Vectorized per-batch statistics for a (n, subjects, kinds) score array"""
+    quiz = scores[:, :, 0]
+    tugas = scores[:, :, 1]
+    averages = (quiz + tugas) / 2
+    
+    # Jumlahkan per mapel berurutan agar hasil identik dengan perhitungan per siswa
+    total_quiz = np.zeros(len(scores))
+    total_tugas = np.zeros(len(scores))
+    for s in range(len(SUBJECTS)):
+        total_quiz += quiz[:, s]
+        total_tugas += tugas[:, s]
+    
+    # Urutan sort stabil (reverse): terkuat = max pertama, terlemah = min terakhir
+    last = len(SUBJECTS) - 1
+    return {
+        'averages': averages,
+        'rata_rata_kuis': total_quiz / len(SUBJECTS),
+        'rata_rata_tugas': total_tugas / len(SUBJECTS),
+        'rata_rata_keseluruhan': (total_quiz + total_tugas) / (len(SUBJECTS) * 2),
+        'strengths': averages >= STRENGTH_THRESHOLD,
+        'improvements': averages < IMPROVEMENT_THRESHOLD,
+        'terkuat': np.argmax(averages, axis=1),
+        'terlemah': last - np.argmin(averages[:, ::-1], axis=1),
+    }
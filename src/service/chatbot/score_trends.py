@@ -0,0 +1,174 @@
+# src/service/chatbot/score_trends.py
+
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from score_store import SUBJECTS, SCORE_KINDS
+
+# Waktu absolut dalam hari sejak TREND_ORIGIN; statistik cukup disimpan relatif terhadap origin per deret
+TREND_ORIGIN = datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()
+SECONDS_PER_DAY = 86400.0
+
+# Statistik cukup per (siswa, mapel, jenis): n, sum t, sum t^2, sum y, sum t*y, sum y^2
+N, ST, STT, SY, STY, SYY = range(6)
+STAT_COUNT = 6
+
+def to_days(timestamp):
+    return (np.asarray(timestamp, dtype=np.float64) - TREND_ORIGIN) / SECONDS_PER_DAY
+
+class ScoreTrends:
+    """Regresi linear skor terhadap waktu untuk semua siswa sekaligus lewat statistik cukup
+    
+    Setiap observasi baru cukup menambah statistik (O(1)); slope, proyeksi dan confidence dihitung
+    closed-form dan vectorized untuk satu batch siswa, tanpa fit model per siswa.
+    
+    t di dalam statistik dihitung dari observasi pertama deret itu (_t0), bukan dari TREND_ORIGIN:
+    dengan t ~ ribuan hari, sum t^2 - (sum t)^2 / n kehilangan hampir semua digit untuk rentang
+    waktu pendek dan slope dari dua observasi beberapa detik bisa meledak.
+    """
+    
+    def __init__(self, horizon_days=30.0, capacity=1024, min_observations=3, min_span_days=1.0):
+        self.horizon_days = horizon_days
+        # Tren baru dipakai setelah cukup observasi dalam rentang waktu yang cukup panjang
+        self.min_observations = min_observations
+        self.min_span_days = min_span_days
+        shape = (capacity, len(SUBJECTS), len(SCORE_KINDS))
+        self._stats = np.zeros(shape + (STAT_COUNT,), dtype=np.float64)
+        # Hari absolut: origin statistik, observasi paling awal dan paling akhir per deret
+        self._t0 = np.full(shape, np.nan)
+        self._first_t = np.full(shape, np.nan)
+        self._last_t = np.full(shape, np.nan)
+        self._size = 0
+        self.index = {}
+        self._lock = threading.Lock()
+        self.observations = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def _rows_for(self, nis_list, create=True):
+        rows = np.empty(len(nis_list), dtype=np.int64)
+        for i, nis in enumerate(nis_list):
+            nis = str(nis)
+            row = self.index.get(nis)
+            if row is None:
+                if not create:
+                    rows[i] = -1
+                    continue
+                if self._size == len(self._stats):
+                    self._grow()
+                row = self._size
+                self.index[nis] = row
+                self._size += 1
+            rows[i] = row
+        return rows
+    
+    def _grow(self):
+        capacity = len(self._stats) * 2
+        stats = np.zeros((capacity,) + self._stats.shape[1:], dtype=np.float64)
+        stats[:len(self._stats)] = self._stats
+        self._stats = stats
+        for name in ('_t0', '_first_t', '_last_t'):
+            current = getattr(self, name)
+            grown = np.full((capacity,) + current.shape[1:], np.nan)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+    
+    def observe(self, nis_list, scores, timestamp):
+        """Tambah satu observasi skor (n, subjects, kinds) per siswa pada timestamp (epoch detik, skalar atau per siswa)"""
+        scores = np.asarray(scores, dtype=np.float64)
+        days = np.broadcast_to(to_days(timestamp).reshape(-1, 1, 1) if np.ndim(timestamp) else to_days(timestamp),
+                               scores.shape)
+        valid = ~np.isnan(scores)
+        y = np.where(valid, scores, 0.0)
+        observed = np.where(valid, days, np.nan)
+        
+        with self._lock:
+            rows = self._rows_for(nis_list)
+            # Deret tanpa observasi mendapat origin di observasi ini (NIS ganda dalam batch: satu yang menang)
+            origin = self._t0[rows]
+            self._t0[rows] = np.where(np.isnan(origin), observed, origin)
+            t = np.where(valid, days - self._t0[rows], 0.0)
+            increments = np.stack([valid.astype(np.float64), t, t * t, y, t * y, y * y], axis=-1)
+            # add.at: NIS yang sama bisa muncul lebih dari sekali dalam satu batch
+            np.add.at(self._stats, rows, increments)
+            np.fmin.at(self._first_t, rows, observed)
+            np.fmax.at(self._last_t, rows, observed)
+            self.observations += int(valid.sum())
+    
+    def set_series(self, nis_list, stats, t0, first_t, last_t, kind='Tugas'):
+        """Ganti statistik satu jenis skor dari agregat sumber (mis. SQL atas semua submissions siswa)
+        
+        stats: (n, len(SUBJECTS), STAT_COUNT) dengan t relatif terhadap t0; t0, first_t dan last_t:
+        (n, len(SUBJECTS)) dalam hari sejak TREND_ORIGIN. Mapel dengan n == 0 tidak diubah.
+        """
+        k = SCORE_KINDS.index(kind)
+        stats = np.asarray(stats, dtype=np.float64)
+        has_data = stats[:, :, N] > 0
+        with self._lock:
+            rows = self._rows_for(nis_list)
+            target = self._stats[rows, :, k]
+            target[has_data] = stats[has_data]
+            self._stats[rows, :, k] = target
+            for name, values in (('_t0', t0), ('_first_t', first_t), ('_last_t', last_t)):
+                current = getattr(self, name)
+                series = current[rows, :, k]
+                series[has_data] = np.asarray(values, dtype=np.float64)[has_data]
+                current[rows, :, k] = series
+    
+    def project(self, nis_list, current_scores):
+        """Proyeksi skor horizon_days ke depan untuk batch siswa (vectorized, closed-form)
+        
+        Return dict array (n, subjects, kinds): slope (poin per horizon), projected, confidence, observations.
+        Tanpa min_observations dalam rentang min_span_days: slope 0, projected = skor saat ini, confidence 0.
+        """
+        current_scores = np.asarray(current_scores, dtype=np.float64)
+        with self._lock:
+            rows = self._rows_for(nis_list, create=False)
+            known = rows >= 0
+            stats = np.zeros(current_scores.shape + (STAT_COUNT,), dtype=np.float64)
+            t0 = np.full(current_scores.shape, np.nan)
+            first_t = np.full(current_scores.shape, np.nan)
+            last_t = np.full(current_scores.shape, np.nan)
+            stats[known] = self._stats[rows[known]]
+            t0[known] = self._t0[rows[known]]
+            first_t[known] = self._first_t[rows[known]]
+            last_t[known] = self._last_t[rows[known]]
+        
+        n = stats[..., N]
+        safe_n = np.where(n > 0, n, 1.0)
+        sxx = stats[..., STT] - stats[..., ST] ** 2 / safe_n
+        sxy = stats[..., STY] - stats[..., ST] * stats[..., SY] / safe_n
+        syy = stats[..., SYY] - stats[..., SY] ** 2 / safe_n
+        span = np.nan_to_num(last_t - first_t)
+        
+        has_trend = (n >= self.min_observations) & (span >= self.min_span_days) & (sxx > 1e-9)
+        safe_sxx = np.where(has_trend, sxx, 1.0)
+        slope = np.where(has_trend, sxy / safe_sxx, 0.0)
+        intercept = stats[..., SY] / safe_n - slope * stats[..., ST] / safe_n
+        latest = np.nan_to_num(last_t - t0)
+        regression = np.clip(intercept + slope * (latest + self.horizon_days), 0, 100)
+        projected = np.where(has_trend, regression, current_scores)
+        
+        # Confidence = R^2 dikoreksi jumlah observasi dan rentang waktu (data seminggu belum meyakinkan
+        # untuk proyeksi sebulan); deret konstan dianggap fit sempurna
+        flat = syy <= 1e-9
+        r_squared = np.where(flat, 1.0, sxy ** 2 / (safe_sxx * np.where(flat, 1.0, syy)))
+        coverage = np.clip(span / self.horizon_days, 0, 1)
+        confidence = np.where(has_trend, np.clip(r_squared, 0, 1) * n / (n + 3) * coverage, 0.0)
+        
+        return {
+            'slope': slope * self.horizon_days,
+            'projected': projected,
+            'confidence': confidence,
+            'observations': n.astype(np.int64)
+        }
+    
+    def stats(self):
+        return {
+            'students': self._size,
+            'observations': self.observations,
+            'horizon_days': self.horizon_days
+        }
@@ -0,0 +1,91 @@
+# src/service/chatbot/shared_scores.py
+
+import os
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from score_bundle import store_arrays, store_from_arrays
+
+class SharedScoreArrays:
+    """Array score store (format bundle) di blok multiprocessing.shared_memory
+    
+    Proses induk membuat blok sekali sebelum fork; worker gunicorn mewarisi mapping yang sama,
+    atau attach lewat layout() dari proses lain. Semua view read-only, sehingga memori tidak
+    bertambah per worker (upsert di worker menyalin kolom yang ditulis secara privat).
+    """
+    
+    def __init__(self, blocks, arrays, owner):
+        self._blocks = blocks
+        self.arrays = arrays
+        self.owner = owner
+        self.pid = os.getpid()
+    
+    @classmethod
+    def create(cls, store, prefix='rogrow'):
+        """Salin ScoreStore ke shared memory; pemanggil menjadi owner yang wajib unlink()"""
+        token = uuid.uuid4().hex[:8]
+        blocks, arrays = {}, {}
+        try:
+            for name, array in store_arrays(store).items():
+                block = shared_memory.SharedMemory(
+                    create=True, size=max(1, array.nbytes), name=f'{prefix}-{token}-{name}'
+                )
+                blocks[name] = block
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                view.flags.writeable = False
+                arrays[name] = view
+        except Exception:
+            for block in blocks.values():
+                block.unlink()
+            raise
+        return cls(blocks, arrays, owner=True)
+    
+    @classmethod
+    def attach(cls, layout):
+        """Attach read-only ke blok yang dibuat proses lain (layout dari layout())"""
+        blocks, arrays = {}, {}
+        for name, spec in layout.items():
+            block = shared_memory.SharedMemory(name=spec['shm'])
+            # Python < 3.13 mendaftarkan blok yang di-attach ke resource tracker, yang akan
+            # meng-unlink-nya saat proses ini exit; blok milik proses lain tidak boleh ikut terhapus
+            resource_tracker.unregister(block._name, 'shared_memory')
+            blocks[name] = block
+            view = np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=block.buf)
+            view.flags.writeable = False
+            arrays[name] = view
+        return cls(blocks, arrays, owner=False)
+    
+    def store(self):
+        return store_from_arrays(self.arrays)
+    
+    def layout(self):
+        return {
+            name: {'shm': self._blocks[name].name, 'shape': list(array.shape), 'dtype': array.dtype.str}
+            for name, array in self.arrays.items()
+        }
+    
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+    
+    def unlink(self):
+        """Hapus blok dari sistem (hanya owner, di proses yang membuatnya); mapping yang ada tetap valid"""
+        if not self.owner or os.getpid() != self.pid:
+            return
+        for block in self._blocks.values():
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self.owner = False
+    
+    def stats(self):
+        return {
+            'blocks': len(self._blocks),
+            'bytes': self.nbytes,
+            'students': len(self.arrays['nis']),
+            'owner_pid': self.pid
+        }
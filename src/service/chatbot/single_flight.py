@@ -0,0 +1,73 @@
+# src/service/chatbot/single_flight.py
+
+import threading
+
+class _Flight:
+    """Satu komputasi yang sedang berjalan; hasil atau exception dibagikan ke semua penunggu"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Panggilan paralel dengan key yang sama berbagi satu eksekusi (pola singleflight)"""
+    
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+    
+    def do(self, key, func):
+        """Jalankan func() sekali per key yang sedang berjalan; return (hasil, shared)
+        
+        shared True berarti hasil berasal dari eksekusi pemanggil lain. Exception dari func
+        (termasuk BaseException seperti KeyboardInterrupt/SystemExit) diteruskan ke pemanggil
+        pertama dan semua penunggunya; penunggu tidak pernah menerima (None, True) dari flight gagal.
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executions += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            # Lepas key sebelum membangunkan penunggu: panggilan berikutnya memulai eksekusi baru
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result, False
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'coalesce_rate': round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+                'errors': self.errors,
+                'in_flight': len(self._flights)
+            }
@@ -0,0 +1,48 @@
+# src/service/chatbot/startup_report.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupReport:
+    """Durasi import/inisialisasi per komponen, termasuk komponen lazy yang baru dibuat saat dipakai"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.import_seconds = None
+        self._components = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def timed(self, component):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(component, time.perf_counter() - started)
+    
+    def record(self, component, seconds):
+        with self._lock:
+            self._components[component] = {
+                'seconds': round(seconds, 4),
+                # Offset dari awal import: komponen lazy terlihat muncul belakangan
+                'at_seconds': round(time.perf_counter() - self.started, 4)
+            }
+    
+    def mark_imported(self):
+        self.import_seconds = time.perf_counter() - self.started
+    
+    def to_dict(self):
+        with self._lock:
+            components = dict(self._components)
+        return {
+            'module_import_seconds': round(self.import_seconds, 4) if self.import_seconds is not None else None,
+            'uptime_seconds': round(time.perf_counter() - self.started, 3),
+            'components': components
+        }
+    
+    def print_report(self):
+        report = self.to_dict()
+        print(f"⏱️  Startup: module import {report['module_import_seconds']}s")
+        for component, timing in sorted(report['components'].items(), key=lambda item: item[1]['at_seconds']):
+            print(f"   - {component}: {timing['seconds']}s")
@@ -0,0 +1,214 @@
+# src/service/chatbot/study_tips.py
+"""Index retrieval offline atas korpus tips belajar (dataChatBot/tips_belajar.csv)
+
+TF-IDF n-gram karakter (char_wb, tahan typo dan imbuhan) per baris: topik, setiap variasi
+pertanyaan dan jawaban; skor dokumen = kemiripan cosine baris terbaiknya. Index di-build sekali
+lalu disimpan sebagai satu file .npz (tanpa pickle) dan di-build ulang jika isi korpus berubah.
+
+    python study_tips.py
+    python study_tips.py --query "gimana supaya nggak ngantuk waktu belajar?"
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+
+from response_cache import normalize_text
+
+INDEX_FORMAT = 1
+NGRAM_RANGE = (3, 5)
+
+def read_corpus(path):
+    """Baris CSV (id, topik, pertanyaan dipisah '|', jawaban) -> list dokumen"""
+    documents = []
+    with open(path, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            documents.append({
+                'id': row['id'].strip(),
+                'topik': row['topik'].strip(),
+                'pertanyaan': [question.strip() for question in row['pertanyaan'].split('|') if question.strip()],
+                'jawaban': row['jawaban'].strip()
+            })
+    return documents
+
+def corpus_sha(path):
+    with open(path, 'rb') as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+def _vectorizer():
+    from sklearn.feature_extraction.text import CountVectorizer
+    return CountVectorizer(analyzer='char_wb', ngram_range=NGRAM_RANGE, dtype=np.float64)
+
+def _tf(count):
+    """tf sublinear: 1 + log tf"""
+    return 1.0 + np.log(count)
+
+def _weight(counts, idf):
+    """tf sublinear * idf, lalu normalisasi L2 per baris"""
+    from sklearn.preprocessing import normalize
+    counts = counts.tocsr(copy=True)
+    counts.data = _tf(counts.data)
+    return normalize(counts.multiply(idf).tocsr())
+
+def _text_array(values):
+    width = max(1, max((len(value) for value in values), default=1))
+    return np.asarray(values, dtype=f'<U{width}')
+
+class StudyTipsIndex:
+    """Matriks TF-IDF baris korpus + vocabulary/idf tetap untuk mentransformasi pertanyaan"""
+    
+    def __init__(self, documents, terms, idf, matrix, rows, sha, source='built'):
+        self.documents = documents
+        self.terms = terms
+        self.idf = idf
+        self.matrix = matrix
+        # rows[i] = indeks dokumen pemilik baris matriks i
+        self.rows = rows
+        self.sha = sha
+        self.source = source
+        self._vocabulary = {term: position for position, term in enumerate(terms)}
+        self._analyze = _vectorizer().build_analyzer()
+        # n-gram pertanyaan yang tidak ada di korpus diberi idf tertinggi (df = 0). Tanpa ini n-gram
+        # tersebut hilang dari norma dan "siapa presiden pertama indonesia" tampak mirip tips
+        # "bahasa indonesia" hanya karena satu kata yang sama
+        self._unseen_idf = float(np.log(1 + matrix.shape[0]) + 1.0)
+        self._lock = threading.Lock()
+        self.searches = 0
+    
+    @classmethod
+    def build(cls, documents, sha):
+        texts, rows = [], []
+        for position, document in enumerate(documents):
+            for text in [document['topik'], *document['pertanyaan'], document['jawaban']]:
+                texts.append(normalize_text(text))
+                rows.append(position)
+        
+        vectorizer = _vectorizer()
+        counts = vectorizer.fit_transform(texts)
+        # idf halus seperti TfidfVectorizer(smooth_idf=True)
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+        terms = vectorizer.get_feature_names_out()
+        return cls(documents, [str(term) for term in terms], idf, _weight(counts, idf),
+                   np.asarray(rows, dtype=np.int32), sha)
+    
+    def save(self, path):
+        """Tulis .npz lalu os.replace: pembaca tidak pernah melihat file setengah jadi"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as handle:
+            np.savez(
+                handle,
+                format=np.asarray(INDEX_FORMAT),
+                ngram_range=np.asarray(NGRAM_RANGE),
+                sha=np.asarray(self.sha),
+                terms=_text_array(self.terms),
+                idf=self.idf,
+                data=self.matrix.data,
+                indices=self.matrix.indices,
+                indptr=self.matrix.indptr,
+                shape=np.asarray(self.matrix.shape),
+                rows=self.rows,
+                doc_ids=_text_array([document['id'] for document in self.documents]),
+                doc_topics=_text_array([document['topik'] for document in self.documents]),
+                doc_questions=_text_array(['|'.join(document['pertanyaan']) for document in self.documents]),
+                doc_answers=_text_array([document['jawaban'] for document in self.documents])
+            )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Index tersimpan, atau None jika tidak ada / format berbeda"""
+        from scipy.sparse import csr_matrix
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as bundle:
+            if int(bundle['format']) != INDEX_FORMAT or tuple(bundle['ngram_range']) != NGRAM_RANGE:
+                return None
+            matrix = csr_matrix((bundle['data'], bundle['indices'], bundle['indptr']), shape=tuple(bundle['shape']))
+            documents = [
+                {'id': str(doc_id), 'topik': str(topik), 'pertanyaan': str(questions).split('|'), 'jawaban': str(answer)}
+                for doc_id, topik, questions, answer in zip(
+                    bundle['doc_ids'], bundle['doc_topics'], bundle['doc_questions'], bundle['doc_answers'])
+            ]
+            return cls(documents, [str(term) for term in bundle['terms']], bundle['idf'], matrix,
+                       bundle['rows'], str(bundle['sha']), source='loaded')
+    
+    def search(self, question, limit=3):
+        """[(skor cosine, dokumen)] terurut menurun, maksimal limit dokumen"""
+        columns, weights, unseen = [], [], 0.0
+        for gram, count in Counter(self._analyze(normalize_text(question))).items():
+            column = self._vocabulary.get(gram)
+            if column is None:
+                unseen += (_tf(count) * self._unseen_idf) ** 2
+            else:
+                columns.append(column)
+                weights.append(_tf(count) * self.idf[column])
+        weights = np.asarray(weights)
+        norm = np.sqrt(np.dot(weights, weights) + unseen)
+        if not columns or not norm:
+            return []
+        # Vektor pertanyaan jarang: cosine = jumlah bobot baris pada kolom n-gram pertanyaan
+        row_scores = np.asarray(self.matrix[:, columns] @ (weights / norm)).ravel()
+        scores = np.zeros(len(self.documents))
+        np.maximum.at(scores, self.rows, row_scores)
+        with self._lock:
+            self.searches += 1
+        top = np.argsort(-scores, kind='stable')[:limit]
+        return [(float(scores[position]), self.documents[position]) for position in top if scores[position] > 0]
+    
+    def stats(self):
+        return {
+            'documents': len(self.documents),
+            'rows': int(self.matrix.shape[0]),
+            'features': len(self.terms),
+            'corpus_sha': self.sha[:12],
+            'source': self.source,
+            'searches': self.searches
+        }
+
+def load_or_build(corpus_path, index_path):
+    """Index tersimpan jika hash korpus masih sama; selain itu build dari CSV lalu simpan"""
+    sha = corpus_sha(corpus_path)
+    try:
+        index = StudyTipsIndex.load(index_path)
+    except Exception as e:
+        print(f"⚠️  Study tips index unreadable, rebuilding: {e}")
+        index = None
+    if index is not None and index.sha == sha:
+        return index
+    
+    started = time.perf_counter()
+    index = StudyTipsIndex.build(read_corpus(corpus_path), sha)
+    try:
+        index.save(index_path)
+    except OSError as e:
+        # Direktori read-only: index tetap dipakai dari memori
+        print(f"⚠️  Study tips index not saved: {e}")
+    print(f"✅ Study tips index built: {len(index.documents)} tips, {len(index.terms)} fitur "
+          f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return index
+
+def main():
+    chatbot_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', default=os.path.join(chatbot_dir, 'dataChatBot', 'tips_belajar.csv'))
+    parser.add_argument('--out', default=os.path.join(chatbot_dir, 'dataChatBot', 'bundle', 'study_tips.npz'))
+    parser.add_argument('--query', help='cari tips untuk pertanyaan ini setelah index siap')
+    args = parser.parse_args()
+    
+    index = load_or_build(args.corpus, args.out)
+    print(f"📚 {args.out}: {index.stats()}")
+    if args.query:
+        for score, document in index.search(args.query, limit=5):
+            print(f"  {score:.3f}  {document['id']:<14} {document['topik']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# src/service/chatbot/test_analysis_cache.py
+
+from analysis_cache import AnalysisCache
+
+def test_put_after_invalidate_skipped():
+    cache = AnalysisCache()
+    # Komputasi dimulai, lalu NOTIFY perubahan siswa datang sebelum hasilnya disimpan
+    generation = cache.generation('20230101')
+    cache.invalidate('20230101')
+    
+    assert cache.put('20230101', 1, {'nilai': 'lama'}, generation) is False
+    assert cache.peek('20230101', 1) is None
+    assert cache.stats()['stale_puts'] == 1
+    
+    # Komputasi baru setelah invalidasi tersimpan normal
+    assert cache.put('20230101', 1, {'nilai': 'baru'}, cache.generation('20230101'))
+    assert cache.peek('20230101', 1) == {'nilai': 'baru'}
+
+def test_invalidation_of_other_nis_does_not_block_put():
+    cache = AnalysisCache()
+    generation = cache.generation('20230101')
+    cache.invalidate('20230102')
+    assert cache.put('20230101', 1, 'analisis', generation)
+    assert cache.get('20230101', 1) == 'analisis'
+
+def test_full_invalidate_blocks_every_pending_put():
+    cache = AnalysisCache()
+    first = cache.generation('20230101')
+    cache.invalidate('20230102')
+    second = cache.generation('20230102')
+    cache.invalidate()
+    
+    assert not cache.put('20230101', 1, 'a', first)
+    assert not cache.put('20230102', 1, 'b', second)
+    # Counter per NIS dibuang setelah invalidasi penuh; token baru tetap valid
+    assert cache._nis_generations == {}
+    assert cache.put('20230102', 1, 'c', cache.generation('20230102'))
+
+def test_put_without_generation_always_stored():
+    cache = AnalysisCache(max_size=1)
+    cache.invalidate('20230101')
+    assert cache.put('20230101', 1, 'a')
+    assert cache.put('20230102', 1, 'b')
+    assert len(cache) == 1 and cache.stats()['evictions'] == 1
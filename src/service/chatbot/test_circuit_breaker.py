@@ -0,0 +1,128 @@
+# src/service/chatbot/test_circuit_breaker.py
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+class FakeClock:
+    """Pengganti modul time untuk circuit_breaker: waktu hanya maju lewat advance()"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', fake)
+    return fake
+
+def make_breaker(transitions=None, **kwargs):
+    options = dict(failure_rate=0.5, window=10, min_calls=4, slow_call_seconds=5.0,
+                   open_seconds=10.0, max_open_seconds=40.0, half_open_probes=1)
+    options.update(kwargs)
+    return CircuitBreaker(
+        name='test',
+        on_transition=(lambda previous, state: transitions.append((previous, state))) if transitions is not None else None,
+        **options
+    )
+
+def fail(breaker):
+    def boom():
+        raise RuntimeError('provider down')
+    with pytest.raises(RuntimeError):
+        breaker.call(boom)
+
+def test_opens_after_failure_rate_reached(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        fail(breaker)
+    # Di bawah min_calls: tetap closed meski semua gagal
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.call(lambda: 'never called')
+    assert rejected.value.retry_after == pytest.approx(10.0)
+    assert breaker.stats()['short_circuited'] == 1
+
+def test_open_half_open_closed(clock):
+    transitions = []
+    breaker = make_breaker(transitions)
+    for _ in range(4):
+        fail(breaker)
+    
+    clock.advance(9.9)
+    assert breaker.is_open()
+    clock.advance(0.2)
+    assert not breaker.is_open()
+    
+    # Probe pertama memindahkan ke half_open; probe kedua ditolak selama probe berjalan
+    permit = breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.release(permit, True)
+    
+    assert breaker.state == CLOSED
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.stats()['window_calls'] == 1
+
+def test_failed_probe_reopens_with_doubled_wait(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        fail(breaker)
+    
+    for expected in (20.0, 40.0, 40.0):
+        clock.advance(breaker.retry_after())
+        fail(breaker)
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == pytest.approx(expected)
+    
+    # Setelah pulih, jeda kembali ke open_seconds awal
+    clock.advance(breaker.retry_after())
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert breaker.stats()['open_seconds'] == 10.0
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        permit = breaker.acquire()
+        clock.advance(6.0)
+        breaker.release(permit, True)
+    assert breaker.state == OPEN
+    assert breaker.stats()['slow_calls'] == 4
+
+def test_neutral_errors_not_counted(clock):
+    breaker = make_breaker()
+    
+    def rejected_locally():
+        raise ValueError('queue full')
+    
+    for _ in range(6):
+        with pytest.raises(ValueError):
+            breaker.call(rejected_locally, is_failure=lambda error: not isinstance(error, ValueError))
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_calls'] == 0
+
+def test_results_from_previous_state_ignored(clock):
+    breaker = make_breaker()
+    # Panggilan lambat dimulai saat closed, selesai setelah circuit open lalu half_open
+    stale = breaker.acquire()
+    for _ in range(4):
+        fail(breaker)
+    clock.advance(10.0)
+    probe = breaker.acquire()
+    breaker.release(stale, False)
+    assert breaker.state == HALF_OPEN
+    breaker.release(probe, True)
+    assert breaker.state == CLOSED
@@ -0,0 +1,85 @@
+# src/service/chatbot/test_cohort_clusters.py
+
+import numpy as np
+import pytest
+
+from cohort_clusters import ClusterEngine
+from score_store import ScoreStore, SUBJECTS, SCORE_KINDS
+
+def make_store(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return ScoreStore(
+        nis=np.array([f'200{i:03d}' for i in range(n)], dtype=object),
+        names=np.array([f'Siswa {i}' for i in range(n)], dtype=object),
+        kelas=np.full(n, '5A', dtype=object),
+        gender=np.full(n, 'Unknown', dtype=object),
+        scores=rng.uniform(40, 100, size=(n, len(SUBJECTS), len(SCORE_KINDS))),
+    )
+
+def fitted_engine():
+    # Tanpa thread background: fit dan update dipanggil langsung oleh test
+    engine = ClusterEngine(n_clusters=3, batch_size=8)
+    engine.store = make_store()
+    assert engine.fit() is not None
+    return engine
+
+def reload_rows(engine, rows):
+    """Simulasi attach dari reload data: store baru dengan baris berubah tertunda"""
+    store = make_store(seed=1)
+    with engine._pending_lock:
+        engine.store = store
+        engine._pending = set(rows)
+    return store
+
+def test_failed_partial_fit_keeps_rows_pending(monkeypatch):
+    engine = fitted_engine()
+    previous = engine.snapshot
+    store = reload_rows(engine, [3, 7, 11])
+    
+    def broken(batch):
+        raise RuntimeError('partial_fit failed')
+    
+    monkeypatch.setattr(engine.model, 'partial_fit', broken)
+    with pytest.raises(RuntimeError):
+        engine.partial_update()
+    
+    # Baris berubah tidak hilang: retry interval memproses ulang baris yang sama
+    assert engine._pending == {3, 7, 11}
+    assert engine.snapshot is previous
+    
+    monkeypatch.undo()
+    snapshot = engine.partial_update()
+    assert snapshot.store is store and snapshot.version == previous.version + 1
+    assert engine.stats()['pending_rows'] == 0
+
+def test_failed_partial_fit_after_new_attach_forces_full_refit(monkeypatch):
+    engine = fitted_engine()
+    reload_rows(engine, [1, 2])
+    
+    def broken(batch):
+        # Reload lain selesai selama update: baris lama tidak sebanding dengan store baru
+        reload_rows(engine, [5])
+        raise RuntimeError('partial_fit failed')
+    
+    monkeypatch.setattr(engine.model, 'partial_fit', broken)
+    with pytest.raises(RuntimeError):
+        engine.partial_update()
+    assert engine._full_refit and not engine._pending
+
+def test_failed_full_fit_retried(monkeypatch):
+    engine = fitted_engine()
+    engine._full_refit = True
+    
+    import sklearn.cluster
+    
+    def broken(self, X, y=None, sample_weight=None):
+        raise RuntimeError('fit failed')
+    
+    monkeypatch.setattr(sklearn.cluster.MiniBatchKMeans, 'fit', broken)
+    with pytest.raises(RuntimeError):
+        engine.partial_update()
+    assert engine._full_refit
+    
+    monkeypatch.undo()
+    assert engine.partial_update() is not None
+    assert not engine._full_refit
@@ -0,0 +1,115 @@
+# src/service/chatbot/test_conversation_history.py
+
+import pytest
+
+import prompt_context
+from conversation_history import ConversationHistoryManager, local_summary
+
+@pytest.fixture(autouse=True)
+def char_estimate(monkeypatch):
+    # Hitungan token deterministik (~4 karakter/token) dengan atau tanpa tiktoken terpasang
+    monkeypatch.setattr(prompt_context, '_encoder', None)
+    monkeypatch.setattr(prompt_context, '_encoder_loaded', True)
+
+def conversation(n, size=8):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'pesan {i} '.ljust(size, 'x')}
+        for i in range(n)
+    ]
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, previous_summary, turns):
+        self.calls.append((previous_summary, [turn['content'] for turn in turns]))
+        return f"ringkasan {len(self.calls)}"
+
+def test_short_history_sent_verbatim():
+    manager = ConversationHistoryManager(keep_messages=4)
+    messages = conversation(4)
+    prepared, info = manager.prepare(messages, session_id='s1')
+    assert prepared == messages
+    assert info['summarized_messages'] == 0 and info['dropped_messages'] == 0
+
+def test_without_session_old_messages_dropped():
+    manager = ConversationHistoryManager(keep_messages=4)
+    prepared, info = manager.prepare(conversation(10))
+    assert [m['content'] for m in prepared] == [m['content'] for m in conversation(10)[6:]]
+    assert info['dropped_messages'] == 6 and manager.stats()['sessions'] == 0
+
+def test_rolling_summary_folds_whole_blocks():
+    summarizer = RecordingSummarizer()
+    manager = ConversationHistoryManager(keep_messages=4, summarizer=summarizer)
+    messages = conversation(12)
+    
+    prepared, info = manager.prepare(messages[:10], session_id='s1')
+    assert prepared[0] == {'role': 'system', 'content': 'Ringkasan percakapan sebelumnya: ringkasan 1'}
+    assert prepared[1:] == messages[6:10]
+    assert info['summarized_messages'] == 6 and len(summarizer.calls[0][1]) == 6
+    
+    # Satu pesan baru (kurang dari fold_step): ringkasan lama dipakai, pesan ke-7 tetap verbatim
+    prepared, info = manager.prepare(messages[:11], session_id='s1')
+    assert info['summary_cached'] and info['summarized_messages'] == 6
+    assert prepared[1:] == messages[6:11] and len(summarizer.calls) == 1
+    
+    # Satu blok penuh: hanya pesan baru yang dilipat ke ringkasan sebelumnya
+    prepared, info = manager.prepare(messages, session_id='s1')
+    assert summarizer.calls[1] == ('ringkasan 1', [messages[6]['content'], messages[7]['content']])
+    assert info['summarized_messages'] == 8 and prepared[1:] == messages[8:]
+    assert manager.stats()['summaries_created'] == 2 and manager.stats()['summary_cache_hits'] == 1
+
+def test_edited_history_resummarized_from_start():
+    summarizer = RecordingSummarizer()
+    manager = ConversationHistoryManager(keep_messages=4, summarizer=summarizer)
+    messages = conversation(10)
+    manager.prepare(messages, session_id='s1')
+    
+    edited = [{'role': 'user', 'content': 'pertanyaan lain'}] + messages[1:] + conversation(2)
+    manager.prepare(edited, session_id='s1')
+    assert summarizer.calls[1][0] == '' and summarizer.calls[1][1][0] == 'pertanyaan lain'
+    assert len(summarizer.calls[1][1]) == 8
+
+def test_token_budget_limits_verbatim_messages():
+    # Pesan 400 karakter ~ 100 token + overhead: budget 250 hanya muat dua pesan terakhir
+    manager = ConversationHistoryManager(keep_messages=8, token_budget=250)
+    messages = conversation(4, size=400)
+    prepared, info = manager.prepare(messages)
+    assert prepared == messages[2:] and info['dropped_messages'] == 2
+    assert info['history_tokens'] <= 250
+    
+    # Pesan terakhir selalu dikirim meski sendiri sudah melebihi budget
+    prepared, _ = manager.prepare(conversation(3, size=2000))
+    assert len(prepared) == 1
+
+def test_summarizer_failure_falls_back_to_local_summary():
+    def broken(previous_summary, turns):
+        raise RuntimeError('LLM down')
+    
+    manager = ConversationHistoryManager(keep_messages=2, summarizer=broken)
+    prepared, info = manager.prepare(conversation(4), session_id='s1')
+    assert prepared[0]['content'].startswith('Ringkasan percakapan sebelumnya: Siswa: pesan 0')
+    assert 'RoGrow: pesan 1' in prepared[0]['content'] and info['summary_tokens'] > 0
+
+def test_sessions_evicted_by_lru_and_ttl():
+    summarizer = RecordingSummarizer()
+    manager = ConversationHistoryManager(keep_messages=2, summarizer=summarizer, max_sessions=2)
+    for session_id in ('a', 'b', 'c'):
+        manager.prepare(conversation(4), session_id=session_id)
+    assert list(manager._sessions) == ['b', 'c']
+    
+    # Sesi yang dibuang diringkas ulang dari awal, bukan memakai ringkasan sesi lain
+    manager.prepare(conversation(4), session_id='a')
+    assert summarizer.calls[-1][0] == '' and manager.stats()['summaries_created'] == 4
+    
+    expiring = ConversationHistoryManager(keep_messages=2, summarizer=summarizer, session_ttl=0.0)
+    expiring.prepare(conversation(4), session_id='a')
+    _, info = expiring.prepare(conversation(4), session_id='a')
+    assert not info['summary_cached'] and expiring.stats()['sessions'] == 1
+
+def test_local_summary_keeps_newest_turns_within_budget():
+    turns = conversation(6, size=80)
+    summary = local_summary('awal', turns, budget_tokens=50)
+    assert prompt_context.count_tokens(summary) <= 50
+    assert summary.endswith(turns[-1]['content'])
+    assert 'awal' not in summary
@@ -0,0 +1,148 @@
+# src/service/chatbot/test_database_integration.py
+
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import database_integration
+from database_integration import ConnectionPool, PoolError
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = 0
+        self.rollbacks = 0
+    
+    def cursor(self):
+        return FakeCursor(self)
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def close(self):
+        self.closed = 1
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, query):
+        if not self.connection.healthy:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+class Connector:
+    """connect() tiruan: gagal selama down True, selain itu membuka FakeConnection baru"""
+    
+    def __init__(self):
+        self.down = False
+        self.opened = []
+    
+    def __call__(self):
+        if self.down:
+            raise psycopg2.OperationalError('could not connect to server')
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+class FakeClock:
+    """Pengganti modul time untuk database_integration: waktu hanya maju lewat advance()"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool(Connector(), max_size=1, checkout_timeout=0.05)
+    conn = pool.getconn()
+    
+    started = time.monotonic()
+    with pytest.raises(PoolError):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats['open'] == 1 and stats['in_use'] == 1 and stats['checkout_failures'] == 1
+    
+    pool.putconn(conn)
+    assert pool.getconn() is conn and conn.rollbacks == 1
+
+def test_waiter_gets_connection_returned_by_another_thread():
+    connector = Connector()
+    pool = ConnectionPool(connector, max_size=1, checkout_timeout=5.0)
+    conn = pool.getconn()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert not received
+    
+    pool.putconn(conn)
+    waiter.join(5)
+    # Slot yang dilepas dipakai ulang, bukan koneksi baru di atas max_size
+    assert received == [conn] and len(connector.opened) == 1
+
+def test_connect_failure_backs_off_then_reconnects(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(database_integration, 'time', clock)
+    connector = Connector()
+    pool = ConnectionPool(connector, max_size=2, backoff_base=0.5, backoff_max=4.0)
+    connector.down = True
+    
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    # Slot yang dipesan dilepas lagi; selama backoff connect() tidak dipanggil sama sekali
+    assert pool.stats()['open'] == 0 and pool.stats()['in_use'] == 0
+    with pytest.raises(PoolError, match='backoff'):
+        pool.getconn()
+    assert pool.stats()['connect_failures'] == 1
+    
+    # Gagal lagi setelah jeda: backoff berlipat (0.5 -> 1.0, ditambah jitter maksimal setengahnya)
+    clock.advance(0.75)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert 1.0 <= pool.stats()['backoff_seconds'] <= 1.5
+    
+    connector.down = False
+    clock.advance(1.5)
+    conn = pool.getconn()
+    stats = pool.stats()
+    assert conn is connector.opened[0]
+    assert stats['connects'] == 1 and stats['backoff_seconds'] == 0.0 and stats['checkout_failures'] == 3
+
+def test_broken_connections_discarded_and_replaced(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(database_integration, 'time', clock)
+    connector = Connector()
+    pool = ConnectionPool(connector, max_size=1, health_check_interval=30.0)
+    
+    conn = pool.getconn()
+    pool.putconn(conn)
+    # Idle melewati interval health check dan server sudah memutus koneksi: diganti saat checkout
+    conn.healthy = False
+    clock.advance(31.0)
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()['discarded'] == 1 and pool.stats()['open'] == 1
+    
+    # Error koneksi di dalam context manager membuang koneksi; error lain mengembalikannya ke idle
+    pool.putconn(replacement)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            raise psycopg2.OperationalError('connection reset')
+    assert replacement.closed and pool.stats()['open'] == 0
+    
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError('bad query params')
+    assert not conn.closed and pool.stats()['idle'] == 1 and pool.stats()['discarded'] == 2
@@ -0,0 +1,50 @@
+# src/service/chatbot/test_intent_router.py
+
+import numpy as np
+
+from cohort_aggregates import CohortAggregates
+from intent_router import IntentRouter
+from score_store import ScoreStore, SUBJECTS, SCORE_KINDS
+
+def make_store(means, kelas):
+    n = len(means)
+    scores = np.repeat(np.asarray(means, dtype=np.float64)[:, None, None], len(SUBJECTS), axis=1)
+    scores = np.repeat(scores, len(SCORE_KINDS), axis=2)
+    return ScoreStore(
+        nis=np.array([f'100{i}' for i in range(n)], dtype=object),
+        names=np.array([f'Siswa {i}' for i in range(n)], dtype=object),
+        kelas=np.array(kelas, dtype=object),
+        gender=np.full(n, 'Unknown', dtype=object),
+        scores=scores,
+    )
+
+def test_ranking_best_and_worst_per_class():
+    store = make_store([70, 90, 80, 60], ['5A', '5A', '5B', '5A'])
+    aggregates = CohortAggregates.from_store(store)
+    router = IntentRouter()
+    
+    assert router.ranking(aggregates, store, None, None, None, worst=False, limit=2) == [(1, 90.0), (2, 80.0)]
+    assert router.ranking(aggregates, store, ('kelas', '5a'), 'MTK', 0, worst=True, limit=2) == [(3, 60.0), (0, 70.0)]
+    assert router.ranking(aggregates, store, ('kelas', '6C'), None, None, worst=False) == []
+
+def test_ranking_cache_follows_aggregates_version():
+    store = make_store([70, 90, 80], ['5A', '5A', '5A'])
+    aggregates = CohortAggregates.from_store(store)
+    store.subscribe(aggregates.apply_update)
+    router = IntentRouter()
+    first = router.ranking(aggregates, store, None, None, None, worst=False, limit=1)
+    assert router.ranking(aggregates, store, None, None, None, worst=False, limit=1) is first
+    _, _, stale = router._rankings
+    
+    # Upsert menaikkan versi agregat: cache diganti utuh sebagai satu tuple baru
+    store.upsert('1000', 'Siswa 0', '5A', 'Unknown', np.full((len(SUBJECTS), len(SCORE_KINDS)), 99.0))
+    assert router.ranking(aggregates, store, None, None, None, worst=False, limit=1) == [(0, 99.0)]
+    source, version, rankings = router._rankings
+    assert source is aggregates and version == aggregates.version and rankings is not stale
+    # Thread yang masih menulis hasil versi lama hanya menyentuh dict lama
+    stale[(None, None, None, False, 1)] = [(1, 90.0)]
+    assert router.ranking(aggregates, store, None, None, None, worst=False, limit=1) == [(0, 99.0)]
+    
+    # Reload: objek agregat baru dengan versi yang bisa sama tetap memulai cache baru
+    reloaded = make_store([50, 40, 30], ['5A', '5A', '5A'])
+    assert router.ranking(CohortAggregates.from_store(reloaded), reloaded, None, None, None, worst=False, limit=1) == [(0, 50.0)]
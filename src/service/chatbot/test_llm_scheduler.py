@@ -0,0 +1,127 @@
+# src/service/chatbot/test_llm_scheduler.py
+
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import LLMScheduler, LLMSchedulerRejected, retry_after_of
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers or {})
+
+def test_priority_then_arrival_order():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0)
+    # Jeda antrian agar semua ticket masuk sebelum dispatcher memberi giliran
+    scheduler._paused_until = time.monotonic() + 60
+    granted = []
+    done = threading.Event()
+    submitted = [('batch', 'b1'), ('background', 'g1'), ('interactive', 'i1'), ('batch', 'b2'), ('interactive', 'i2')]
+    
+    def notify(name):
+        granted.append(name)
+        if len(granted) == len(submitted):
+            done.set()
+    
+    for priority, name in submitted:
+        scheduler._enqueue(1, priority, lambda name=name: notify(name))
+    with scheduler._cond:
+        scheduler._paused_until = 0.0
+        scheduler._cond.notify()
+    
+    assert done.wait(5)
+    assert granted == ['i1', 'i2', 'g1', 'b1', 'b2']
+    assert scheduler.stats()['granted'] == len(submitted)
+
+def test_unknown_priority_rejected():
+    scheduler = LLMScheduler()
+    with pytest.raises(ValueError):
+        scheduler._enqueue(1, 'urgent', lambda: None)
+
+def test_queue_full_rejected():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_queue=2)
+    scheduler._paused_until = time.monotonic() + 60
+    scheduler._enqueue(1, 'interactive', lambda: None)
+    scheduler._enqueue(1, 'interactive', lambda: None)
+    with pytest.raises(LLMSchedulerRejected) as rejected:
+        scheduler._enqueue(1, 'interactive', lambda: None)
+    assert rejected.value.reason == 'queue_full'
+    assert scheduler.stats()['rejected'] == 1
+
+def test_acquire_times_out_while_paused():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, queue_timeout=0.05)
+    scheduler._paused_until = time.monotonic() + 60
+    with pytest.raises(LLMSchedulerRejected) as rejected:
+        scheduler.acquire(1)
+    assert rejected.value.reason == 'timeout'
+    assert scheduler.queue_depth()['interactive'] == 0
+
+def test_retry_after_headers():
+    assert retry_after_of(FakeAPIError(429, {'retry-after-ms': '1500'})) == 1.5
+    assert retry_after_of(FakeAPIError(429, {'retry-after': '2'})) == 2.0
+    assert retry_after_of(FakeAPIError(429)) is None
+
+def test_429_pauses_whole_queue_and_drains_budget():
+    scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=60000, backoff_base=0.01)
+    before = time.monotonic()
+    delay = scheduler._on_error(FakeAPIError(429, {'retry-after-ms': '300'}), attempt=0)
+    
+    # Jeda berlaku lewat antrian (bukan sleep di pemanggil) dan budget lokal dikosongkan
+    assert delay == 0.0
+    assert 0.3 <= scheduler._paused_until - before <= 0.3 + 0.01 + 0.05
+    assert scheduler.requests.level <= 0.01 and scheduler.tokens.level <= 1
+    stats = scheduler.stats()
+    assert stats['rate_limited'] == 1 and stats['retries'] == 1
+    
+    started = time.monotonic()
+    scheduler.acquire(10)
+    assert time.monotonic() - started >= 0.25
+
+def test_call_retries_429_and_keeps_queue_position():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base=0.01)
+    grants = []
+    enqueue = scheduler._enqueue
+    
+    def tracking_enqueue(tokens, priority, notify, seq=None):
+        tag = 'retry' if seq is not None else ('later' if grants else 'first')
+        return enqueue(tokens, priority, lambda: (grants.append(tag), notify()), seq)
+    
+    scheduler._enqueue = tracking_enqueue
+    attempts = []
+    
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            # Request lain datang saat request pertama kena 429: retry tetap dilayani lebih dulu
+            scheduler._enqueue(1, 'interactive', lambda: None)
+            raise FakeAPIError(429, {'retry-after-ms': '100'})
+        return 'ok'
+    
+    assert scheduler.call(flaky, tokens=10) == 'ok'
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.1
+    deadline = time.monotonic() + 5
+    while len(grants) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert grants == ['first', 'retry', 'later']
+    assert scheduler.stats()['retries'] == 1
+
+def test_non_retryable_error_raised_immediately():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0)
+    calls = []
+    
+    def bad_request():
+        calls.append(1)
+        raise FakeAPIError(400)
+    
+    with pytest.raises(FakeAPIError):
+        scheduler.call(bad_request, tokens=10)
+    assert len(calls) == 1
+    assert scheduler.stats()['retries'] == 0
@@ -0,0 +1,78 @@
+# src/service/chatbot/test_prompt_context.py
+
+import pytest
+
+import prompt_context
+from prompt_context import compact_student_context, count_message_tokens, count_tokens, token_report
+from score_store import SUBJECTS
+
+@pytest.fixture(autouse=True)
+def char_estimate(monkeypatch):
+    # Hitungan token deterministik (~4 karakter/token) dengan atau tanpa tiktoken terpasang
+    monkeypatch.setattr(prompt_context, '_encoder', None)
+    monkeypatch.setattr(prompt_context, '_encoder_loaded', True)
+
+def make_analysis(name='Ani Lestari'):
+    return {
+        'nama': name,
+        'nis': '20230101',
+        'kelas': '5A',
+        'overall_stats': {'rata_rata_kuis': 80.0, 'rata_rata_tugas': 82.5, 'rata_rata_keseluruhan': 81.25},
+        'terkuat': 'Matematika',
+        'terlemah': 'Seni Budaya',
+        'scores': {subject: {'quiz': 80.0, 'tugas': 82.5} for subject in SUBJECTS},
+        'strengths': ['Matematika'],
+        'improvements': [],
+        'predictions': {
+            'mata_pelajaran_prioritas': 'Seni Budaya',
+            'strategi_belajar': 'Latihan soal bertahap setiap hari',
+            'proyeksi_nilai': 'Naik ke 85 dalam 30 hari'
+        }
+    }
+
+def test_count_tokens_estimate_and_message_overhead():
+    assert count_tokens('') == 0 and count_tokens('abcde') == 2
+    # 3 token priming + per pesan 3 token overhead + role + isi
+    assert count_message_tokens([]) == 3
+    assert count_message_tokens([{'role': 'user', 'content': 'abcdefgh'}]) == 3 + 3 + 1 + 2
+
+def test_full_context_within_generous_budget():
+    text = compact_student_context(make_analysis(), budget_tokens=1000)
+    lines = text.split('\n')
+    assert lines[0] == 'Siswa: Ani Lestari | NIS 20230101 | Kelas 5A'
+    assert lines[1] == 'Rata-rata: kuis 80, tugas 82.5, total 81.2'
+    assert 'Kuat: Matematika | Perlu ditingkatkan: -' in lines
+    assert lines[-1] == 'Proyeksi: Naik ke 85 dalam 30 hari'
+
+@pytest.mark.parametrize('budget', [15, 25, 40, 60, 80, 120])
+def test_lower_priority_lines_dropped_first(budget):
+    full = compact_student_context(make_analysis(), budget_tokens=1000).split('\n')
+    text = compact_student_context(make_analysis(), budget_tokens=budget)
+    
+    assert count_tokens(text) <= budget
+    # Selalu prefix dari urutan prioritas: baris terakhir yang dibuang lebih dulu
+    assert full[:len(text.split('\n'))] == text.split('\n')
+
+def test_first_line_truncated_when_budget_tiny():
+    text = compact_student_context(make_analysis(name='Nama Sangat Panjang ' * 10), budget_tokens=5)
+    assert len(text) == 20 and text.startswith('Siswa: Nama')
+    assert compact_student_context(make_analysis(), budget_tokens=0) == ''
+
+def test_missing_predictions_omitted():
+    analysis = make_analysis()
+    analysis['predictions'] = None
+    text = compact_student_context(analysis, budget_tokens=1000)
+    assert 'Prioritas:' not in text and text.split('\n')[-1].startswith('Kuat:')
+
+def test_token_report_splits_system_and_history():
+    messages = [
+        {'role': 'system', 'content': 'x' * 40},
+        {'role': 'user', 'content': 'y' * 8},
+        {'role': 'assistant', 'content': 'z' * 4}
+    ]
+    report = token_report(messages, completion='jawaban')
+    assert report['system_tokens'] == 3 + 2 + 10
+    assert report['history_tokens'] == (3 + 1 + 2) + (3 + 3 + 1)
+    assert report['prompt_tokens'] == 3 + report['system_tokens'] + report['history_tokens']
+    assert report['completion_tokens'] == 2
+    assert token_report(messages)['completion_tokens'] is None
@@ -0,0 +1,79 @@
+# src/service/chatbot/test_response_cache.py
+
+import threading
+
+import response_cache
+from response_cache import ChatResponseCache
+
+def ask(question):
+    return [{'role': 'user', 'content': question}]
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ChatResponseCache()
+    cache.put(ask('Bagaimana cara belajar matematika?'), None, 'Latihan soal tiap hari', 1.5)
+    assert cache.get(ask('bagaimana cara  belajar Matematika')) == ('Latihan soal tiap hari', 'exact')
+    assert cache.get(ask('Bagaimana cara belajar matematika?'), {'nis': '1'}) is None
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['saved_latency_seconds'] == 1.5
+
+def test_similar_question_hit_respects_context():
+    cache = ChatResponseCache(similarity_threshold=0.8)
+    cache.put(ask('bagaimana cara belajar matematika yang efektif'), None, 'Latihan soal', 1.0)
+    cache.put(ask('apa itu fotosintesis'), None, 'Proses tumbuhan membuat makanan', 1.0)
+    
+    assert cache.get(ask('bagaimana cara belajar matematika yg efektif')) == ('Latihan soal', 'similar')
+    assert cache.get(ask('bagaimana cara belajar matematika yg efektif'), {'nis': '1'}) is None
+    assert cache.get(ask('siapa presiden pertama indonesia')) is None
+    # Percakapan multi-giliran tidak ikut pencarian kemiripan
+    assert cache.get(ask('apa itu fotosintesis?') + [{'role': 'user', 'content': 'lagi'}]) is None
+    assert cache.stats()['similar_hits'] == 1
+
+def test_put_vectorizes_only_new_entry(monkeypatch):
+    cache = ChatResponseCache(similarity_threshold=0.8)
+    cache.put(ask('apa itu fotosintesis'), None, 'a', 1.0)
+    assert cache.get(ask('apa itu fotosintesis ya')) == ('a', 'similar')
+    
+    vectorized = []
+    vectorize = cache._vectorize
+    monkeypatch.setattr(cache, '_vectorize', lambda question: vectorized.append(question) or vectorize(question))
+    cache.put(ask('apa itu gaya gravitasi'), None, 'b', 1.0)
+    assert cache.get(ask('apa itu gaya gravitasi ya')) == ('b', 'similar')
+    # Satu vektor untuk entri baru + satu untuk pertanyaan; entri lama tidak di-transform ulang
+    assert vectorized == ['apa itu gaya gravitasi', 'apa itu gaya gravitasi ya']
+
+def test_index_built_outside_lock(monkeypatch):
+    cache = ChatResponseCache(similarity_threshold=0.8)
+    cache.put(ask('apa itu fotosintesis'), None, 'a', 1.0)
+    building = threading.Event()
+    release = threading.Event()
+    build_index = ChatResponseCache._build_index
+    
+    def slow_build(version, rows):
+        building.set()
+        release.wait(5)
+        return build_index(version, rows)
+    
+    monkeypatch.setattr(response_cache.ChatResponseCache, '_build_index', staticmethod(slow_build))
+    results = []
+    lookup = threading.Thread(target=lambda: results.append(cache.get(ask('apa itu fotosintesis ya'))))
+    lookup.start()
+    assert building.wait(5)
+    # Selama index dibangun, lookup exact dan put lain tidak tertahan
+    assert cache.get(ask('apa itu fotosintesis')) == ('a', 'exact')
+    cache.put(ask('apa itu energi'), None, 'c', 1.0)
+    release.set()
+    lookup.join(5)
+    assert results == [('a', 'similar')]
+
+def test_expired_and_evicted_entries():
+    cache = ChatResponseCache(max_size=2, ttl=0.0, similarity_threshold=0.8)
+    cache.put(ask('apa itu fotosintesis'), None, 'a', 1.0)
+    assert cache.get(ask('apa itu fotosintesis')) is None
+    assert cache.get(ask('apa itu fotosintesis ya')) is None
+    
+    cache = ChatResponseCache(max_size=2)
+    for i in range(3):
+        cache.put(ask(f'pertanyaan {i}'), None, str(i), 1.0)
+    assert cache.get(ask('pertanyaan 0')) is None
+    assert cache.get(ask('pertanyaan 2')) == ('2', 'exact')
+    assert cache.stats()['evictions'] == 1
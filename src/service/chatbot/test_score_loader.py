@@ -0,0 +1,108 @@
+# src/service/chatbot/test_score_loader.py
+
+import numpy as np
+import psycopg2
+import pytest
+from psycopg2.extensions import QueryCanceledError
+
+from database_integration import ConnectionPool, DatabaseManager
+from score_loader import DatabaseScoreLoader
+from score_store import SUBJECTS, SCORE_KINDS
+
+def score_row(nis, class_name='Matematika', score=80.0):
+    return {'nis': nis, 'nama_lengkap': f'Siswa {nis}', 'kelas': '7', 'class_name': class_name,
+            'tugas_score': score, 'updated_at': None, 'n': 1, 'st': 0.0, 'stt': 0.0, 'sy': score,
+            'sty': 0.0, 'syy': score * score, 't0': 2400.0, 'first_t': 2400.0, 'last_t': 2400.0}
+
+ROWS = [score_row('1001'), score_row('1001', 'IPA', 70.0), score_row('1002'), score_row('1003'),
+        score_row('1004', score=90.0), score_row('1005')]
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.itersize = None
+        self.position = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, query, params=None):
+        if self.connection.fail_on_execute:
+            self.connection.fail_on_execute = False
+            raise self.connection.error
+    
+    def fetchmany(self, size):
+        if self.connection.fail_after is not None and self.position >= self.connection.fail_after:
+            self.connection.fail_after = None
+            raise self.connection.error
+        rows = self.connection.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+class FakeConnection:
+    """Koneksi psycopg2 tiruan: error bisa disuntikkan saat execute atau setelah sejumlah baris"""
+    
+    def __init__(self, rows, fail_after=None, fail_on_execute=False, error=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.fail_on_execute = fail_on_execute
+        self.error = error or psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.closed = 0
+    
+    def cursor(self, name=None, cursor_factory=None):
+        return FakeCursor(self)
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        self.closed = 1
+
+def make_loader(connections):
+    """DatabaseScoreLoader di atas DatabaseManager asli; setiap koneksi baru diambil dari daftar"""
+    manager = DatabaseManager.__new__(DatabaseManager)
+    opened = []
+    
+    def connect():
+        opened.append(connections.pop(0))
+        return opened[-1]
+    
+    manager.pool = ConnectionPool(connect, max_size=2, health_check_interval=60.0)
+    return DatabaseScoreLoader(manager, batch_size=2), opened
+
+def tugas_of(loader, nis, subject):
+    return loader.store.student_scores(loader.store.row_of(nis))[SUBJECTS.index(subject), SCORE_KINDS.index('Tugas')]
+
+def test_drop_mid_stream_is_not_retried():
+    loader, opened = make_loader([FakeConnection(ROWS, fail_after=4), FakeConnection(ROWS)])
+    
+    # Batch sebelum putus sudah diserahkan ke on_batch: retry akan menduplikasi siswa tersebut
+    with pytest.raises(psycopg2.OperationalError):
+        loader.load()
+    assert len(opened) == 1 and not loader.loaded
+    assert loader.db_manager.pool.stats()['discarded'] == 1
+    
+    # Load berikutnya (refresh interval) mulai dari nol
+    assert loader.load() == 5
+    assert list(loader.store.nis) == ['1001', '1002', '1003', '1004', '1005']
+    assert tugas_of(loader, '1001', 'IPA') == 70.0
+    assert tugas_of(loader, '1004', 'MTK') == 90.0
+
+def test_drop_before_first_batch_is_retried():
+    loader, opened = make_loader([FakeConnection(ROWS, fail_on_execute=True), FakeConnection(ROWS)])
+    assert loader.load() == 5
+    assert len(opened) == 2
+    assert len(np.unique(loader.store.nis)) == len(loader.store.nis)
+
+def test_statement_timeout_not_retried():
+    connection = FakeConnection(ROWS, fail_on_execute=True, error=QueryCanceledError('canceling statement'))
+    loader, opened = make_loader([connection, FakeConnection(ROWS)])
+    with pytest.raises(QueryCanceledError):
+        loader.load()
+    assert len(opened) == 1
+    # Query yang dibatalkan tidak merusak koneksi: kembali ke pool, bukan dibuang
+    stats = loader.db_manager.pool.stats()
+    assert stats['discarded'] == 0 and stats['idle'] == 1
@@ -0,0 +1,99 @@
+# src/service/chatbot/test_score_store.py
+
+import numpy as np
+import pandas as pd
+
+from score_store import ScoreStore, SortedNisIndex, SUBJECTS, SCORE_KINDS, SCORE_COLUMNS, changed_rows
+
+def student_scores(value):
+    return np.full((len(SUBJECTS), len(SCORE_KINDS)), float(value))
+
+def make_frame():
+    rows = []
+    for i, nis in enumerate(['20230101', '20230102', ' 20230103 ']):
+        row = {'NIS': nis, 'Nama Lengkap': f'Siswa {i}', 'Kelas': '5A', 'Gender': 'L'}
+        row.update({col: 70 + i for col in SCORE_COLUMNS})
+        rows.append(row)
+    # Skor tidak valid: baris dibuang seperti preprocess_data
+    rows[1]['MTK_Quiz'] = 'abc'
+    return pd.DataFrame(rows)
+
+def bundle_store():
+    """Store seperti dari bundle: kolom teks fixed-width, array read-only, SortedNisIndex"""
+    nis = np.array(['20230103', '20230101', '20230102'], dtype='<U8')
+    order = np.argsort(nis)
+    scores = np.stack([student_scores(60), student_scores(70), student_scores(80)])
+    arrays = [nis, np.array(['Ani', 'Budi', 'Citra'], dtype='<U5'), np.array(['5A', '5A', '5B'], dtype='<U2'),
+              np.array(['P', 'L', 'P'], dtype='<U1'), scores]
+    for array in arrays:
+        array.flags.writeable = False
+    return ScoreStore(*arrays, index=SortedNisIndex(nis[order], order))
+
+def test_from_dataframe_drops_invalid_rows():
+    store = ScoreStore.from_dataframe(make_frame())
+    
+    assert list(store.nis) == ['20230101', '20230103']
+    assert store.row_of(20230103) == 1 and store.row_of('20230102') is None
+    assert store['MTK_Tugas'].tolist() == [70.0, 72.0]
+    assert store.nis_in_class('5A') == ['20230101', '20230103']
+
+def test_upsert_updates_and_inserts_with_listener():
+    store = ScoreStore.from_dataframe(make_frame())
+    events = []
+    store.subscribe(lambda old, new: events.append((old, new)))
+    
+    store.upsert('20230101', 'Siswa 0', '5B', 'L', student_scores(90))
+    store.upsert('20230199', 'Siswa Baru', '5A', 'P', student_scores(50))
+    
+    assert len(store) == 3 and store.row_of('20230199') == 2
+    assert store.kelas.tolist() == ['5B', '5A', '5A']
+    assert store.student_scores(0)[0, 0] == 90.0
+    # Siswa lama: record lama (sebelum update); siswa baru: None
+    old, new = events[0]
+    assert old[0] == '5A' and old[2][0, 0] == 70.0 and new[0] == '5B'
+    assert events[1][0] is None
+
+def test_upsert_grows_capacity_amortized():
+    store = ScoreStore.from_dataframe(make_frame())
+    for i in range(20):
+        store.upsert(f'3000{i:02d}', f'Siswa {i}', '6A', 'L', student_scores(i))
+    
+    assert len(store) == 22 and len(store._nis) == 32
+    assert store.nis[-1] == '300019' and store.row_of('300019') == 21
+    assert store['IPA_Quiz'][-1] == 19.0
+
+def test_upsert_copies_read_only_arrays():
+    store = bundle_store()
+    original_scores = store._scores
+    
+    store.upsert('20230101', 'Budi Santoso Panjang', '5A', 'L', student_scores(99))
+    
+    # Copy-on-write: array bundle tidak disentuh, store menulis ke salinan privat
+    assert not original_scores.flags.writeable and original_scores[1, 0, 0] == 70.0
+    assert store._scores is not original_scores and store.student_scores(1)[0, 0] == 99.0
+    # Nama lebih panjang dari lebar '<U5' tidak terpotong
+    assert store.names[1] == 'Budi Santoso Panjang' and store._names.dtype == object
+
+def test_sorted_index_lookup_and_overlay():
+    store = bundle_store()
+    index = store.index
+    assert [store.row_of(nis) for nis in ('20230101', '20230102', '20230103')] == [1, 2, 0]
+    assert store.row_of('20230100') is None and store.row_of('99999999') is None
+    
+    store.upsert('20230150', 'Dewi', '5B', 'P', student_scores(75))
+    
+    # Siswa baru masuk overlay; NIS terurut bundle tidak berubah
+    assert index.overlay == {'20230150': 3}
+    assert '20230150' in index and '20230104' not in index
+    assert len(index) == 4 and len(index.sorted_nis) == 3
+    assert store.nis.tolist() == ['20230103', '20230101', '20230102', '20230150']
+
+def test_changed_rows_between_stores():
+    previous = ScoreStore.from_dataframe(make_frame())
+    current = ScoreStore.from_dataframe(make_frame())
+    assert changed_rows(previous, current)[0].tolist() == []
+    
+    current.upsert('20230103', 'Siswa 2', '5A', 'L', student_scores(10))
+    current.upsert('20230177', 'Siswa Baru', '5A', 'L', student_scores(10))
+    rows, previous_rows = changed_rows(previous, current)
+    assert rows.tolist() == [1, 2] and previous_rows.tolist() == [1, -1]
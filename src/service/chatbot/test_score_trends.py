@@ -0,0 +1,113 @@
+# src/service/chatbot/test_score_trends.py
+
+import numpy as np
+import pytest
+
+from score_store import SUBJECTS, SCORE_KINDS
+from score_trends import ScoreTrends, SECONDS_PER_DAY, STAT_COUNT, to_days
+
+# 2026-09-01 UTC: t ~ 2400 hari sejak TREND_ORIGIN, seperti timestamp produksi
+START = 1788220800.0
+
+def scores_of(value, subject='MTK', kind='Tugas', base=70.0):
+    scores = np.full((1, len(SUBJECTS), len(SCORE_KINDS)), base)
+    scores[0, SUBJECTS.index(subject), SCORE_KINDS.index(kind)] = value
+    return scores
+
+def cell(projection, key, subject='MTK', kind='Tugas'):
+    return projection[key][0, SUBJECTS.index(subject), SCORE_KINDS.index(kind)]
+
+def test_two_close_observations_have_no_trend():
+    trends = ScoreTrends(horizon_days=30.0)
+    trends.observe(['1'], scores_of(70.0), START)
+    trends.observe(['1'], scores_of(72.0), START + 5)
+    
+    projection = trends.project(['1'], scores_of(72.0))
+    assert cell(projection, 'slope') == 0.0
+    assert cell(projection, 'projected') == 72.0
+    assert cell(projection, 'confidence') == 0.0
+    # Mapel yang tidak berubah juga tidak mendapat slope palsu dari presisi float
+    assert np.all(projection['slope'] == 0.0)
+    assert np.all(projection['projected'] == scores_of(72.0))
+
+def test_short_span_keeps_precision():
+    # Tiga observasi dalam satu menit: statistik relatif observasi pertama memberi slope yang tepat
+    trends = ScoreTrends(horizon_days=30.0, min_span_days=0.0)
+    for minute, value in enumerate([70.0, 71.0, 72.0]):
+        trends.observe(['1'], scores_of(value), START + 60 * minute)
+    
+    projection = trends.project(['1'], scores_of(72.0))
+    per_day = 1.0 / (60 / SECONDS_PER_DAY)
+    assert cell(projection, 'slope') == pytest.approx(per_day * 30.0, rel=1e-6)
+    assert cell(projection, 'slope', subject='IPA') == pytest.approx(0.0, abs=1e-6)
+    # Rentang satu menit untuk horizon 30 hari: confidence hampir nol
+    assert cell(projection, 'confidence') < 1e-4
+
+def test_linear_trend_over_weeks():
+    trends = ScoreTrends(horizon_days=30.0)
+    for week in range(6):
+        trends.observe(['1'], scores_of(60.0 + 2.0 * week), START + week * 7 * SECONDS_PER_DAY)
+    
+    projection = trends.project(['1'], scores_of(70.0))
+    assert cell(projection, 'slope') == pytest.approx(2.0 / 7 * 30, rel=1e-9)
+    assert cell(projection, 'projected') == pytest.approx(70.0 + 2.0 / 7 * 30, rel=1e-9)
+    assert cell(projection, 'observations') == 6
+    # R^2 = 1, n/(n+3) = 2/3, rentang 35 hari >= horizon
+    assert cell(projection, 'confidence') == pytest.approx(6 / 9)
+    assert cell(projection, 'projected', subject='IPA') == pytest.approx(70.0)
+
+def test_confidence_scaled_by_span():
+    trends = ScoreTrends(horizon_days=30.0)
+    for day, value in enumerate([70.0, 71.0, 72.0]):
+        trends.observe(['1'], scores_of(value), START + day * 3 * SECONDS_PER_DAY)
+    
+    # Rentang 6 hari dari horizon 30: R^2 * n/(n+3) * 6/30
+    projection = trends.project(['1'], scores_of(72.0))
+    assert cell(projection, 'confidence') == pytest.approx(0.5 * 6 / 30)
+
+def test_unknown_student_and_projection_clipped():
+    trends = ScoreTrends(horizon_days=30.0)
+    for week in range(4):
+        trends.observe(['1'], scores_of(85.0 + 5.0 * week), START + week * 7 * SECONDS_PER_DAY)
+    
+    projection = trends.project(['1', 'unknown'], np.concatenate([scores_of(100.0), scores_of(55.0)]))
+    assert projection['projected'][0, SUBJECTS.index('MTK'), SCORE_KINDS.index('Tugas')] == 100.0
+    assert np.all(projection['projected'][1] == scores_of(55.0)[0])
+    assert np.all(projection['confidence'][1] == 0.0)
+
+def test_set_series_matches_observe():
+    observed = ScoreTrends(horizon_days=30.0)
+    times = START + np.array([0.0, 4.0, 11.0, 20.0]) * SECONDS_PER_DAY
+    values = np.array([60.0, 64.0, 63.0, 70.0])
+    for timestamp, value in zip(times, values):
+        observed.observe(['1'], scores_of(value), timestamp)
+    
+    # Statistik seperti dari SQL: t relatif terhadap submission pertama siswa
+    days = to_days(times)
+    t = days - days[0]
+    stats = np.zeros((1, len(SUBJECTS), STAT_COUNT))
+    stats[0, SUBJECTS.index('MTK')] = [len(t), t.sum(), (t * t).sum(), values.sum(), (t * values).sum(),
+                                       (values * values).sum()]
+    per_subject = np.full((1, len(SUBJECTS)), np.nan)
+    t0, first_t, last_t = per_subject.copy(), per_subject.copy(), per_subject.copy()
+    t0[0, SUBJECTS.index('MTK')] = days[0]
+    first_t[0, SUBJECTS.index('MTK')] = days[0]
+    last_t[0, SUBJECTS.index('MTK')] = days[-1]
+    from_source = ScoreTrends(horizon_days=30.0)
+    from_source.set_series(['1'], stats, t0, first_t, last_t, kind='Tugas')
+    
+    current = scores_of(70.0)
+    expected = observed.project(['1'], current)
+    actual = from_source.project(['1'], current)
+    for key in ('slope', 'projected', 'confidence'):
+        assert cell(actual, key) == pytest.approx(cell(expected, key), rel=1e-9)
+
+def test_grow_keeps_series():
+    trends = ScoreTrends(horizon_days=30.0, capacity=2)
+    nis = [str(i) for i in range(5)]
+    for week in range(3):
+        trends.observe(nis, np.repeat(scores_of(60.0 + week), 5, axis=0), START + week * 7 * SECONDS_PER_DAY)
+    
+    projection = trends.project(nis, np.repeat(scores_of(62.0), 5, axis=0))
+    assert len(trends) == 5
+    assert np.allclose(projection['slope'][:, SUBJECTS.index('MTK'), SCORE_KINDS.index('Tugas')], 30 / 7)
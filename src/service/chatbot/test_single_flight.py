@@ -0,0 +1,101 @@
+# src/service/chatbot/test_single_flight.py
+
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.001)
+
+def run_concurrently(flights, key, func, followers):
+    """Leader menjalankan func (yang menunggu release); followers bergabung sebelum func selesai"""
+    started = threading.Event()
+    release = threading.Event()
+    outcomes = {}
+    
+    def leader_work():
+        started.set()
+        release.wait(5)
+        return func()
+    
+    def call(name, work):
+        try:
+            outcomes[name] = ('ok',) + flights.do(key, work)
+        except BaseException as e:
+            outcomes[name] = ('error', e)
+    
+    leader = threading.Thread(target=call, args=('leader', leader_work))
+    leader.start()
+    assert started.wait(5)
+    threads = [
+        threading.Thread(target=call, args=(f'follower-{i}', lambda: pytest.fail('follower executed')))
+        for i in range(followers)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: flights.stats()['coalesced'] == followers)
+    release.set()
+    for thread in [leader] + threads:
+        thread.join(5)
+    return outcomes
+
+def test_followers_share_leader_result():
+    flights = SingleFlight()
+    result = {'nis': '20230101'}
+    outcomes = run_concurrently(flights, ('20230101', 1), lambda: result, followers=4)
+    
+    assert outcomes['leader'] == ('ok', result, False)
+    for i in range(4):
+        status, value, shared = outcomes[f'follower-{i}']
+        assert status == 'ok' and value is result and shared
+    stats = flights.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == 4 and stats['in_flight'] == 0
+
+def test_followers_share_leader_error():
+    flights = SingleFlight()
+    error = RuntimeError('database down')
+    
+    def failing():
+        raise error
+    
+    outcomes = run_concurrently(flights, 'key', failing, followers=3)
+    
+    # Exception yang sama (bukan salinan) sampai ke leader dan semua follower
+    assert all(outcome == ('error', error) for outcome in outcomes.values())
+    assert len(outcomes) == 4
+    stats = flights.stats()
+    assert stats['executions'] == 1 and stats['errors'] == 1 and stats['in_flight'] == 0
+    
+    # Key dilepas setelah gagal: panggilan berikutnya mengeksekusi ulang
+    assert flights.do('key', lambda: 'recovered') == ('recovered', False)
+    assert flights.stats()['executions'] == 2
+
+def test_followers_share_leader_base_exception():
+    flights = SingleFlight()
+    # Subclass BaseException sendiri agar tidak menghentikan pytest seperti KeyboardInterrupt
+    class Interrupted(BaseException):
+        pass
+    
+    error = Interrupted()
+    
+    def interrupted():
+        raise error
+    
+    outcomes = run_concurrently(flights, 'key', interrupted, followers=2)
+    
+    assert len(outcomes) == 3
+    assert all(outcome == ('error', error) for outcome in outcomes.values())
+    assert flights.stats()['errors'] == 1 and flights.stats()['in_flight'] == 0
+
+def test_different_keys_run_independently():
+    flights = SingleFlight()
+    assert flights.do('a', lambda: 1) == (1, False)
+    assert flights.do('b', lambda: 2) == (2, False)
+    assert flights.stats()['coalesced'] == 0